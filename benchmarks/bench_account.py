@@ -0,0 +1,127 @@
+"""
+账户实现基准：TPlusOneStockAccount vs CompactTPlusOneStockAccount
+
+1. 直接驱动账户完成 --trades 笔交易（买卖交替，买入后切换交易日，每笔交易后计算一次总资产），
+   输出耗时，并在另一轮运行中用 tracemalloc 统计账户（主要是交易记录）占用的内存
+2. 在合成行情上用两种账户跑 StockSimulation（网格V1/V2/V3），检查成交列表和回测结果一致
+
+数据库和日志在临时目录中创建。
+
+用法: python benchmarks/bench_account.py [--trades 100000]
+"""
+import os
+import sys
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'simulations'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from bench_column_store import make_daily_bars
+from bench_simulation_log import make_min15_bars
+from stock_db import StockDB
+from simulations.bar_view import BarView
+from simulations.stock_account_compact import CompactTPlusOneStockAccount
+from simulations.stock_account_tplus1 import TPlusOneStockAccount, TradeDecision
+from simulations.stock_simulation import StockSimulation
+from simulations.stock_strategy_gird_v1 import StockStrategyGridV1
+from simulations.stock_strategy_gird_v2 import StockStrategyGridV2
+from simulations.stock_strategy_gird_v3 import StockStrategyGridV3
+
+
+def drive(account, trades):
+    """买入和卖出交替，卖出前切换交易日使持股可售"""
+    stock_code = '600000'
+    cur_datetime = datetime(2021, 1, 4, 9, 30)
+    total_value = 0
+    for i in range(trades):
+        price = 10 + (i % 50) * 0.01
+        if i % 2 == 0:
+            decision = TradeDecision(cur_datetime, 'buy', stock_code, price, 100,
+                                     f"买入100股，价格{price:.2f}，网格下沿{price * 0.98:.2f}")
+            account.buy(stock_code, price, 100, decision)
+            account.next_trading_day()
+            cur_datetime += timedelta(days=1)
+        else:
+            decision = TradeDecision(cur_datetime, 'sell', stock_code, price, 100,
+                                     f"卖出100股，价格{price:.2f}，网格上沿{price * 1.02:.2f}")
+            account.sell(stock_code, price, 100, decision)
+            cur_datetime += timedelta(minutes=15)
+        total_value = account.get_total_value({stock_code: price})
+    return total_value
+
+
+def bench_trades(trades):
+    print(f"{trades} 笔交易:")
+    for name, make_account in (
+        ('TPlusOneStockAccount', TPlusOneStockAccount),
+        ('Compact', CompactTPlusOneStockAccount),
+        ('Compact(keep_reasons=False)', lambda cash: CompactTPlusOneStockAccount(cash, keep_reasons=False)),
+    ):
+        start = time.perf_counter()
+        account = make_account(trades * 10)
+        total_value = drive(account, trades)
+        elapsed = time.perf_counter() - start
+
+        # tracemalloc 会显著拖慢执行，内存单独跑一轮统计
+        tracemalloc.start()
+        account = make_account(trades * 10)
+        drive(account, trades)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  {name:>28}: {elapsed:6.2f}s  账户内存 {current / 1e6:7.1f} MB  "
+              f"峰值 {peak / 1e6:7.1f} MB  总资产 {total_value:.2f}  记录 {len(account.trade_history)}")
+
+
+def check_simulation(days):
+    stock_code = '600000'
+    daily = make_daily_bars(days)
+    db = StockDB()
+    db.save_daily_data(stock_code, daily)
+    db.save_min_data(stock_code, '15', make_min15_bars(days))
+    start_date = daily['date'].iloc[0].to_pydatetime()
+    end_date = daily['date'].iloc[-1].to_pydatetime()
+    bar_view = BarView(stock_code, start_date, end_date)
+
+    ok = True
+    for strategy_class in (StockStrategyGridV1, StockStrategyGridV2, StockStrategyGridV3):
+        outcomes = []
+        for account_class in (TPlusOneStockAccount, CompactTPlusOneStockAccount):
+            simulation = StockSimulation(stock_code, stock_code, start_date, end_date, strategy_class(),
+                                         bar_view=bar_view, log_mode='full', account_class=account_class)
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = simulation.run()
+            trades = [(d.datetime, d.action, d.stock_code, d.price, d.quantity, d.reason)
+                      for d in simulation.account.trade_history]
+            outcomes.append((result, trades, simulation.account.get_recent_decisions_summary(),
+                             simulation.account.total_assets))
+        same = outcomes[0] == outcomes[1]
+        ok = ok and same
+        print(f"  {strategy_class.__name__}: 成交 {len(outcomes[0][1])} 笔  {'一致' if same else '不一致'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='账户实现基准')
+    parser.add_argument('--trades', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=250)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='bench_account_'))
+    bench_trades(args.trades)
+
+    print(f"StockSimulation 回测（{args.days} 个交易日）:")
+    ok = check_simulation(args.days)
+    print(f"一致性检查: {'通过' if ok else '失败'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+多只股票 DeepSeek 回测：串行 vs TickScheduler 并发
+
+在本进程内启动 stubs/deepseek_stub_server.py 的桩服务（固定延迟 --latency 秒，应答由提示词确定），
+对 --stocks 只股票各跑 --days 个交易日的 DeepSeekStrategy 回测（不使用应答缓存）：
+    serial     逐只调用 StockSimulation.run()，每次决策同步等待接口
+    scheduler  TickScheduler 按决策时刻同步推进，同一时刻各股票的请求经 AsyncDeepSeekAPI 并发发出
+
+输出两种方式的总耗时、请求数和每个决策时刻的耗时，并检查两者的成交列表和回测结果完全一致。
+数据库在临时目录中创建。
+
+用法: python benchmarks/bench_async_llm.py [--stocks 8] [--days 3] [--latency 0.05] [--concurrency 8]
+"""
+import os
+import sys
+import argparse
+import contextlib
+import io
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'simulations'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+sys.path.insert(0, os.path.join(ROOT, 'stubs'))
+
+os.environ['DAYLI_KLINE_DAYS'] = '30'
+os.environ['MIN15_KLINE_DAYS'] = '3'
+os.environ['DEEPSEEK_API_KEY'] = 'stub'
+
+from bench_column_store import make_daily_bars
+from deepseek_stub_server import make_server
+from parity_grid_engine import make_min15_bars
+from stock_db import StockDB
+from deepseek import DeepSeekAPI
+from deepseek_async import AsyncDeepSeekAPI
+from simulations.bar_view import BarView
+from simulations.stock_simulation import StockSimulation
+from simulations.stock_strategy_deepseek import DeepSeekStrategy
+from simulations.tick_scheduler import TickScheduler
+
+
+def make_simulations(stock_codes, start_date, end_date, strategy_factory):
+    return [
+        StockSimulation(stock_code, stock_code, start_date, end_date, strategy_factory(),
+                        initial_cash=50000, bar_view=BarView(stock_code, start_date, end_date), log_mode='none')
+        for stock_code in stock_codes
+    ]
+
+
+def trades_of(simulations):
+    return [[(d.datetime, d.action, d.price, d.quantity) for d in simulation.account.trade_history]
+            for simulation in simulations]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多只股票 DeepSeek 回测并发基准')
+    parser.add_argument('--stocks', type=int, default=8)
+    parser.add_argument('--days', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='bench_async_llm_'))
+    # 日K回看30天，前面多准备60个交易日，避免构建提示词时触发下载
+    total_days = args.days + 60
+    daily = make_daily_bars(total_days)
+    db = StockDB()
+    stock_codes = [f"{600000 + i}" for i in range(args.stocks)]
+    for seed, stock_code in enumerate(stock_codes):
+        db.save_daily_data(stock_code, daily)
+        db.save_min_data(stock_code, '15', make_min15_bars(total_days, seed, 0.003))
+    start_date = daily['date'].iloc[-args.days].to_pydatetime()
+    end_date = daily['date'].iloc[-1].to_pydatetime()
+
+    server = make_server(port=0, latency=args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        serial = make_simulations(stock_codes, start_date, end_date,
+                                  lambda: DeepSeekStrategy(api=DeepSeekAPI(url=url, cache_mode='off')))
+        start = time.perf_counter()
+        serial_results = [simulation.run() for simulation in serial]
+        serial_elapsed = time.perf_counter() - start
+    serial_requests = server.stats['requests']
+
+    api = DeepSeekAPI(url=url, cache_mode='off', pool_size=args.concurrency)
+    async_api = AsyncDeepSeekAPI(api, concurrency=args.concurrency)
+    with contextlib.redirect_stdout(io.StringIO()):
+        concurrent = make_simulations(stock_codes, start_date, end_date,
+                                      lambda: DeepSeekStrategy(api=api, async_api=async_api))
+        scheduler = TickScheduler(concurrent, concurrency=args.concurrency)
+        start = time.perf_counter()
+        concurrent_results = scheduler.run()
+        concurrent_elapsed = time.perf_counter() - start
+    async_api.close()
+    concurrent_requests = server.stats['requests'] - serial_requests
+    stats = scheduler.tick_stats()
+
+    ok = serial_results == concurrent_results and trades_of(serial) == trades_of(concurrent)
+    trades = sum(len(simulation.account.trade_history) for simulation in serial)
+    print(f"{args.stocks} 只股票 x {args.days} 个交易日，桩服务延迟 {args.latency}s，并发 {args.concurrency}:")
+    print(f"     serial: {serial_elapsed:7.2f}s  请求 {serial_requests} 次  成交 {trades} 笔")
+    print(f"  scheduler: {concurrent_elapsed:7.2f}s  请求 {concurrent_requests} 次  "
+          f"决策时刻 {stats['ticks']} 个  平均 {stats['mean_ms']:.1f}ms  p99 {stats['p99_ms']:.1f}ms")
+    print(f"  加速比: {serial_elapsed / concurrent_elapsed:.1f}x")
+    print(f"一致性检查: {'通过' if ok else '失败'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
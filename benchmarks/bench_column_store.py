@@ -0,0 +1,92 @@
+"""
+K线读取基准：SQLite vs 列式存储（NumPy内存映射）
+
+生成若干股票的日K线与15分钟K线写入SQLite，同步到列式存储后，
+分别通过 get_daily_data / get_min_data 随机读取区间，对比两种后端的耗时。
+
+用法: python benchmarks/bench_column_store.py [--stocks 50] [--days 1000] [--reads 500]
+"""
+import os
+import sys
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_db import StockDB
+from stock_column_store import StockColumnStore
+
+
+def make_daily_bars(days):
+    dates = pd.bdate_range('2021-01-04', periods=days)
+    close = 10 + np.cumsum(np.random.default_rng(1).normal(0, 0.1, days))
+    return pd.DataFrame({
+        'date': dates,
+        'open': close, 'high': close + 0.1, 'low': close - 0.1, 'close': close,
+        'volume': np.full(days, 1000000, dtype=np.int64), 'amount': close * 1000000,
+    })
+
+
+def make_min15_bars(days):
+    sessions = pd.bdate_range('2021-01-04', periods=days)
+    offsets = pd.to_timedelta([f"{h}:{m}:00" for h, m in
+                               [(9, 45), (10, 0), (10, 15), (10, 30), (10, 45), (11, 0), (11, 15), (11, 30),
+                                (13, 15), (13, 30), (13, 45), (14, 0), (14, 15), (14, 30), (14, 45), (15, 0)]])
+    datetimes = (sessions.values[:, None] + offsets.values[None, :]).ravel()
+    close = 10 + np.cumsum(np.random.default_rng(2).normal(0, 0.02, len(datetimes)))
+    return pd.DataFrame({
+        'datetime': datetimes,
+        'open': close, 'high': close + 0.02, 'low': close - 0.02, 'close': close,
+        'volume': np.full(len(datetimes), 10000, dtype=np.int64),
+    })
+
+
+def bench_reads(db, stock_codes, reads, days, min_data):
+    rng = np.random.default_rng(3)
+    dates = pd.bdate_range('2021-01-04', periods=days)
+    start = time.perf_counter()
+    rows = 0
+    for _ in range(reads):
+        code = stock_codes[rng.integers(len(stock_codes))]
+        lo = rng.integers(0, days - 250)
+        begin, end = dates[lo].strftime('%Y-%m-%d'), dates[lo + 250].strftime('%Y-%m-%d')
+        if min_data:
+            rows += len(db.get_min_data(code, '15', f"{begin} 09:30:00", f"{end} 15:00:00"))
+        else:
+            rows += len(db.get_daily_data(code, begin, end))
+    return (time.perf_counter() - start) / reads, rows / reads
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stocks', type=int, default=50)
+    parser.add_argument('--days', type=int, default=1000)
+    parser.add_argument('--reads', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        root = os.path.join(tmp_dir, 'columns')
+        sqlite_db = StockDB(db_path, column_store='')
+
+        stock_codes = [f"{600000 + i}" for i in range(args.stocks)]
+        daily = make_daily_bars(args.days)
+        min15 = make_min15_bars(args.days)
+        for code in stock_codes:
+            sqlite_db.save_daily_data(code, daily)
+            sqlite_db.save_min_data(code, '15', min15)
+
+        start = time.perf_counter()
+        StockColumnStore(root).sync_from_db(sqlite_db, periods=['15'])
+        print(f"同步 {args.stocks} 只股票耗时 {time.perf_counter() - start:.2f}s")
+
+        column_db = StockDB(db_path, column_store=root)
+        for name, min_data in (('日K线(约250根)', False), ('15分钟K线(约4000根)', True)):
+            sqlite_time, rows = bench_reads(sqlite_db, stock_codes, args.reads, args.days, min_data)
+            column_time, _ = bench_reads(column_db, stock_codes, args.reads, args.days, min_data)
+            print(f"{name}: 平均 {rows:.0f} 行/次  SQLite {sqlite_time * 1e3:7.2f} ms/次  "
+                  f"列式存储 {column_time * 1e3:7.2f} ms/次  加速比 {sqlite_time / column_time:.1f}x")
@@ -0,0 +1,61 @@
+"""
+StockDB 连接开销基准
+
+对比每次调用都 sqlite3.connect 的旧方式与线程内复用连接的方式，
+输出单次查询的平均耗时。
+
+用法: python benchmarks/bench_db_connection.py [查询次数]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_db import StockDB
+
+
+def _prepare_db(db_path):
+    db = StockDB(db_path)
+    db.save_daily_data('000001', pd.DataFrame({
+        'date': pd.bdate_range('2024-01-02', periods=20),
+        'open': 10.0, 'high': 10.5, 'low': 9.8, 'close': 10.2, 'volume': 100000, 'amount': 1.0e6,
+    }))
+    return db
+
+
+def bench_connect_per_call(db_path, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        # 每次查询后关闭连接，下一次查询重新建立，等同于改造前的写法
+        db = StockDB(db_path)
+        db.get_latest_daily_date('000001')
+        db.close()
+    return (time.perf_counter() - start) / n
+
+
+def bench_stockdb_per_call(db_path, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        # 与StockDataFetcher一致，每次调用都新建StockDB
+        StockDB(db_path).get_latest_daily_date('000001')
+    return (time.perf_counter() - start) / n
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        _prepare_db(db_path)
+
+        before = bench_connect_per_call(db_path, n)
+        after = bench_stockdb_per_call(db_path, n)
+
+        print(f"查询次数: {n}")
+        print(f"每次新建连接: {before * 1e6:8.1f} us/次")
+        print(f"线程内复用连接: {after * 1e6:8.1f} us/次")
+        print(f"加速比: {before / after:.1f}x")
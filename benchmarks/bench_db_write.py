@@ -0,0 +1,91 @@
+"""
+StockDB 批量写入吞吐基准
+
+对比逐行 iterrows + execute 的旧写法与按列格式化 + executemany 的 save_min_data，
+输出 1k / 100k / 1M 根分钟K线的写入速度（行/秒）。
+
+用法: python benchmarks/bench_db_write.py [--skip-legacy-above N]
+"""
+import os
+import sys
+import argparse
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_db import StockDB
+
+
+def make_min_bars(count):
+    datetimes = pd.date_range('2020-01-02 09:35:00', periods=count, freq='5min')
+    close = 10 + np.cumsum(np.random.default_rng(0).normal(0, 0.01, count))
+    return pd.DataFrame({
+        'datetime': datetimes,
+        'open': close, 'high': close + 0.02, 'low': close - 0.02, 'close': close,
+        'volume': np.full(count, 10000, dtype=np.int64),
+    })
+
+
+def legacy_db(db_path):
+    """建立改造前的文本结构分钟表，StockDB 会沿用旧结构"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE minute_kline (
+            stock_code TEXT, period TEXT, datetime DATETIME,
+            open REAL, high REAL, low REAL, close REAL, volume INTEGER,
+            PRIMARY KEY (stock_code, period, datetime)
+        )
+    ''')
+    conn.close()
+    return StockDB(db_path)
+
+
+def legacy_save_min_data(db, stock_code, period, kline_data):
+    """改造前的逐行写入方式"""
+    conn = db._get_conn()
+    cursor = conn.cursor()
+    for _, row in kline_data.iterrows():
+        cursor.execute('''
+            INSERT OR REPLACE INTO minute_kline
+            (stock_code, period, datetime, open, high, low, close, volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            stock_code, period,
+            row['datetime'].strftime('%Y-%m-%d %H:%M:%S'),
+            row['open'], row['high'], row['low'], row['close'],
+            int(row['volume'])
+        ))
+    conn.commit()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--skip-legacy-above', type=int, default=100_000,
+                        help='超过该行数时不再运行旧写法（1M行逐行写入耗时较长）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for count in (1_000, 100_000, 1_000_000):
+            bars = make_min_bars(count)
+
+            db = StockDB(os.path.join(tmp_dir, f'new_{count}.db'))
+            new_time = timed(lambda: db.save_min_data('000001', '5', bars))
+            line = f"{count:>9} 行  executemany: {count / new_time:>12,.0f} 行/秒"
+
+            if count <= args.skip_legacy_above:
+                legacy = legacy_db(os.path.join(tmp_dir, f'legacy_{count}.db'))
+                legacy_time = timed(lambda: legacy_save_min_data(legacy, '000001', '5', bars))
+                line += f"  iterrows: {count / legacy_time:>12,.0f} 行/秒  加速比 {legacy_time / new_time:.1f}x"
+
+            print(line)
@@ -0,0 +1,113 @@
+"""
+StockDataFetcher 数据帧缓存基准
+
+按 pick_up_stock(pick_date=...) 对每只股票的日K读取顺序，对 --stocks 只股票依次读取：
+    上个交易日、上个交易日的前一日（_is_right_predict）、当前交易日、当前交易日的前一日、
+    预测请求的200个交易日窗口（_build_predict_request）
+分别在关闭缓存（STOCK_FRAME_CACHE_BYTES=0 的效果）和开启缓存时计时，检查两者返回的数据帧完全一致，
+输出缓存命中统计；最后写入一根新K线，检查缓存失效后读到新数据。
+
+数据库在临时目录中创建。
+
+用法: python benchmarks/bench_frame_cache.py [--stocks 300] [--rounds 3]
+"""
+import os
+import sys
+import argparse
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from bench_column_store import make_daily_bars
+from stock_data_fetcher import StockDataFetcher
+from stock_db import StockDB
+from stock_frame_cache import get_frame_cache, get_frame_cache_stats, reset_frame_cache_stats
+from stock_tools import StockTools
+
+
+def pick_reads(fetcher, tools, stock_code, predict_date):
+    current_date = tools.get_trading_day(predict_date, -1)
+    last_date = tools.get_trading_day(predict_date, -2)
+    frames = [
+        fetcher.get_daily_kline(stock_code, last_date, last_date),
+        fetcher.get_daily_kline(stock_code, tools.get_trading_day(last_date, -1), tools.get_trading_day(last_date, -1)),
+        fetcher.get_daily_kline(stock_code, current_date, current_date),
+        fetcher.get_daily_kline(stock_code, last_date, last_date),
+        fetcher.get_daily_kline(stock_code, tools.get_trading_day(predict_date, -200),
+                                tools.get_trading_day(predict_date, -1)),
+    ]
+    return frames
+
+
+def run(stock_codes, predict_dates):
+    fetcher = StockDataFetcher()
+    tools = StockTools()
+    frames = []
+    start = time.perf_counter()
+    for predict_date in predict_dates:
+        for stock_code in stock_codes:
+            frames.extend(pick_reads(fetcher, tools, stock_code, predict_date))
+    return time.perf_counter() - start, frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description='StockDataFetcher 数据帧缓存基准')
+    parser.add_argument('--stocks', type=int, default=300)
+    parser.add_argument('--rounds', type=int, default=3, help='连续选股的交易日数')
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='bench_frame_cache_'))
+    db = StockDB()
+    daily = make_daily_bars(400)
+    first_date = daily['date'].iloc[0].strftime('%Y-%m-%d')
+    last_date = daily['date'].iloc[-1].strftime('%Y-%m-%d')
+    stock_codes = [f"{600000 + i}" for i in range(args.stocks)]
+    for stock_code in stock_codes:
+        db.save_daily_data(stock_code, daily)
+        db.add_daily_coverage(stock_code, first_date, last_date)
+
+    tools = StockTools()
+    predict_dates = [tools.get_trading_day(last_date, -10 + i) for i in range(args.rounds)]
+    cache = get_frame_cache()
+    max_bytes = cache.max_bytes
+
+    cache.max_bytes = 0
+    cache.clear()
+    uncached_elapsed, uncached = run(stock_codes, predict_dates)
+
+    cache.max_bytes = max_bytes
+    reset_frame_cache_stats()
+    cached_elapsed, cached = run(stock_codes, predict_dates)
+    stats = get_frame_cache_stats()
+
+    ok = len(uncached) == len(cached) and all(a.equals(b) for a, b in zip(uncached, cached))
+    reads = len(cached)
+    print(f"{args.stocks} 只股票 x {args.rounds} 个交易日，共 {reads} 次 get_daily_kline:")
+    print(f"  无缓存: {uncached_elapsed:6.2f}s  {uncached_elapsed / reads * 1000:7.3f}ms/次")
+    print(f"  有缓存: {cached_elapsed:6.2f}s  {cached_elapsed / reads * 1000:7.3f}ms/次  "
+          f"加速 {uncached_elapsed / cached_elapsed:.1f}x")
+    print(f"  命中 {stats['hits']}  未命中 {stats['misses']}  命中率 {stats['hit_rate'] * 100:.1f}%  "
+          f"条目 {stats['entries']}  占用 {stats['bytes'] / 1e6:.1f}MB / {stats['max_bytes'] / 1e6:.0f}MB  "
+          f"淘汰 {stats['evictions']}")
+
+    # 写入后缓存失效，重新读取得到新数据
+    fetcher = StockDataFetcher()
+    stock_code = stock_codes[0]
+    before = fetcher.get_daily_kline(stock_code, last_date, last_date)
+    changed = daily.iloc[[-1]].copy()
+    changed['close'] = changed['close'] + 1
+    db.save_daily_data(stock_code, changed)
+    after = fetcher.get_daily_kline(stock_code, last_date, last_date)
+    invalidated = float(after['close'].iloc[0]) == float(before['close'].iloc[0]) + 1
+    print(f"  写入后失效: {'通过' if invalidated else '失败'}（失效 {get_frame_cache_stats()['invalidations']} 次）")
+
+    ok = ok and invalidated
+    print(f"一致性检查: {'通过' if ok else '失败'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+定时任务调度检查：1秒轮询 vs JobScheduler
+
+用模拟时钟跑 --days 天（默认从 2025-09-22 起三周，包含国庆长假），任务与 webserver 相同：
+    prepare  每天 00:10，前一天是交易日时触发
+    pick     每天 14:45，交易日触发
+    poll      改造前的 predict_timer：每轮 sleep(1) 再加 --tick-cost 秒的处理耗时，
+              只在 时:分:秒 恰好相等时触发，也不看交易日
+    scheduler JobScheduler.run_pending，醒来后按 seconds_until_next 睡到下一个触发时间（单次最多60秒），
+              每次醒来同样多 --tick-cost 秒
+
+输出两种方式的唤醒次数和触发次数，检查 scheduler 恰好在应触发的日期各触发一次。
+另用真实线程检查：任务运行中时定时触发被跳过、手动触发返回 None，结束后记录耗时；
+调度线程能在模拟的到点时刻自己醒来执行任务。
+
+用法: python benchmarks/bench_job_scheduler.py [--start 2025-09-22] [--days 21] [--tick-cost 0.05]
+"""
+import os
+import sys
+import argparse
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_scheduler import JobScheduler, JOB_SCHEDULER_MAX_SLEEP
+from stock_tools import StockTools
+
+tools = StockTools()
+JOBS = (
+    ('prepare', 0, 10, lambda day: tools.is_trading_day(day - timedelta(days=1))),
+    ('pick', 14, 45, tools.is_trading_day),
+)
+
+
+class SyncExecutor:
+    """在调用线程中直接执行，模拟时钟下不需要真实线程"""
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def run_poll(start, end, tick_cost):
+    fired = []
+    wakeups = 0
+    now = start
+    while now < end:
+        wakeups += 1
+        for name, hour, minute, _ in JOBS:
+            if now.hour == hour and now.minute == minute and now.second == 0:
+                fired.append((name, now.date()))
+        now += timedelta(seconds=1 + tick_cost)
+    return wakeups, fired
+
+
+def run_scheduler(start, end, tick_cost):
+    clock = [start]
+    fired = []
+    scheduler = JobScheduler(SyncExecutor(), clock=lambda: clock[0])
+    for name, hour, minute, day_filter in JOBS:
+        scheduler.add_job(name, lambda name=name: fired.append((name, clock[0].date())), hour, minute, day_filter)
+
+    wakeups = 0
+    while clock[0] < end:
+        wakeups += 1
+        scheduler.run_pending()
+        delay = scheduler.seconds_until_next()
+        clock[0] += timedelta(seconds=min(delay, JOB_SCHEDULER_MAX_SLEEP) + tick_cost)
+    return wakeups, fired
+
+
+def expected_fires(start, end):
+    fires = []
+    day = start.date()
+    while day < end.date():
+        for name, hour, minute, day_filter in JOBS:
+            if day_filter(day) and start <= datetime(day.year, day.month, day.day, hour, minute) < end:
+                fires.append((name, day))
+        day += timedelta(days=1)
+    return sorted(fires)
+
+
+def check_exclusion():
+    """任务运行中时定时触发和手动触发都不会再启动一次"""
+    started = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    def job():
+        runs.append(1)
+        started.set()
+        release.wait()
+
+    clock = [datetime(2025, 9, 22, 14, 44)]
+    executor = ThreadPoolExecutor(max_workers=2)
+    scheduler = JobScheduler(executor, clock=lambda: clock[0])
+    scheduler.add_job('pick', job, 14, 45)
+
+    future = scheduler.run_now('pick')
+    started.wait()
+    clock[0] = datetime(2025, 9, 22, 14, 45, 3)
+    timer_fired = scheduler.run_pending()
+    manual = scheduler.run_now('pick')
+    time.sleep(0.2)
+    release.set()
+    future.result()
+    stats = scheduler.stats()['pick']
+    again = scheduler.run_now('pick')
+    again.result()
+    executor.shutdown()
+    return (timer_fired == [] and manual is None and stats['skipped'] == 1 and stats['runs'] == 1
+            and stats['last_duration'] >= 0.2 and stats['next_fire'] == '2025-09-23 14:45:00'
+            and len(runs) == 2)
+
+
+def check_thread():
+    """调度线程在模拟时钟的下一个整分自己醒来执行"""
+    base = datetime(2025, 9, 22, 14, 44, 58, 500000)
+    offset = base - datetime.now()
+    done = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=1)
+    scheduler = JobScheduler(executor, clock=lambda: datetime.now() + offset)
+    scheduler.add_job('pick', done.set, 14, 45)
+    due = scheduler.seconds_until_next()
+    start = time.perf_counter()
+    scheduler.start()
+    ok = done.wait(5)
+    latency = time.perf_counter() - start - due
+    scheduler.stop()
+    executor.shutdown()
+    return ok and scheduler.stats()['pick']['next_fire'] == '2025-09-23 14:45:00', latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description='定时任务调度检查')
+    parser.add_argument('--start', default='2025-09-22')
+    parser.add_argument('--days', type=int, default=21)
+    parser.add_argument('--tick-cost', type=float, default=0.05, help='每次醒来的处理耗时（秒）')
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, '%Y-%m-%d')
+    end = start + timedelta(days=args.days)
+    expected = expected_fires(start, end)
+
+    poll_wakeups, poll_fired = run_poll(start, end, args.tick_cost)
+    scheduler_wakeups, scheduler_fired = run_scheduler(start, end, args.tick_cost)
+
+    print(f"{args.start} 起 {args.days} 天，应触发 {len(expected)} 次（每次醒来耗时 {args.tick_cost}s）:")
+    for name, wakeups, fired in (('poll', poll_wakeups, poll_fired), ('scheduler', scheduler_wakeups, scheduler_fired)):
+        extra = len(set(fired) - set(expected))
+        missed = len(set(expected) - set(fired))
+        print(f"  {name:>9}: 唤醒 {wakeups:8d} 次  触发 {len(fired):3d} 次（非交易日多触发 {extra} 次，漏触发 {missed} 次）")
+
+    exclusion_ok = check_exclusion()
+    thread_ok, latency = check_thread()
+    print(f"互斥检查: {'通过' if exclusion_ok else '失败'}")
+    print(f"调度线程检查: {'通过' if thread_ok else '失败'}（到点后 {latency * 1000:.0f}ms 内执行）")
+
+    ok = sorted(scheduler_fired) == expected and exclusion_ok and thread_ok
+    print(f"一致性检查: {'通过' if ok else '失败'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Kronos 批量预测吞吐基准
+
+在本进程内启动 stubs/kronos_stub_server.py 的桩服务，用 200 根日K线的请求体对比：
+    serial   改造前的逐条 requests.post（每次新建连接）
+    batch=N  KronosClient.predict_many，不同批大小
+
+输出每种方式的总耗时和每秒预测条数。
+
+用法: python benchmarks/bench_kronos_batch.py [--items 300] [--latency 0.05] [--item-cost 0.002]
+"""
+import os
+import sys
+import argparse
+import threading
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'stubs'))
+
+from kronos_client import KronosClient
+from kronos_stub_server import make_server
+
+
+def make_request(bars=200):
+    data = [{
+        "timestamps": "2025-01-01 00:00:00",
+        "open": 10.0 + i * 0.01, "high": 10.1 + i * 0.01, "low": 9.9 + i * 0.01,
+        "close": 10.0 + i * 0.01, "volume": 10000.0,
+    } for i in range(bars)]
+    return {"predict_len": 1, "data": data}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Kronos 批量预测吞吐基准')
+    parser.add_argument('--items', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--item-cost', type=float, default=0.002)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--batch-sizes', type=int, nargs='*', default=[1, 8, 32, 128])
+    args = parser.parse_args()
+
+    server = make_server(port=0, latency=args.latency, item_cost=args.item_cost)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/predict"
+    predict_requests = [make_request() for _ in range(args.items)]
+
+    start = time.time()
+    for request in predict_requests:
+        requests.post(url, json=request, timeout=60).json()['prediction']
+    elapsed = time.time() - start
+    print(f"  serial: {elapsed:6.2f}s  {args.items / elapsed:7.1f} 条/秒")
+
+    for batch_size in args.batch_sizes:
+        client = KronosClient(url=url, batch_size=batch_size, concurrency=args.concurrency)
+        start = time.time()
+        results = client.predict_many(predict_requests)
+        elapsed = time.time() - start
+        failed = sum(1 for result in results if result is None)
+        print(f"batch={batch_size:<4d}: {elapsed:6.2f}s  {args.items / elapsed:7.1f} 条/秒  失败 {failed}")
+        client.close()
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
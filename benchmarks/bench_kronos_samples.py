@@ -0,0 +1,92 @@
+"""
+Kronos 多次采样基准
+
+在本进程内启动 stubs/kronos_stub_server.py 的桩服务，对 --candidates 只候选股票各预测 3 次（200 根日K线）：
+    repeat    改造前的写法，同一请求体在批量请求里重复 3 次
+    samples   KronosClient.predict_many(num_samples=3)，每只股票的请求体只发送一次
+    fallback  服务端忽略 num_samples（--no-samples），客户端退化为重复请求
+以及单只股票的 3 次采样：逐次调用 predict 3 次 vs predict(num_samples=3) 一次往返。
+
+输出耗时、HTTP请求数、服务端收到的请求体条数，并检查每只股票都拿到 3 个预测。
+
+用法: python benchmarks/bench_kronos_samples.py [--candidates 60] [--latency 0.05] [--item-cost 0.002]
+"""
+import os
+import sys
+import argparse
+import json
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+sys.path.insert(0, os.path.join(ROOT, 'stubs'))
+
+from bench_kronos_batch import make_request
+from kronos_client import KronosClient
+from kronos_stub_server import make_server
+
+SAMPLES = 3
+
+
+def start_server(args, no_samples=False):
+    server = make_server(port=0, latency=args.latency, item_cost=args.item_cost, no_samples=no_samples)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/predict"
+
+
+def well_formed(results):
+    return all(result is not None and len(result) == SAMPLES and all(sample for sample in result)
+               for result in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Kronos 多次采样基准')
+    parser.add_argument('--candidates', type=int, default=60)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--item-cost', type=float, default=0.002)
+    args = parser.parse_args()
+
+    predict_requests = [make_request() for _ in range(args.candidates)]
+    payload_kb = len(json.dumps(predict_requests[0])) / 1024
+    print(f"{args.candidates} 只候选股票 x {SAMPLES} 次采样，单个请求体 {payload_kb:.1f}KB:")
+
+    ok = True
+    for name, no_samples in (('repeat', False), ('samples', False), ('fallback', True)):
+        server, url = start_server(args, no_samples)
+        client = KronosClient(url=url)
+        start = time.perf_counter()
+        if name == 'repeat':
+            flat = client.predict_many([request for request in predict_requests for _ in range(SAMPLES)])
+            results = [flat[i * SAMPLES:(i + 1) * SAMPLES] for i in range(args.candidates)]
+        else:
+            results = client.predict_many(predict_requests, num_samples=SAMPLES)
+        elapsed = time.perf_counter() - start
+        ok = ok and well_formed(results)
+        print(f"  {name:>8}: {elapsed:6.3f}s  HTTP请求 {server.stats['requests']:3d} 次  "
+              f"请求体 {server.stats['items']:4d} 条（约 {server.stats['items'] * payload_kb:.0f}KB）")
+        client.close()
+        server.shutdown()
+
+    server, url = start_server(args)
+    client = KronosClient(url=url)
+    request = predict_requests[0]
+    start = time.perf_counter()
+    serial = [client.predict(request['data'], request['predict_len']) for _ in range(SAMPLES)]
+    serial_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    sampled = client.predict(request['data'], request['predict_len'], num_samples=SAMPLES)
+    sampled_elapsed = time.perf_counter() - start
+    ok = ok and well_formed([serial, sampled])
+    print(f"单只股票: predict x{SAMPLES} {serial_elapsed * 1000:6.1f}ms  "
+          f"predict(num_samples={SAMPLES}) {sampled_elapsed * 1000:6.1f}ms")
+    client.close()
+    server.shutdown()
+
+    print(f"一致性检查: {'通过' if ok else '失败'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+DeepSeek 应答缓存基准
+
+在本进程内启动 stubs/deepseek_stub_server.py 的桩服务，用与 PromptGenerator 格式相同、长度相近的提示词，
+对同一组 --prompts 个提示词依次运行：
+    cold    缓存为空，每次都请求桩服务
+    warm    同一缓存库再跑一遍，全部命中
+    replay  关闭桩服务后以 replay 模式新建 DeepSeekAPI，只读缓存
+
+检查三轮的应答完全一致、都能解析为 TradeDecision，并输出缓存库中记录的调用次数、token 和延迟统计。
+缓存库在临时目录中创建。
+
+用法: python benchmarks/bench_llm_cache.py [--prompts 50] [--latency 0.2]
+"""
+import os
+import sys
+import argparse
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'simulations'))
+sys.path.insert(0, os.path.join(ROOT, 'stubs'))
+
+from deepseek import DeepSeekAPI
+from deepseek_stub_server import make_server
+from llm_cache import LLMCache
+from simulations.stock_account_tplus1 import TradeDecision
+
+
+def make_prompt(index):
+    """约 4KB 的提示词：头部、60 行日K、64 行15分钟K线和账户摘要"""
+    cur_datetime = datetime(2025, 1, 2, 9, 30) + timedelta(minutes=15 * index)
+    header = (f"你是一个专业的短线股票操盘手，现在你在操盘股票测试,代码600000，"
+              f"当前时间是{cur_datetime:%Y-%m-%d %H:%M:%S}。\n")
+    daily = '\n'.join(f"{i:3d} 2024-10-{i % 28 + 1:02d} {10 + i * 0.01:.2f} {10.1 + i * 0.01:.2f} 10000"
+                      for i in range(60))
+    min15 = '\n'.join(f"{i:3d} {cur_datetime - timedelta(minutes=15 * (64 - i))} {10 + i * 0.001:.3f} 1000"
+                      for i in range(64))
+    return header + daily + '\n' + min15 + '\n你的账户情况:\n现金 100000.00\n只需要给出json，不要输出任何其它内容\n'
+
+
+def run_pass(api, prompts):
+    start = time.perf_counter()
+    responses = [api.ask_question(prompt) for prompt in prompts]
+    return time.perf_counter() - start, responses
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DeepSeek 应答缓存基准')
+    parser.add_argument('--prompts', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.2)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='bench_llm_cache_'))
+    os.environ['DEEPSEEK_API_KEY'] = 'stub'
+
+    server = make_server(port=0, latency=args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    prompts = [make_prompt(i) for i in range(args.prompts)]
+
+    cache = LLMCache('llm_cache.db')
+    api = DeepSeekAPI(url=url, cache=cache)
+    cold, cold_responses = run_pass(api, prompts)
+    warm, warm_responses = run_pass(api, prompts)
+    requests_before_replay = server.stats['requests']
+
+    server.shutdown()
+    server.server_close()
+    replay_api = DeepSeekAPI(url=url, cache=LLMCache('llm_cache.db'), cache_mode='replay')
+    replay, replay_responses = run_pass(replay_api, prompts)
+
+    ok = cold_responses == warm_responses == replay_responses and None not in cold_responses
+    if ok:
+        decisions = [TradeDecision.from_json(response) for response in replay_responses]
+        ok = all(decision.stock_code == '600000' for decision in decisions)
+
+    print(f"{args.prompts} 个提示词（约 {len(prompts[0]) / 1024:.1f}KB），桩服务延迟 {args.latency}s:")
+    print(f"  cold:   {cold:7.3f}s  {cold / args.prompts * 1000:8.2f}ms/次")
+    print(f"  warm:   {warm:7.3f}s  {warm / args.prompts * 1000:8.2f}ms/次")
+    print(f"  replay: {replay:7.3f}s  {replay / args.prompts * 1000:8.2f}ms/次")
+    print(f"  桩服务收到请求 {requests_before_replay} 次")
+    for name, item in cache.stats().items():
+        print(f"  {name:>4}: 调用 {item['calls']:4d} 次  token {item['total_tokens']:8d}  "
+              f"平均延迟 {item['avg_latency_ms']:8.2f}ms  最大 {item['max_latency_ms']:8.2f}ms")
+    print(f"一致性检查: {'通过' if ok else '失败'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
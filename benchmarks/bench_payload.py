@@ -0,0 +1,105 @@
+"""
+预测请求体构建基准
+
+对 200 根和 2000 根日K线的 DataFrame 对比构建并编码预测请求体的耗时：
+    iterrows  改造前的写法，逐行 iterrows + strftime + float()，再由 requests 用标准库 json 编码
+    columns   kline_payload.frame_to_bars 按列构建，kline_payload.dumps 编码（有 orjson 时用 orjson）
+    columnar  frame_to_columns 构建列式请求体并编码
+
+输出每种方式的平均耗时和请求体字节数，并检查前两种方式解码后的请求体逐项相同、列式请求体还原后也相同。
+
+用法: python benchmarks/bench_payload.py [--sizes 200 2000] [--repeat 200]
+"""
+import os
+import sys
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import kline_payload
+from kline_payload import frame_to_bars, frame_to_columns, columns_to_bars, dumps
+
+
+def make_frame(bars):
+    rng = np.random.default_rng(bars)
+    close = 10 + np.cumsum(rng.normal(0, 0.1, bars))
+    return pd.DataFrame({
+        'date': pd.bdate_range('2018-01-02', periods=bars),
+        'open': close + rng.normal(0, 0.05, bars), 'high': close + 0.1, 'low': close - 0.1, 'close': close,
+        'volume': rng.integers(100000, 10000000, bars), 'amount': close * 1000000,
+    })
+
+
+def iterrows_payload(df):
+    history_data_for_chart = []
+    for _, row in df.iterrows():
+        timestamp = row.get('timestamp', row.get('date', ''))
+        if hasattr(timestamp, 'strftime'):
+            timestamp_str = timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        else:
+            timestamp_str = str(timestamp)
+
+        history_data_for_chart.append({
+            "timestamps": timestamp_str,
+            "open": float(row.get('open', 0)),
+            "high": float(row.get('high', 0)),
+            "low": float(row.get('low', 0)),
+            "close": float(row.get('close', 0)),
+            "volume": float(row.get('volume', 0))
+        })
+    # requests 的 json= 参数使用标准库 json 编码
+    return json.dumps({"predict_len": 1, "data": history_data_for_chart}).encode('utf-8')
+
+
+def columns_payload(df):
+    return dumps({"predict_len": 1, "data": frame_to_bars(df)})
+
+
+def columnar_payload(df):
+    return dumps({"predict_len": 1, "columns": frame_to_columns(df)})
+
+
+def timeit(func, df, repeat):
+    func(df)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = func(df)
+    return (time.perf_counter() - start) / repeat * 1000, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description='预测请求体构建基准')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[200, 2000])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"JSON 编码: {'orjson' if kline_payload.orjson is not None else '标准库 json'}")
+    ok = True
+    for bars in args.sizes:
+        df = make_frame(bars)
+        repeat = max(args.repeat * 200 // bars, 10)
+        results = {name: timeit(func, df, repeat) for name, func in (
+            ('iterrows', iterrows_payload), ('columns', columns_payload), ('columnar', columnar_payload),
+        )}
+
+        baseline = json.loads(results['iterrows'][1])
+        ok = ok and json.loads(results['columns'][1]) == baseline
+        columnar = json.loads(results['columnar'][1])
+        ok = ok and columns_to_bars(columnar['columns']) == baseline['data']
+
+        print(f"{bars} 根K线:")
+        base_ms = results['iterrows'][0]
+        for name, (ms, body) in results.items():
+            print(f"  {name:>8}: {ms:8.3f}ms  {len(body) / 1024:7.1f}KB  加速比 {base_ms / ms:5.1f}x")
+
+    print(f"一致性检查: {'通过' if ok else '失败'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+选股前3步筛选基准：逐只判断 vs 向量化
+
+合成 --stocks 只股票的日K线和上个交易日/当前交易日的预测数据（预测收盘价在实际收盘价上下随机浮动），
+其中少数股票缺少上个交易日的K线（停牌）。按 pick_up_stock(pick_date=...) 的前3步筛选：
+    loop    改造前的写法，每只股票逐次 get_daily_kline / get_predict_daily_data，标量判断预测是否准确
+    vector  StockPicker._screen_candidates，批量读取后对全部股票一次计算
+
+输出两种方式的耗时，并检查两者筛选出的候选股票完全一致。所有预测数据都已存在，不会请求预测服务。
+数据库在临时目录中创建。
+
+用法: python benchmarks/bench_pick_screen.py [--stocks 1800] [--days 60]
+"""
+import os
+import sys
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pick_stock import StockPicker
+from stock_data_fetcher import StockDataFetcher
+from stock_db import StockDB
+from stock_tools import StockTools
+
+
+def make_stock_bars(days, seed):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2021-01-04', periods=days)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+    open_ = close * (1 + rng.normal(0, 0.01, days))
+    return pd.DataFrame({
+        'date': dates,
+        'open': open_, 'high': np.maximum(open_, close) * 1.01, 'low': np.minimum(open_, close) * 0.99,
+        'close': close, 'volume': np.full(days, 1000000, dtype=np.int64), 'amount': close * 1000000,
+    })
+
+
+def is_right_predict(fetcher, tools, stock_code, p_data, data, date):
+    """改造前 StockPicker._is_right_predict 的逐只写法"""
+    prev_date = tools.get_trading_day(date, -1)
+    prev_data = fetcher.get_daily_kline(stock_code, prev_date, prev_date)
+
+    try:
+        prev_close = prev_data['close'].iloc[0]
+        p_close = p_data['close'].iloc[0]
+        data_close = data['close'].iloc[0]
+        data_open = data['open'].iloc[0]
+
+        rate = (data_close - prev_close) / prev_close
+        p_rate = (p_close - prev_close) / prev_close
+        rate_today = (data_close - data_open) / data_open
+
+        if rate > 0.09:
+            return False, False
+        if rate * p_rate * rate_today > 0:
+            if abs(rate - p_rate) < 0.01:
+                return True, rate > 0
+        return False, rate > 0
+    except Exception:
+        return False, False
+
+
+def screen_loop(stock_codes, last_date, current_date):
+    fetcher = StockDataFetcher()
+    db = StockDB()
+    tools = StockTools()
+    candidates = []
+    for stock_code in stock_codes:
+        lastdate_data = fetcher.get_daily_kline(stock_code, last_date, last_date)
+        lastdate_p_data = db.get_predict_daily_data(stock_code, last_date)
+        right, is_last_raise = is_right_predict(fetcher, tools, stock_code, lastdate_p_data, lastdate_data, last_date)
+        if not right:
+            continue
+
+        current_data = fetcher.get_daily_kline(stock_code, current_date, current_date)
+        curdate_p_data = db.get_predict_daily_data(stock_code, current_date)
+        right, is_current_raise = is_right_predict(fetcher, tools, stock_code, curdate_p_data, current_data,
+                                                   current_date)
+        if not right or is_current_raise != is_last_raise:
+            continue
+        candidates.append(stock_code)
+    return candidates
+
+
+def main():
+    parser = argparse.ArgumentParser(description='选股前3步筛选基准')
+    parser.add_argument('--stocks', type=int, default=1800)
+    parser.add_argument('--days', type=int, default=60)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='bench_pick_screen_'))
+    db = StockDB()
+    tools = StockTools()
+    stock_codes = [f"{600000 + i}" for i in range(args.stocks)]
+
+    bars = make_stock_bars(args.days, 0)
+    current_date = tools.get_trading_day(bars['date'].iloc[-1].strftime('%Y-%m-%d'), 0)
+    if current_date != bars['date'].iloc[-1].strftime('%Y-%m-%d'):
+        current_date = tools.get_trading_day(current_date, -1)
+    last_date = tools.get_trading_day(current_date, -1)
+    predict_date = tools.get_trading_day(current_date, 1)
+
+    rng = np.random.default_rng(1)
+    predictions = []
+    for seed, stock_code in enumerate(stock_codes):
+        daily = make_stock_bars(args.days, seed)
+        if seed % 100 == 7:
+            # 停牌：缺少上个交易日的K线
+            daily = daily[daily['date'] != pd.Timestamp(last_date)]
+        db.save_daily_data(stock_code, daily)
+        db.add_daily_coverage(stock_code, daily['date'].iloc[0].strftime('%Y-%m-%d'), current_date)
+
+        closes = daily.set_index('date')['close']
+        for date in (last_date, current_date):
+            close = closes.get(pd.Timestamp(date))
+            if close is None:
+                close = closes.iloc[-1]
+            p_close = float(close * (1 + rng.normal(0, 0.01)))
+            predictions.append((stock_code, date, {'open': p_close, 'high': p_close, 'low': p_close, 'close': p_close}))
+    for stock_code, date, prediction in predictions:
+        db.save_predict_daily_data(stock_code, date, prediction)
+
+    start = time.perf_counter()
+    loop_candidates = screen_loop(stock_codes, last_date, current_date)
+    loop_elapsed = time.perf_counter() - start
+
+    picker = StockPicker()
+    start = time.perf_counter()
+    vector_candidates, current_rows = picker._screen_candidates(stock_codes, last_date, current_date, predict_date)
+    vector_elapsed = time.perf_counter() - start
+
+    ok = loop_candidates == vector_candidates and list(current_rows.index) == vector_candidates
+    print(f"{args.stocks} 只股票，上个交易日 {last_date}，当前交易日 {current_date}，候选 {len(vector_candidates)} 只:")
+    print(f"    loop: {loop_elapsed:7.3f}s")
+    print(f"  vector: {vector_elapsed:7.3f}s  加速比 {loop_elapsed / vector_elapsed:.1f}x")
+    print(f"一致性检查: {'通过' if ok else '失败'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+组合回测基准
+
+1. 一致性：只有一只股票时（250个交易日），PortfolioSimulation 与 StockSimulation 的成交列表和回测结果一致
+   （网格V1/V2/V3，chunk_days=7 以覆盖跨分段切换 BarView）
+2. 规模：--stocks 只股票共用一个账户跑网格V1，输出总耗时、每个时钟tick的耗时，
+   以及不同 chunk_days 下 tracemalloc 统计的内存峰值
+
+数据库和日志在临时目录中创建。
+
+用法: python benchmarks/bench_portfolio.py [--stocks 10 100 300] [--days 60]
+"""
+import os
+import sys
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'simulations'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from bench_column_store import make_daily_bars
+from parity_grid_engine import make_min15_bars
+from stock_db import StockDB
+from simulations.portfolio_simulation import PortfolioSimulation
+from simulations.stock_simulation import StockSimulation
+from simulations.stock_strategy_gird_v1 import StockStrategyGridV1
+from simulations.stock_strategy_gird_v2 import StockStrategyGridV2
+from simulations.stock_strategy_gird_v3 import StockStrategyGridV3
+
+
+def save_stocks(stock_codes, days):
+    db = StockDB()
+    daily = make_daily_bars(days)
+    for seed, stock_code in enumerate(stock_codes):
+        db.save_daily_data(stock_code, daily)
+        db.save_min_data(stock_code, '15', make_min15_bars(days, seed, 0.002))
+    return daily['date'].iloc[0].to_pydatetime(), daily['date'].iloc[-1].to_pydatetime()
+
+
+def check_parity(days):
+    stock_code = '600000'
+    start_date, end_date = save_stocks([stock_code], days)
+    ok = True
+    for strategy_class in (StockStrategyGridV1, StockStrategyGridV2, StockStrategyGridV3):
+        with contextlib.redirect_stdout(io.StringIO()):
+            single = StockSimulation(stock_code, stock_code, start_date, end_date, strategy_class(), log_mode='none')
+            single_result = single.run()
+            portfolio = PortfolioSimulation([{'stock_code': stock_code}], start_date, end_date, strategy_class,
+                                            log_mode='none', chunk_days=7)
+            portfolio_result = portfolio.run()
+        single_trades = [(d.datetime, d.action, d.price, d.quantity) for d in single.account.trade_history]
+        portfolio_trades = [(d.datetime, d.action, d.price, d.quantity) for d in portfolio.account.trade_history]
+        same = single_trades == portfolio_trades and single_result == portfolio_result
+        ok = ok and same
+        print(f"  {strategy_class.__name__}: 成交 {len(single_trades)}/{len(portfolio_trades)} 笔  {'一致' if same else '不一致'}")
+    return ok
+
+
+def bench_scale(count, days, chunk_days_list):
+    stock_codes = [f"{610000 + i}" for i in range(count)]
+    start_date, end_date = save_stocks(stock_codes, days)
+    stocks = [{'stock_code': stock_code} for stock_code in stock_codes]
+
+    for chunk_days in chunk_days_list:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            simulation = PortfolioSimulation(stocks, start_date, end_date, StockStrategyGridV1,
+                                             initial_cash=10000 * count, log_mode='none', chunk_days=chunk_days)
+            simulation.run()
+            elapsed = time.perf_counter() - start
+        stats = simulation.tick_stats()
+
+        # tracemalloc 会显著拖慢执行，内存单独跑一轮统计
+        tracemalloc.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            PortfolioSimulation(stocks, start_date, end_date, StockStrategyGridV1,
+                                initial_cash=10000 * count, log_mode='none', chunk_days=chunk_days).run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"  {count:4d} 只 chunk_days={chunk_days:3d}: {elapsed:6.2f}s  tick {stats['ticks']} 个  "
+              f"平均 {stats['mean_ms']:7.3f}ms  p99 {stats['p99_ms']:7.3f}ms  "
+              f"成交 {len(simulation.account.trade_history):5d} 笔  内存峰值 {peak / 1e6:6.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='组合回测基准')
+    parser.add_argument('--stocks', type=int, nargs='+', default=[10, 100, 300])
+    parser.add_argument('--days', type=int, default=60)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='bench_portfolio_'))
+
+    print("单只股票与 StockSimulation 对比（250 个交易日）:")
+    ok = check_parity(250)
+
+    print(f"组合回测（{args.days} 个交易日）:")
+    for count in args.stocks:
+        bench_scale(count, args.days, (5, args.days))
+
+    print(f"一致性检查: {'通过' if ok else '失败'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
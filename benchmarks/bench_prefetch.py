@@ -0,0 +1,110 @@
+"""
+并发预取基准
+
+用模拟的新浪日线接口（固定延迟 + 失败率）对比两种预取方式，上游平均请求速率相同：
+    serial    改造前的逐只下载，每次请求后 sleep 1/rate 秒
+    prefetch  StockPrefetcher 线程池 + 令牌桶限流 + 失败重试
+
+输出总耗时、实际请求速率和失败股票数。数据库在临时目录中创建，不影响工作目录。
+
+用法: python benchmarks/bench_prefetch.py [--stocks 60] [--rate 10] [--latency 0.3] [--fail-rate 0.05]
+"""
+import os
+import sys
+import argparse
+import random
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_akshare import StockAKShare
+from stock_data_fetcher import StockDataFetcher
+from stock_prefetch import StockPrefetcher
+from stock_rate_limit import configure_limiter, get_limiter
+
+
+class SimulatedSina:
+    """模拟上游：每次请求固定延迟，按概率返回空数据（与接口异常时 StockAKShare 的返回一致）"""
+
+    def __init__(self, latency, fail_rate):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.request_times = []
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+
+    def get_daily_kline_from_api_sina(self, stock_code, start_date, end_date, adjust='qfq', sleep_time=0):
+        get_limiter('sina').acquire()
+        with self._lock:
+            self.request_times.append(time.monotonic())
+            failed = self._random.random() < self.fail_rate
+        time.sleep(self.latency)
+        if sleep_time > 0:
+            time.sleep(sleep_time)
+        if failed:
+            return pd.DataFrame()
+
+        dates = pd.bdate_range(pd.to_datetime(start_date), pd.to_datetime(end_date))
+        close = 10 + np.arange(len(dates)) * 0.01
+        return pd.DataFrame({
+            'date': dates, 'open': close, 'high': close + 0.1, 'low': close - 0.1, 'close': close,
+            'volume': 10000, 'amount': close * 10000,
+        })
+
+    def rate(self):
+        times = self.request_times
+        if len(times) < 2:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+
+def run_serial(stock_codes, date, rate):
+    fetcher = StockDataFetcher()
+    failed = 0
+    for stock_code in stock_codes:
+        if fetcher.get_daily_kline(stock_code, date, date, sleep_time=1 / rate).empty:
+            failed += 1
+    return failed
+
+
+def run_prefetch(stock_codes, date, workers):
+    results = StockPrefetcher(max_workers=workers, backoff=0.2).prefetch(stock_codes, date, date)
+    return sum(1 for success in results.values() if not success)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='并发预取基准')
+    parser.add_argument('--stocks', type=int, default=60)
+    parser.add_argument('--rate', type=float, default=10, help='上游允许的每秒请求数')
+    parser.add_argument('--latency', type=float, default=0.3, help='模拟的单次请求延迟（秒）')
+    parser.add_argument('--fail-rate', type=float, default=0.05)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    date = '2025-06-02'
+    os.chdir(tempfile.mkdtemp(prefix='bench_prefetch_'))
+
+    for name, runner, first_code in (
+        ('serial', run_serial, 600000),
+        ('prefetch', run_prefetch, 0),
+    ):
+        # 两种方式使用不同的股票代码和独立的令牌桶，都从空数据库开始全量下载
+        stock_codes = [f"{first_code + i:06d}" for i in range(args.stocks)]
+        configure_limiter('sina', args.rate, burst=1)
+        upstream = SimulatedSina(args.latency, args.fail_rate)
+        StockAKShare.get_daily_kline_from_api_sina = upstream.get_daily_kline_from_api_sina
+
+        start = time.time()
+        failed = runner(stock_codes, date, args.rate if name == 'serial' else args.workers)
+        elapsed = time.time() - start
+        print(f"{name:>8}: {elapsed:6.2f}s  请求 {len(upstream.request_times):4d} 次  "
+              f"实际速率 {upstream.rate():5.2f}/s  失败 {failed} 只")
+
+
+if __name__ == '__main__':
+    main()
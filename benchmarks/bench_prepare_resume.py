@@ -0,0 +1,145 @@
+"""
+prepare_stock 中断续跑检查
+
+模拟的新浪日线接口（固定延迟）+ 本进程内的 Kronos 桩服务，对 --stocks 只股票执行 prepare_stock 三次：
+    第1次  下载到 40% 的股票时中断（/stop_prepare 的效果）
+    第2次  下载完剩余股票，批量预测完第一组后中断
+    第3次  从台账恢复，完成剩余预测
+
+检查每只股票只下载一次日K线、每个 (股票, 日期) 只预测一次（中断时已在途的请求除外）、
+第3次结束时进度计数恰好等于总数、任务台账中全部股票两个阶段都为 done。
+数据库在临时目录中创建。
+
+用法: python benchmarks/bench_prepare_resume.py [--stocks 100] [--latency 0.01]
+"""
+import os
+import sys
+import argparse
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'stubs'))
+
+os.environ['KRONOS_BATCH_SIZE'] = '8'
+os.environ['KRONOS_CONCURRENCY'] = '2'
+
+from kronos_stub_server import make_server
+
+server = make_server(port=0, latency=0.01, item_cost=0.0)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+os.environ['KRONOS_PREDICT_URL'] = f"http://127.0.0.1:{server.server_address[1]}/predict"
+
+from pick_stock import StockPicker, PREPARE_JOB_PREFIX
+from stock_akshare import StockAKShare
+from stock_db import StockDB
+from stock_rate_limit import configure_limiter
+
+
+class SimulatedSina:
+    """模拟上游：固定延迟，返回区间内每个工作日的K线；请求满 interrupt_after 次后触发 on_interrupt"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.requests = {}
+        self.interrupt_after = None
+        self.on_interrupt = None
+        self._lock = threading.Lock()
+
+    def get_daily_kline_from_api_sina(self, stock_code, start_date, end_date, adjust='qfq', sleep_time=0):
+        time.sleep(self.latency)
+        with self._lock:
+            self.requests[stock_code] = self.requests.get(stock_code, 0) + 1
+            if self.interrupt_after is not None and sum(self.requests.values()) >= self.interrupt_after:
+                self.interrupt_after = None
+                self.on_interrupt()
+
+        dates = pd.bdate_range(pd.to_datetime(start_date), pd.to_datetime(end_date))
+        close = 10 + np.arange(len(dates)) * 0.01
+        return pd.DataFrame({
+            'date': dates, 'open': close, 'high': close + 0.1, 'low': close - 0.1, 'close': close,
+            'volume': 10000, 'amount': close * 10000,
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='prepare_stock 中断续跑检查')
+    parser.add_argument('--stocks', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.01)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='bench_prepare_resume_'))
+    db = StockDB()
+    stock_codes = [f"{600000 + i}" for i in range(args.stocks)]
+    db.save_stock_info(pd.DataFrame({'stock_code': stock_codes, 'stock_name': stock_codes}), 'hs300')
+
+    configure_limiter('sina', 1000, burst=100)
+    upstream = SimulatedSina(args.latency)
+    StockAKShare.get_daily_kline_from_api_sina = upstream.get_daily_kline_from_api_sina
+
+    picker = StockPicker()
+    predicted = {}
+    save_predict = picker._db.save_predict_daily_data
+    predict_many = picker._kronos.predict_many
+    interrupt_after_group = [False]
+
+    def counting_save_predict(stock_code, predict_date, predict_data):
+        predicted[(stock_code, predict_date)] = predicted.get((stock_code, predict_date), 0) + 1
+        return save_predict(stock_code, predict_date, predict_data)
+
+    def interrupting_predict_many(predict_requests, on_done=None):
+        results = predict_many(predict_requests, on_done)
+        if interrupt_after_group[0]:
+            interrupt_after_group[0] = False
+            picker.interrupt_prepare = True
+        return results
+
+    picker._db.save_predict_daily_data = counting_save_predict
+    picker._kronos.predict_many = interrupting_predict_many
+
+    def stop():
+        picker.interrupt_prepare = True
+
+    runs = []
+    upstream.interrupt_after, upstream.on_interrupt = int(args.stocks * 0.4), stop
+    for run in range(3):
+        if run == 1:
+            interrupt_after_group[0] = True
+        start = time.perf_counter()
+        picker.prepare_stock()
+        runs.append((time.perf_counter() - start, picker.prepare_count, picker.prepare_total_count))
+
+    job_id = db._get_conn().execute('SELECT DISTINCT job_id FROM job_ledger').fetchone()[0]
+    fetch_status = db.get_job_status(job_id, 'fetch')
+    predict_status = db.get_job_status(job_id, 'predict')
+
+    for run, (elapsed, count, total) in enumerate(runs, 1):
+        print(f"第{run}次: {elapsed:6.2f}s  进度 {count}/{total}")
+    requests = sum(upstream.requests.values())
+    extra = requests - args.stocks
+    repeated = sum(count - 1 for count in predicted.values())
+    print(f"日K线请求 {requests} 次（重复 {extra} 次，中断时在途）  "
+          f"预测 {sum(predicted.values())} 条（重复 {repeated} 条）")
+    print(f"任务台账 {job_id}: 下载完成 {sum(s == 'done' for s in fetch_status.values())} 只  "
+          f"预测完成 {sum(s == 'done' for s in predict_status.values())} 只")
+
+    ok = (
+        job_id.startswith(PREPARE_JOB_PREFIX)
+        and runs[-1][1] == runs[-1][2]
+        and all(fetch_status.get(code) == 'done' for code in stock_codes)
+        and all(predict_status.get(code) == 'done' for code in stock_codes)
+        and 0 <= extra <= 8
+        and repeated == 0
+        and len(predicted) == args.stocks * 2
+    )
+    print(f"一致性检查: {'通过' if ok else '失败'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
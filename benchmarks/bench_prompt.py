@@ -0,0 +1,164 @@
+"""
+提示词构建基准：改造前的 PromptGenerator vs 增量 PromptGenerator
+
+在合成行情上按回测的16个决策时刻连续构建提示词（DAYLI_KLINE_DAYS=60，MIN15_KLINE_DAYS=5），输出：
+    - 每次构建的耗时（平均、p50、p99）
+    - 提示词的平均字符数和UTF-8字节数（token数近似与之成正比）
+并检查增量窗口中的K线与每次重新查询数据库得到的K线完全一致。
+
+数据库在临时目录中创建。
+
+用法: python benchmarks/bench_prompt.py [--days 100]
+"""
+import os
+import sys
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'simulations'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+os.environ['DAYLI_KLINE_DAYS'] = '60'
+os.environ['MIN15_KLINE_DAYS'] = '5'
+
+import numpy as np
+
+from bench_column_store import make_daily_bars
+from parity_grid_engine import make_min15_bars
+from stock_data_fetcher import StockDataFetcher
+from stock_db import StockDB
+from stock_tools import StockTools
+from simulations.prompt import PromptGenerator, render_bars
+from simulations.stock_account_tplus1 import TPlusOneStockAccount, TradeDecision
+
+DECISION_TIMES = ["09:30", "09:45", "10:00", "10:15", "10:30", "10:45", "11:00", "11:15",
+                  "13:00", "13:15", "13:30", "13:45", "14:00", "14:15", "14:30", "14:45"]
+
+
+class LegacyPromptGenerator:
+    """改造前的写法：每个tick重新查询两段K线并用 DataFrame.to_string() 渲染"""
+
+    def __init__(self):
+        self.daily_kline_days = int(os.environ.get("DAYLI_KLINE_DAYS"))
+        self.min15_kline_days = int(os.environ.get("MIN15_KLINE_DAYS"))
+
+    def generate_prompt(self, stock_name, stock_code, account, current_datetime):
+        prompt_header = f"你是一个专业的短线股票操盘手，擅长日内盘，做T或反T，现在你在操盘股票{stock_name},代码{stock_code}，当前时间是{current_datetime}。\n"
+        prompt_header += f"你操作的是中国大陆A股市场，是T+1的市场，今日买入明日才能卖出，手续费买入卖出为5元，印花税万分之5\n"
+        fetcher = StockDataFetcher()
+
+        daily_start_time = (current_datetime - timedelta(days=self.daily_kline_days)).strftime("%Y-%m-%d")
+        daily_end_time = current_datetime.strftime("%Y-%m-%d")
+        daily_data = fetcher.get_daily_kline(stock_code, daily_start_time, daily_end_time)
+
+        min15_start_time = (current_datetime - timedelta(days=self.min15_kline_days)).strftime("%Y-%m-%d")
+        min15_end_time = current_datetime.strftime("%Y-%m-%d %H:%M:%S")
+        min15_data = fetcher.get_min_kline(stock_code, "15", min15_start_time, min15_end_time, realtime=True)
+
+        daily_data_str = "这只股票近期的日K线数据:\n" + daily_data.to_string() + "\n"
+        min15_data_str = "这只股票近期的15分钟K线数据:\n" + min15_data.to_string() + "\n"
+
+        current_price = min15_data['close'].iloc[-1]
+        current_prices = {stock_code: current_price}
+        account_prompt = "你的账户情况:\n" + account.get_portfolio_summary(current_prices)
+        history_prompt = "你的历史操作与说明:\n" + account.get_recent_decisions_summary()
+
+        prompt_end = " 请根据以上信息，给出你的操作建议。输出格式为json，包含以下字段：\n"
+        prompt_end += "datetime 操作时间格式%Y-%m-%d %H:%M:%S\n"
+        prompt_end += "action, 操作buy/sell/none\n"
+        prompt_end += "stock_code 股票代码\n"
+        prompt_end += "price 买入或者卖出价格,如果操作为none为0\n"
+        prompt_end += "quantity 买入卖出手数，必须为100的倍数\n"
+        prompt_end += "reason 操作的原因，50字以内\n"
+        prompt_end += "stop_loss 止损价格, take_profit 止盈价格，买入必须给，如果是反T操作则按照做空给出止损和止盈价格\n"
+        prompt_end += "交易可能有1-2分钟延迟，请买入或者卖出价格时候请注意留余量\n"
+        prompt_end += "只需要给出json，不要输出任何其它内容\n"
+
+        return prompt_header + daily_data_str + min15_data_str + account_prompt + history_prompt + prompt_end
+
+
+def make_account():
+    account = TPlusOneStockAccount(100000)
+    decision = TradeDecision(datetime(2021, 1, 4, 9, 30), 'buy', '600000', 10.0, 1000, '建仓', 9.5, 11.0)
+    account.buy('600000', 10.0, 1000, decision)
+    account.next_trading_day()
+    return account
+
+
+def decision_datetimes(first_day, last_day):
+    for day in StockTools().trading_days_between(first_day, last_day).astype(datetime):
+        for hhmm in DECISION_TIMES:
+            hour, minute = map(int, hhmm.split(':'))
+            yield datetime(day.year, day.month, day.day, hour, minute)
+
+
+def expected_sections(fetcher, generator, stock_code, cur_datetime):
+    """每次重新查询数据库得到的两段K线CSV"""
+    daily = fetcher.get_daily_kline(stock_code,
+                                    (cur_datetime - timedelta(days=generator.daily_kline_days)).strftime("%Y-%m-%d"),
+                                    cur_datetime.strftime("%Y-%m-%d"))
+    min15 = fetcher.get_min_kline(stock_code, "15",
+                                  (cur_datetime - timedelta(days=generator.min15_kline_days)).strftime("%Y-%m-%d"),
+                                  cur_datetime.strftime("%Y-%m-%d %H:%M:%S"), realtime=True)
+    return ["\n".join(row[1] for row in render_bars(daily, 'date', '%Y-%m-%d')) + "\n",
+            "\n".join(row[1] for row in render_bars(min15, 'datetime', '%Y-%m-%d %H:%M')) + "\n"]
+
+
+def bench(generator, stock_code, account, datetimes):
+    times = []
+    sizes = []
+    for cur_datetime in datetimes:
+        start = time.perf_counter()
+        prompt = generator.generate_prompt('测试', stock_code, account, cur_datetime)
+        times.append(time.perf_counter() - start)
+        sizes.append((len(prompt), len(prompt.encode('utf-8'))))
+    times = np.array(times) * 1000
+    sizes = np.array(sizes)
+    return times, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='提示词构建基准')
+    parser.add_argument('--days', type=int, default=100, help='构建提示词的交易日数')
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='bench_prompt_'))
+    stock_code = '600000'
+    # 前 100 个交易日作为日K回看窗口，避免首个tick触发下载
+    total_days = args.days + 100
+    daily = make_daily_bars(total_days)
+    db = StockDB()
+    db.save_daily_data(stock_code, daily)
+    db.save_min_data(stock_code, '15', make_min15_bars(total_days, 0, 0.002))
+    first_day = daily['date'].iloc[100].to_pydatetime()
+    last_day = daily['date'].iloc[-1].to_pydatetime()
+    datetimes = list(decision_datetimes(first_day, last_day))
+    account = make_account()
+
+    print(f"{len(datetimes)} 次构建（{args.days} 个交易日）:")
+    for name, generator in (('legacy', LegacyPromptGenerator()), ('incremental', PromptGenerator())):
+        times, sizes = bench(generator, stock_code, account, datetimes)
+        print(f"  {name:>11}: 平均 {times.mean():7.3f}ms  p50 {np.percentile(times, 50):7.3f}ms  "
+              f"p99 {np.percentile(times, 99):7.3f}ms  字符 {sizes[:, 0].mean():7.0f}  字节 {sizes[:, 1].mean():7.0f}")
+
+    # 增量窗口中的K线必须与每次重新查询的结果一致
+    fetcher = StockDataFetcher()
+    generator = PromptGenerator()
+    ok = True
+    for cur_datetime in datetimes:
+        prompt = generator.generate_prompt('测试', stock_code, account, cur_datetime)
+        daily_text, min15_text = expected_sections(fetcher, generator, stock_code, cur_datetime)
+        if daily_text not in prompt or min15_text not in prompt:
+            ok = False
+            print(f"  {cur_datetime} K线不一致")
+            break
+    print(f"一致性检查: {'通过' if ok else '失败'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
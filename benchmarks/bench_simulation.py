@@ -0,0 +1,80 @@
+"""
+回测决策吞吐基准
+
+用合成的一年日K线和15分钟K线跑 StockStrategyGridV1 回测，对比：
+    fetcher   改造前的逐次查询：每个决策时刻 get_price / is_trade_success 各新建 StockDB 并查询 SQLite
+    barview   BarView 预加载：回测区间的K线一次性读入 NumPy 数组，按时间索引查询
+
+输出每秒决策次数。数据库和日志在临时目录中创建。
+
+用法: python benchmarks/bench_simulation.py [--days 250]
+"""
+import os
+import sys
+import argparse
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'simulations'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from bench_column_store import make_daily_bars, make_min15_bars
+from stock_db import StockDB
+from stock_data_fetcher import StockDataFetcher
+from simulations.stock_simulation import StockSimulation
+from simulations.stock_strategy_gird_v1 import StockStrategyGridV1
+
+
+class CountingStrategy(StockStrategyGridV1):
+    """统计 make_decision 调用次数的网格策略"""
+
+    def __init__(self):
+        super().__init__()
+        self.decisions = 0
+
+    def make_decision(self, stock_name, stock_code, account, cur_datetime):
+        self.decisions += 1
+        return super().make_decision(stock_name, stock_code, account, cur_datetime)
+
+
+def run(stock_code, start_date, end_date, use_bar_view):
+    strategy = CountingStrategy()
+    simulation = StockSimulation(stock_code, stock_code, start_date, end_date, strategy, log_dir_path='./log')
+    if not use_bar_view:
+        # 还原改造前的查询路径
+        simulation._bars = StockDataFetcher()
+        strategy._fetcher = StockDataFetcher()
+
+    start = time.perf_counter()
+    result = simulation.run()
+    return strategy.decisions, time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='回测决策吞吐基准')
+    parser.add_argument('--days', type=int, default=250)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='bench_simulation_'))
+    stock_code = '600000'
+    daily = make_daily_bars(args.days)
+    db = StockDB()
+    db.save_daily_data(stock_code, daily)
+    db.save_min_data(stock_code, '15', make_min15_bars(args.days))
+    db.save_min_data(stock_code, '5', make_min15_bars(args.days))
+
+    start_date = daily['date'].iloc[0].to_pydatetime()
+    end_date = daily['date'].iloc[-1].to_pydatetime()
+
+    results = {}
+    for name, use_bar_view in (('fetcher', False), ('barview', True)):
+        decisions, elapsed, results[name] = run(stock_code, start_date, end_date, use_bar_view)
+        print(f"{name:>8}: {decisions} 次决策 {elapsed:6.2f}s  {decisions / elapsed:9,.0f} 次/秒")
+
+    print(f"回测结果一致: {results['fetcher'] == results['barview']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+回测日志开销基准
+
+用高频成交的网格策略（1个1%的网格）在不同长度的均值回归合成行情上跑 StockSimulation，对比四种日志方式的耗时：
+    legacy  改造前：每行日志重新打开文本文件，每笔成交读入整个决策JSON、追加一条后整体重写
+    full    SimulationLog：单一句柄缓冲写入 JSONL，结束时整理为原格式JSON
+    jsonl   SimulationLog：只写 JSONL
+    none    不写日志，也不格式化每个tick的仓位信息
+
+legacy 的耗时随成交笔数平方增长，其它方式线性增长。数据库和日志在临时目录中创建。
+
+用法: python benchmarks/bench_simulation_log.py [--days 60 250 1000]
+"""
+import os
+import sys
+import argparse
+import json
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'simulations'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import numpy as np
+import pandas as pd
+
+from bench_column_store import make_daily_bars
+from parity_grid_engine import BAR_TIMES
+from stock_db import StockDB
+from simulations.bar_view import BarView
+from simulations.stock_simulation import StockSimulation
+from simulations.stock_strategy_gird_v1 import StockStrategyGridV1
+
+
+def make_min15_bars(days):
+    """围绕10元均值回归的15分钟K线，网格策略持续双向成交而不会清仓"""
+    rng = np.random.default_rng(0)
+    sessions = pd.bdate_range('2021-01-04', periods=days)
+    offsets = pd.to_timedelta([f"{h}:{m}:00" for h, m in BAR_TIMES])
+    datetimes = (sessions.values[:, None] + offsets.values[None, :]).ravel()
+    deviation = np.zeros(len(datetimes))
+    noise = rng.normal(0, 0.01, len(datetimes))
+    for i in range(1, len(datetimes)):
+        deviation[i] = 0.95 * deviation[i - 1] + noise[i]
+    close = (10 * np.exp(deviation)).round(3)
+    return pd.DataFrame({
+        'datetime': datetimes, 'open': close, 'high': close + 0.05, 'low': close - 0.05, 'close': close,
+        'volume': np.full(len(datetimes), 10000, dtype=np.int64),
+    })
+
+
+class LegacyLog:
+    """改造前的日志写法"""
+
+    enabled = True
+
+    def __init__(self, log_file, decision_file, simulation_info):
+        self.log_file = log_file
+        self.decision_file = decision_file
+        self.jsonl_file = decision_file
+        with open(self.log_file, 'w', encoding='utf-8'):
+            pass
+        with open(self.decision_file, 'w', encoding='utf-8') as f:
+            json.dump({"simulation_info": simulation_info, "decisions": []}, f, ensure_ascii=False, indent=2)
+
+    def write(self, text):
+        with open(self.log_file, 'a', encoding='utf-8') as f:
+            f.write(text)
+
+    def message(self, message, to_console=False):
+        log_entry = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}"
+        if to_console:
+            print(log_entry)
+        with open(self.log_file, 'a', encoding='utf-8') as f:
+            f.write(log_entry + '\n')
+
+    def decision(self, record):
+        with open(self.decision_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        data["decisions"].append(record)
+        with open(self.decision_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def close(self):
+        pass
+
+
+class LegacySimulation(StockSimulation):
+    def _setup_logging(self):
+        self._log = LegacyLog(self.log_file, self.decision_file, {"name": self.simluation_name})
+
+
+class FineGridStrategy(StockStrategyGridV1):
+    def __init__(self):
+        super().__init__()
+        self._grid_size = [0.01]
+
+
+def run(mode, stock_code, start_date, end_date, bar_view):
+    simulation_class = LegacySimulation if mode == 'legacy' else StockSimulation
+    log_mode = 'full' if mode == 'legacy' else mode
+    # 回测结束时的控制台汇总输出不计入比较
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        start = time.perf_counter()
+        simulation = simulation_class(stock_code, stock_code, start_date, end_date, FineGridStrategy(),
+                                      log_dir_path=f'./log/{mode}', bar_view=bar_view, log_mode=log_mode)
+        result = simulation.run()
+        elapsed = time.perf_counter() - start
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    return elapsed, len(simulation.account.trade_history), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='回测日志开销基准')
+    parser.add_argument('--days', type=int, nargs='+', default=[60, 250, 1000])
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='bench_simulation_log_'))
+    db = StockDB()
+    modes = ('legacy', 'full', 'jsonl', 'none')
+
+    print(f"{'交易日':>6} {'成交':>6} " + ' '.join(f"{mode:>9}" for mode in modes))
+    for days in args.days:
+        stock_code = f"{600000 + days}"
+        daily = make_daily_bars(days)
+        min_bars = make_min15_bars(days)
+        db.save_daily_data(stock_code, daily)
+        db.save_min_data(stock_code, '15', min_bars)
+        start_date = daily['date'].iloc[0].to_pydatetime()
+        end_date = daily['date'].iloc[-1].to_pydatetime()
+        bar_view = BarView(stock_code, start_date, end_date)
+
+        timings = []
+        results = set()
+        for mode in modes:
+            elapsed, trades, result = run(mode, stock_code, start_date, end_date, bar_view)
+            timings.append(elapsed)
+            results.add(result)
+        print(f"{days:>6} {trades:>6} " + ' '.join(f"{elapsed:8.2f}s" for elapsed in timings)
+              + ('' if len(results) == 1 else '  回测结果不一致!'))
+
+
+if __name__ == '__main__':
+    main()
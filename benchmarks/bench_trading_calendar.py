@@ -0,0 +1,81 @@
+"""
+交易日历微基准
+
+对比逐日遍历 chinese_calendar 的旧 get_trading_day（每次新建 StockTools，缓存随实例丢弃）
+与进程级交易日历上的索引查找，输出每秒调用次数。
+
+用法: python benchmarks/bench_trading_calendar.py [--calls 2000]
+"""
+import os
+import sys
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+import chinese_calendar as calendar
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_tools import StockTools, get_trading_calendar
+
+
+def legacy_get_trading_day(date_str, delta):
+    """改造前的实现：逐日调用 chinese_calendar 判断，最多向前/后搜索365天"""
+    cache = {}
+
+    def is_trading_day(day):
+        key = day.strftime('%Y-%m-%d')
+        if key not in cache:
+            cache[key] = calendar.is_workday(day) and day.weekday() < 5
+        return cache[key]
+
+    current = datetime.strptime(date_str, '%Y-%m-%d')
+    if delta == 0:
+        if is_trading_day(current):
+            return current.strftime('%Y-%m-%d')
+        delta = 1
+
+    found = 0
+    step = 1 if delta > 0 else -1
+    for _ in range(365):
+        current += timedelta(days=step)
+        if is_trading_day(current):
+            found += 1
+            if found == abs(delta):
+                return current.strftime('%Y-%m-%d')
+    return None
+
+
+def rate(func, cases):
+    start = time.perf_counter()
+    for date_str, delta in cases:
+        func(date_str, delta)
+    return len(cases) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='交易日历微基准')
+    parser.add_argument('--calls', type=int, default=2000)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    dates = [(date(2020, 1, 1) + timedelta(days=rnd.randrange(2000))).strftime('%Y-%m-%d') for _ in range(args.calls)]
+
+    start = time.perf_counter()
+    get_trading_calendar()
+    print(f"构建交易日历: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    for delta in (1, -1, -200):
+        cases = [(date_str, delta) for date_str in dates]
+        legacy = rate(legacy_get_trading_day, cases)
+        indexed = rate(lambda d, n: StockTools().get_trading_day(d, n), cases)
+        print(f"get_trading_day(delta={delta:>4}): 旧 {legacy:>10,.0f} 次/秒  新 {indexed:>10,.0f} 次/秒  ({indexed / legacy:.0f}x)")
+
+    tools = StockTools()
+    print(f"is_trading_day: {rate(lambda d, n: tools.is_trading_day(d), [(d, 0) for d in dates]):,.0f} 次/秒")
+    print(f"trading_days_between: {rate(lambda d, n: tools.trading_days_between(d, '2026-01-01'), [(d, 0) for d in dates]):,.0f} 次/秒")
+
+
+if __name__ == '__main__':
+    main()
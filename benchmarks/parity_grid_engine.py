@@ -0,0 +1,149 @@
+"""
+网格回测引擎一致性检查与基准
+
+在若干组合成行情上分别用 StockSimulation（逐tick调用策略和账户）与 GridBacktestEngine（数组循环）
+回测 StockStrategyGridV1/V2/V3，逐条比较成交列表（时间、方向、价格、数量）和最终资产，任何不一致以非零状态退出。
+随后对同一只股票做 --sweep 组网格梯度参数扫描，输出两种方式每秒可完成的回测次数。
+
+数据库和日志在临时目录中创建。
+
+用法: python benchmarks/parity_grid_engine.py [--days 250] [--seeds 5] [--sweep 200]
+"""
+import os
+import sys
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'simulations'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from bench_column_store import make_daily_bars
+from stock_db import StockDB
+from simulations.bar_view import BarView
+from simulations.grid_engine import GridBacktestEngine, STRATEGY_VERSIONS, njit
+from simulations.stock_simulation import StockSimulation
+from simulations.stock_strategy_gird_v2 import StockStrategyGridV2
+
+BAR_TIMES = [(9, 45), (10, 0), (10, 15), (10, 30), (10, 45), (11, 0), (11, 15), (11, 30),
+             (13, 15), (13, 30), (13, 45), (14, 0), (14, 15), (14, 30), (14, 45), (15, 0)]
+
+
+def make_min15_bars(days, seed, volatility):
+    """带跳空和随机高低价的15分钟K线，波动足够触发多格连续买卖"""
+    rng = np.random.default_rng(seed)
+    sessions = pd.bdate_range('2021-01-04', periods=days)
+    offsets = pd.to_timedelta([f"{h}:{m}:00" for h, m in BAR_TIMES])
+    datetimes = (sessions.values[:, None] + offsets.values[None, :]).ravel()
+    returns = rng.normal(0, volatility, len(datetimes))
+    returns[::len(BAR_TIMES)] += rng.normal(0, volatility * 4, days)
+    close = 10 * np.exp(np.cumsum(returns))
+    open_ = np.concatenate([[10.0], close[:-1]])
+    spread = np.abs(rng.normal(0, volatility, len(datetimes))) * close
+    # 少量K线的高低价不包含开盘价，覆盖成交失败的分支
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    missed = rng.random(len(datetimes)) < 0.02
+    low[missed] = open_[missed] + 0.001
+    frame = pd.DataFrame({
+        'datetime': datetimes, 'open': open_.round(3), 'high': high.round(3), 'low': low.round(3),
+        'close': close.round(3), 'volume': np.full(len(datetimes), 10000, dtype=np.int64),
+    })
+    # 删掉若干K线，覆盖缺失价格的分支
+    return frame.drop(index=rng.choice(len(frame), size=len(frame) // 200, replace=False))
+
+
+def run_simulation(stock_code, start_date, end_date, strategy_class):
+    strategy = strategy_class()
+    simulation = StockSimulation(stock_code, stock_code, start_date, end_date, strategy, log_dir_path='./log')
+    result = simulation.run()
+    trades = [(d.datetime, d.action, float(d.price), float(d.quantity)) for d in simulation.account.trade_history]
+    prices = {stock_code: simulation._bars.get_daily_end_price(stock_code, end_date)}
+    return trades, simulation.account.get_total_value(prices), result
+
+
+def check_parity(stock_code, start_date, end_date, bar_view):
+    engine = GridBacktestEngine(bar_view, start_date, end_date)
+    ok = True
+    for strategy_class in STRATEGY_VERSIONS:
+        trades, final_value, result = run_simulation(stock_code, start_date, end_date, strategy_class)
+        engine_result = engine.run_strategy(strategy_class())
+
+        same = (trades == engine_result.trades and final_value == engine_result.final_value
+                and result == (engine_result.change_rate, engine_result.new_change_rate))
+        ok = ok and same
+        print(f"  {strategy_class.__name__}: 成交 {len(trades):4d}/{len(engine_result.trades):4d} 笔  "
+              f"最终资产 {final_value:12.2f}/{engine_result.final_value:12.2f}  {'一致' if same else '不一致'}")
+        if not same:
+            for index, (expected, actual) in enumerate(zip(trades, engine_result.trades)):
+                if expected != actual:
+                    print(f"    第{index}笔: simulation={expected} engine={actual}")
+                    break
+    return ok
+
+
+def make_grids(count):
+    rng = np.random.default_rng(7)
+    return [np.sort(rng.uniform(0.01, 0.12, rng.integers(1, 6))).round(3).tolist() for _ in range(count)]
+
+
+def bench_sweep(stock_code, start_date, end_date, bar_view, grids, simulation_runs):
+    """每组网格梯度跑一次V2回测；StockSimulation 较慢，只跑前 simulation_runs 组估算速率"""
+    start = time.perf_counter()
+    for grid in grids[:simulation_runs]:
+        strategy = StockStrategyGridV2()
+        strategy._grid_size = grid
+        StockSimulation(stock_code, stock_code, start_date, end_date, strategy, log_dir_path='./log').run()
+    simulation_rate = simulation_runs / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    engine = GridBacktestEngine(bar_view, start_date, end_date)
+    for grid in grids:
+        engine.run(2, grid)
+    engine_rate = len(grids) / (time.perf_counter() - start)
+
+    print(f"  simulation: {simulation_rate:9.1f} 次回测/秒")
+    print(f"      engine: {engine_rate:9.1f} 次回测/秒  ({engine_rate / simulation_rate:.0f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='网格回测引擎一致性检查与基准')
+    parser.add_argument('--days', type=int, default=250)
+    parser.add_argument('--seeds', type=int, default=5)
+    parser.add_argument('--sweep', type=int, default=200, help='参数扫描的网格梯度组数')
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='parity_grid_engine_'))
+    print(f"numba: {'已启用' if njit is not None else '未安装，使用纯Python循环'}")
+
+    daily = make_daily_bars(args.days)
+    start_date = daily['date'].iloc[0].to_pydatetime()
+    end_date = daily['date'].iloc[-1].to_pydatetime()
+    db = StockDB()
+
+    ok = True
+    for seed in range(args.seeds):
+        stock_code = f"{600000 + seed}"
+        db.save_daily_data(stock_code, daily)
+        min_bars = make_min15_bars(args.days, seed, 0.002 + 0.001 * seed)
+        db.save_min_data(stock_code, '15', min_bars)
+        # StockSimulation 准备数据时还会检查5分钟K线，写入同样的数据避免访问网络
+        db.save_min_data(stock_code, '5', min_bars)
+        print(f"{stock_code}:")
+        bar_view = BarView(stock_code, start_date, end_date)
+        ok = check_parity(stock_code, start_date, end_date, bar_view) and ok
+
+    print(f"参数扫描 ({args.sweep} 组网格梯度, V2):")
+    bench_sweep(stock_code, start_date, end_date, bar_view, make_grids(args.sweep), min(args.sweep, 10))
+
+    print(f"一致性检查: {'通过' if ok else '失败'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
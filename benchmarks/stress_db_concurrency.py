@@ -0,0 +1,125 @@
+"""
+stock_data.db 并发压力测试
+
+模拟准备任务、选股任务、/predict接口与回测同时访问数据库：
+若干写线程不断保存分钟K线和预测数据，若干读线程不断查询，
+统计写入失败/读取报错次数与总耗时。
+
+多进程模式（--processes）模拟webserver与回测脚本分属不同进程的情况。
+
+用法: python benchmarks/stress_db_concurrency.py [--processes 2] [--writers 4] [--readers 8] [--rounds 50]
+                                                 [--journal-mode WAL] [--no-writer-queue] [--busy-timeout 5]
+"""
+import os
+import sys
+import argparse
+import logging
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stock_db
+from stock_db import StockDB
+
+
+class _ErrorCounter(logging.Handler):
+    """统计StockDB内部吞掉的错误日志"""
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        with self._lock:
+            self.count += 1
+
+
+def make_min_bars(start, count):
+    datetimes = pd.date_range(start, periods=count, freq='5min')
+    close = 10 + np.random.default_rng().normal(0, 0.1, count)
+    return pd.DataFrame({
+        'datetime': datetimes,
+        'open': close, 'high': close + 0.02, 'low': close - 0.02, 'close': close,
+        'volume': np.full(count, 10000, dtype=np.int64),
+    })
+
+
+def writer_job(db_path, worker_id, rounds, failures):
+    db = StockDB(db_path)
+    for i in range(rounds):
+        stock_code = f"{worker_id:03d}{i % 10:03d}"
+        bars = make_min_bars(f"2024-01-{i % 28 + 1:02d} 09:35:00", 48)
+        if not db.save_min_data(stock_code, '5', bars):
+            failures.append(('min', stock_code))
+        if not db.save_predict_daily_data(stock_code, '2024-02-01', {'open': 1, 'high': 1, 'low': 1, 'close': 1}):
+            failures.append(('predict', stock_code))
+
+
+def reader_job(db_path, worker_id, rounds, reads):
+    db = StockDB(db_path)
+    for i in range(rounds * 4):
+        stock_code = f"{i % 4:03d}{i % 10:03d}"
+        db.get_min_data(stock_code, '5', '2024-01-01 00:00:00', '2024-12-31 23:59:59')
+        db.get_latest_min_datetime(stock_code, '5')
+        db.get_predict_daily_data(stock_code, '2024-02-01')
+        reads.append(1)
+
+
+def run_process(db_path, process_id, args):
+    """在一个进程内启动读写线程，返回 (写失败次数, 读取轮次, 错误日志条数)"""
+    stock_db.configure_db(journal_mode=args.journal_mode, writer_queue=not args.no_writer_queue,
+                          busy_timeout=args.busy_timeout)
+
+    counter = _ErrorCounter()
+    logging.getLogger('stock_db').addHandler(counter)
+
+    failures, reads = [], []
+    threads = [threading.Thread(target=writer_job, args=(db_path, process_id * 100 + i, args.rounds, failures))
+               for i in range(args.writers)]
+    threads += [threading.Thread(target=reader_job, args=(db_path, i, args.rounds, reads))
+                for i in range(args.readers)]
+
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return len(failures), len(reads), counter.count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--processes', type=int, default=2)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--journal-mode', default=stock_db.DB_CONFIG['journal_mode'])
+    parser.add_argument('--no-writer-queue', action='store_true')
+    parser.add_argument('--busy-timeout', type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'stress.db')
+        stock_db.configure_db(journal_mode=args.journal_mode)
+        StockDB(db_path)
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.processes) as pool:
+            futures = [pool.submit(run_process, db_path, i, args) for i in range(args.processes)]
+            results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+
+    failures = sum(r[0] for r in results)
+    reads = sum(r[1] for r in results)
+    errors = sum(r[2] for r in results)
+
+    print(f"journal_mode={args.journal_mode} writer_queue={not args.no_writer_queue} busy_timeout={args.busy_timeout}s")
+    print(f"进程 {args.processes} 个，每进程写线程 {args.writers} 个、读线程 {args.readers} 个，耗时 {elapsed:.2f}s")
+    print(f"写入请求 {args.processes * args.writers * args.rounds * 2} 次，失败 {failures} 次")
+    print(f"读取轮次 {reads} 次，错误日志 {errors} 条")
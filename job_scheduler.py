@@ -0,0 +1,197 @@
+# job_scheduler.py
+"""
+定时任务调度
+
+每个任务在每天的 hour:minute 触发，day_filter(date) 返回 False 的日期跳过（用于按交易日历触发）。
+调度线程睡到最近一个任务的触发时间再醒来，到点（当前时间 >= 计划时间）就把任务交给 executor 执行，
+不要求时间精确相等，醒得晚了也不会错过；错过多个周期（如进程挂起）时只补执行一次。
+为了对系统时间调整做出反应，单次最多睡 JOB_SCHEDULER_MAX_SLEEP 秒。
+
+同一任务同时只有一个在运行：定时触发和 run_now（HTTP接口手动触发）共用任务上的锁，
+任务仍在运行时定时触发记为 skipped，run_now 返回 None。
+
+clock 可注入，测试时传入返回模拟时间的函数，并直接调用 run_pending(now) 推进。
+
+环境变量:
+    JOB_SCHEDULER_MAX_SLEEP  调度线程单次最长睡眠秒数，默认 60
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+JOB_SCHEDULER_MAX_SLEEP = float(os.environ.get('JOB_SCHEDULER_MAX_SLEEP', 60))
+# 计算下次触发时间时最多向后查找的天数
+MAX_LOOKAHEAD_DAYS = 366
+
+
+class ScheduledJob:
+    def __init__(self, name, func, hour, minute, day_filter=None):
+        self.name = name
+        self.func = func
+        self.hour = hour
+        self.minute = minute
+        self.day_filter = day_filter
+        self.lock = threading.Lock()
+        self.future = None
+        self.next_fire = None
+        self.last_started = None
+        self.last_duration = None
+        self.last_error = None
+        self.last_trigger = None
+        self.runs = 0
+        self.skipped = 0
+
+
+class JobScheduler:
+    def __init__(self, executor, clock=None):
+        """
+        Args:
+            executor: concurrent.futures.Executor，任务在其中执行
+            clock: 返回当前时间（datetime）的函数，默认 datetime.now
+        """
+        self.executor = executor
+        self.clock = clock or datetime.now
+        self._jobs = {}
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def add_job(self, name, func, hour, minute, day_filter=None):
+        """
+        添加每天 hour:minute 触发的任务
+
+        Args:
+            func: 任务函数，run_now 传入的关键字参数原样传给它
+            day_filter: day_filter(date) 为 False 的日期不触发，为空时每天触发
+        """
+        job = ScheduledJob(name, func, hour, minute, day_filter)
+        job.next_fire = self.next_fire_time(job, self.clock())
+        self._jobs[name] = job
+        self._wakeup.set()
+        logger.info(f"定时任务 {name}: 下次执行 {job.next_fire}")
+        return job
+
+    @staticmethod
+    def next_fire_time(job, after):
+        """after 之后（不含）第一个满足 day_filter 的 hour:minute，找不到时为 None"""
+        day = after.date()
+        for _ in range(MAX_LOOKAHEAD_DAYS):
+            fire = datetime(day.year, day.month, day.day, job.hour, job.minute)
+            if fire > after and (job.day_filter is None or job.day_filter(day)):
+                return fire
+            day += timedelta(days=1)
+        return None
+
+    def get_job(self, name):
+        return self._jobs[name]
+
+    def is_running(self, name):
+        return self._jobs[name].lock.locked()
+
+    def run_now(self, name, trigger='manual', **kwargs):
+        """
+        立即把任务交给 executor 执行
+
+        返回:
+            concurrent.futures.Future，任务已在运行时为 None
+        """
+        job = self._jobs[name]
+        if not job.lock.acquire(blocking=False):
+            return None
+        try:
+            job.future = self.executor.submit(self._execute, job, trigger, kwargs)
+        except Exception:
+            job.lock.release()
+            raise
+        return job.future
+
+    def _execute(self, job, trigger, kwargs):
+        start = time.perf_counter()
+        job.last_started = self.clock()
+        job.last_trigger = trigger
+        job.last_error = None
+        logger.info(f"{job.last_started.strftime('%Y-%m-%d %H:%M:%S')} - 开始执行任务 {job.name}（{trigger}）")
+        try:
+            return job.func(**kwargs)
+        except Exception as e:
+            job.last_error = str(e)
+            logger.error(f"❌ 任务 {job.name} 执行出错: {e}")
+            raise
+        finally:
+            job.last_duration = time.perf_counter() - start
+            job.runs += 1
+            job.lock.release()
+            logger.info(f"任务 {job.name} 结束，耗时 {job.last_duration:.1f}s")
+
+    def run_pending(self, now=None):
+        """
+        触发所有到点的任务，并计算它们的下次触发时间
+
+        返回:
+            list: 本次交给 executor 的任务名
+        """
+        now = now or self.clock()
+        fired = []
+        for job in self._jobs.values():
+            if job.next_fire is None or now < job.next_fire:
+                continue
+            if self.run_now(job.name, trigger='timer') is None:
+                job.skipped += 1
+                logger.warning(f"⚠️ 任务 {job.name} 仍在运行，跳过 {job.next_fire} 的定时执行")
+            else:
+                fired.append(job.name)
+            job.next_fire = self.next_fire_time(job, now)
+            logger.info(f"定时任务 {job.name}: 下次执行 {job.next_fire}")
+        return fired
+
+    def seconds_until_next(self, now=None):
+        """距离最近一次触发的秒数，没有待触发的任务时为 None"""
+        now = now or self.clock()
+        fires = [job.next_fire for job in self._jobs.values() if job.next_fire is not None]
+        if not fires:
+            return None
+        return max((min(fires) - now).total_seconds(), 0.0)
+
+    def start(self):
+        self._stopped = False
+        self._thread = threading.Thread(target=self._loop, name='job-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _loop(self):
+        while not self._stopped:
+            self._wakeup.clear()
+            try:
+                self.run_pending()
+            except Exception as e:
+                logger.error(f"❌ 定时任务调度出错: {e}")
+            delay = self.seconds_until_next()
+            self._wakeup.wait(JOB_SCHEDULER_MAX_SLEEP if delay is None else min(delay, JOB_SCHEDULER_MAX_SLEEP))
+
+    def stats(self):
+        """每个任务的运行状态、上次耗时和下次触发时间"""
+        def fmt(value):
+            return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+        return {
+            name: {
+                "is_running": job.lock.locked(),
+                "next_fire": fmt(job.next_fire),
+                "last_started": fmt(job.last_started),
+                "last_duration": job.last_duration,
+                "last_trigger": job.last_trigger,
+                "last_error": job.last_error,
+                "runs": job.runs,
+                "skipped": job.skipped,
+            }
+            for name, job in self._jobs.items()
+        }
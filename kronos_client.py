@@ -0,0 +1,170 @@
+# kronos_client.py
+"""
+Kronos 预测服务客户端
+
+单条预测:  POST {KRONOS_PREDICT_URL}        {"predict_len": n, "data": [...]}  -> {"prediction": [...]}
+批量预测:  POST {KRONOS_PREDICT_BATCH_URL}  {"requests": [{"predict_len": n, "data": [...]}, ...]}
+                                             -> {"predictions": [[...], ...]}，顺序与请求一致
+
+predict_many 把请求按 batch_size 分批，最多 concurrency 个批次同时在途，连接由 requests.Session 复用。
+服务端不支持批量接口（404/405）时自动退化为并发逐条请求。
+
+多次采样: 请求体加 "num_samples": n，服务端对该请求返回 n 个预测 [[...], ...]。
+服务端忽略 num_samples（只返回一个预测）时自动退化为在同一批次里把请求重复 n 次。
+
+请求体由 kline_payload 编码（有 orjson 时用 orjson），KRONOS_PAYLOAD_FORMAT=columns 时按列式发送。
+
+环境变量:
+    KRONOS_PREDICT_URL        单条预测地址，默认 http://192.168.1.180:6030/predict
+    KRONOS_PREDICT_BATCH_URL  批量预测地址，默认为单条地址加 _batch
+    KRONOS_BATCH_SIZE         每批请求数，默认 32
+    KRONOS_CONCURRENCY        同时在途的HTTP请求数，默认 4
+    KRONOS_TIMEOUT            单次HTTP请求超时秒数，默认 60
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+from kline_payload import dumps, loads, encode_request
+import logging
+
+logger = logging.getLogger(__name__)
+
+KRONOS_PREDICT_URL = os.environ.get('KRONOS_PREDICT_URL', 'http://192.168.1.180:6030/predict')
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+class KronosClient:
+    def __init__(self, url=None, batch_url=None, batch_size=None, concurrency=None, timeout=None, payload_format=None):
+        self.url = url or KRONOS_PREDICT_URL
+        self.payload_format = payload_format
+        self.batch_url = batch_url or os.environ.get('KRONOS_PREDICT_BATCH_URL', self.url + '_batch')
+        self.batch_size = batch_size or int(os.environ.get('KRONOS_BATCH_SIZE', 32))
+        self.concurrency = concurrency or int(os.environ.get('KRONOS_CONCURRENCY', 4))
+        self.timeout = timeout or float(os.environ.get('KRONOS_TIMEOUT', 60))
+        # None 表示还不知道服务端是否支持批量接口 / num_samples
+        self._batch_supported = None
+        self._samples_supported = None
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._session.close()
+
+    def predict(self, data, predict_len=1, num_samples=1):
+        """
+        单条预测
+
+        参数:
+            data: 历史K线 [{"timestamps", "open", "high", "low", "close", "volume"}, ...]
+            predict_len: 预测的K线根数
+            num_samples: 采样次数
+
+        返回:
+            list: 预测的K线列表；num_samples 大于1时为 num_samples 个预测K线列表
+        """
+        post = lambda items: [self._post_item(item) for item in items]
+        return self._predict_batch([{"predict_len": predict_len, "data": data}], num_samples, post)[0]
+
+    def _post(self, url, payload):
+        return self._session.post(url, data=dumps(payload), headers=JSON_HEADERS, timeout=self.timeout)
+
+    def _post_item(self, item):
+        response = self._post(self.url, encode_request(item, self.payload_format))
+        response.raise_for_status()
+        return loads(response.content)['prediction']
+
+    def _post_batch(self, batch):
+        if self._batch_supported is not False:
+            response = self._post(self.batch_url, {
+                "requests": [encode_request(item, self.payload_format) for item in batch]
+            })
+            if response.status_code in (404, 405):
+                with self._lock:
+                    if self._batch_supported is None:
+                        logger.warning(f"⚠️ 预测服务不支持批量接口 {self.batch_url}，改为逐条请求")
+                    self._batch_supported = False
+            else:
+                response.raise_for_status()
+                predictions = loads(response.content)['predictions']
+                if len(predictions) != len(batch):
+                    raise ValueError(f"批量预测返回 {len(predictions)} 条结果，请求 {len(batch)} 条")
+                self._batch_supported = True
+                return predictions
+
+        return [self._post_item(item) for item in batch]
+
+    @staticmethod
+    def _is_samples(prediction, num_samples):
+        """num_samples 次采样的结果是 num_samples 个预测K线列表，不支持 num_samples 的服务端只返回一个预测K线列表"""
+        return (isinstance(prediction, list) and len(prediction) == num_samples
+                and all(isinstance(sample, list) for sample in prediction))
+
+    def _predict_batch(self, batch, num_samples=1, post=None):
+        """post 为发送一组请求的函数，默认走批量接口"""
+        post = post or self._post_batch
+        if num_samples <= 1:
+            return post(batch)
+
+        if self._samples_supported is not False:
+            predictions = post([dict(item, num_samples=num_samples) for item in batch])
+            if all(self._is_samples(prediction, num_samples) for prediction in predictions):
+                self._samples_supported = True
+                return predictions
+            with self._lock:
+                if self._samples_supported is None:
+                    logger.warning(f"⚠️ 预测服务不支持 num_samples，改为每条请求重复 {num_samples} 次")
+                self._samples_supported = False
+
+        predictions = post([item for item in batch for _ in range(num_samples)])
+        return [predictions[i * num_samples:(i + 1) * num_samples] for i in range(len(batch))]
+
+    def predict_many(self, predict_requests, on_done=None, num_samples=1):
+        """
+        批量预测
+
+        参数:
+            predict_requests: [{"predict_len": n, "data": [...]}, ...]
+            on_done: 每个批次完成后在调用线程中对其中每条请求回调 on_done(index, prediction)
+            num_samples: 每条请求的采样次数
+
+        返回:
+            list: 与请求一一对应的预测结果，失败的请求为 None；
+                  num_samples 大于1时每条结果为 num_samples 个预测K线列表
+        """
+        results = [None] * len(predict_requests)
+        if not predict_requests:
+            return results
+
+        batches = [
+            (start, predict_requests[start:start + self.batch_size])
+            for start in range(0, len(predict_requests), self.batch_size)
+        ]
+
+        # 不支持批量接口时逐条请求，每个请求单独占一个并发名额
+        if self._batch_supported is False:
+            batches = [(index, [item]) for index, item in enumerate(predict_requests)]
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='kronos') as executor:
+            futures = {
+                executor.submit(self._predict_batch, batch, num_samples): (start, batch) for start, batch in batches
+            }
+            for future in as_completed(futures):
+                start, batch = futures[future]
+                try:
+                    predictions = future.result()
+                except Exception as e:
+                    logger.error(f"❌ 批量预测失败（第{start}条起共{len(batch)}条）: {e}")
+                    predictions = [None] * len(batch)
+
+                for offset, prediction in enumerate(predictions):
+                    results[start + offset] = prediction
+                    if on_done:
+                        on_done(start + offset, prediction)
+
+        return results
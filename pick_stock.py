@@ -1,22 +1,32 @@
+import numpy as np
 import pandas as pd
 from fastapi import Request
-from stock_data_fetcher import StockDataFetcher
+from stock_data_fetcher import StockDataFetcher, get_fetch_stats, reset_fetch_stats
+from stock_frame_cache import get_frame_cache_stats, reset_frame_cache_stats
 from stock_db import StockDB
 from stock_tools import StockTools
 from datetime import datetime, timedelta
 from stock_akshare import StockAKShare
+from stock_prefetch import StockPrefetcher
+from kronos_client import KronosClient
+from kline_payload import frame_to_bars
 import time
-import requests
 import logging
 
 logger = logging.getLogger(__name__)
 
+# prepare_stock 任务台账的 job_id 前缀，后接当前交易日
+PREPARE_JOB_PREFIX = 'prepare_'
+# pick_up_stock 对每只候选股票的预测采样次数
+PICK_PREDICT_SAMPLES = 3
+
 class StockPicker:
     def __init__(self):
         self._fetcher = StockDataFetcher()
         self._db = StockDB()
         self._tools = StockTools()
         self._akshare = StockAKShare()
+        self._kronos = KronosClient()
         self.process_count = 0
         self.is_running = False
         self.total_count = 0
@@ -30,11 +40,14 @@ class StockPicker:
         """
             准备股票数据
             每日0点之后执行，提前准备日k线数据
-            从api获取之后sleep两秒，防止api调用过于频繁
-            1800只股票准备一次数据大约1-2小时
+            日K线由 StockPrefetcher 并发下载，请求速率由各上游的令牌桶限制
+            日K线按覆盖区间增量下载，已有数据的股票只下载缺失的交易日
+            每只股票的下载、预测完成后记入任务台账（job_ledger），同一交易日的任务中断后重新执行时
+            跳过已完成的股票，进度从台账恢复
         """ 
         self.prepare_running = True
         self.interrupt_prepare = False
+        reset_fetch_stats()
         pd_data = self._fetcher.get_all_stock_info()
 
         now = datetime.now()
@@ -58,82 +71,134 @@ class StockPicker:
             # 预测下一个交易日的k线数据
             predict_date = self._tools.get_trading_day(current_date, delta=1)
     
-        self.prepare_count = 0
-        self.prepare_total_count = len(pd_data)
-
-        sleep_time = 0
-        for _, row in pd_data.iterrows():  
-            stock_code = row.get('stock_code')
-            stock_name = row.get('stock_name')
-            
-            try:
-                self._fetcher.get_daily_kline(stock_code, current_date, current_date, sleep_time=sleep_time)
+        stock_names = dict(zip(pd_data['stock_code'], pd_data['stock_name']))
+
+        # 任务台账按当前交易日区分，只保留本次任务的记录
+        job_id = f"{PREPARE_JOB_PREFIX}{current_date}"
+        self._db.prune_job_ledger(PREPARE_JOB_PREFIX, job_id)
+        fetched = self._db.get_job_status(job_id, 'fetch')
+        predicted = self._db.get_job_status(job_id, 'predict')
+
+        # 进度分两段：先并发下载全部股票的日K线，再批量预测；台账中已完成的股票直接计入进度
+        fetch_codes = [code for code in stock_names if fetched.get(code) != 'done']
+        predict_codes = [code for code in stock_names if predicted.get(code) != 'done']
+        self.prepare_total_count = len(stock_names) * 2
+        self.prepare_count = self.prepare_total_count - len(fetch_codes) - len(predict_codes)
+        if self.prepare_count:
+            logger.info(f"从任务台账恢复进度: {job_id} 已下载 {len(stock_names) - len(fetch_codes)} 只，"
+                        f"已预测 {len(stock_names) - len(predict_codes)} 只")
+
+        def on_fetched(stock_code, success):
+            if not success:
+                logger.error(f"获取股票数据失败: {stock_code} {stock_names[stock_code]}")
+            self._db.save_job_status(job_id, 'fetch', [stock_code], 'done' if success else 'failed')
+            self.prepare_count = self.prepare_count + 1
+            self._report_prepare_progress(stock_code, stock_names[stock_code], console_print)
 
-                sleep_time = 2
+        StockPrefetcher().prefetch(
+            fetch_codes, current_date, current_date,
+            on_done=on_fetched, should_stop=lambda: self.interrupt_prepare
+        )
 
-                p_data = self._db.get_predict_daily_data(stock_code, current_date)
-                if p_data.empty:
-                    logger.info(f"前一日交易日预测数据不存在，重新预测: {stock_code} {current_date}")
-                    sleep_time = 0
-                    tmp = self._predict_stock(stock_code, current_date)
-                    self._db.save_predict_daily_data(stock_code, current_date, tmp[0])
+        # 收集缺少预测数据的 (股票, 日期)，已有预测的股票直接计入进度
+        pending = {}
+        done_codes = []
+        for stock_code in ([] if self.interrupt_prepare else predict_codes):
+            for date in (current_date, predict_date):
+                if self._db.get_predict_daily_data(stock_code, date).empty:
+                    pending.setdefault(stock_code, []).append(date)
                 else:
-                    logger.info(f"前一日交易日预测数据已存在，跳过: {stock_code} {current_date}")
-
-                p_data = self._db.get_predict_daily_data(stock_code, predict_date)
-                if p_data.empty:
-                    logger.info(f"当前日交易日预测数据不存在，重新预测: {stock_code} {predict_date}")
-                    sleep_time = 0
-                    tmp = self._predict_stock(stock_code, predict_date)
-                    self._db.save_predict_daily_data(stock_code, predict_date, tmp[0])
-                else:
-                    logger.info(f"当前日交易日预测数据已存在，跳过: {stock_code} {predict_date}")
+                    logger.info(f"预测数据已存在，跳过: {stock_code} {date}")
+            if stock_code not in pending:
+                done_codes.append(stock_code)
+                self.prepare_count = self.prepare_count + 1
+        self._db.save_job_status(job_id, 'predict', done_codes)
+
+        # 分组批量预测，每组结束后检查是否中断
+        items = [(stock_code, date) for stock_code, dates in pending.items() for date in dates]
+        group_size = self._kronos.batch_size * self._kronos.concurrency
+        failed = set()
+        for group_start in range(0, len(items), group_size):
+            if self.interrupt_prepare:
+                break
+            self._predict_and_save(items[group_start:group_start + group_size], pending, stock_names,
+                                   console_print, job_id, failed)
+        self.interrupt_prepare = False
 
-            except Exception as e:
-                logger.error(f"获取股票数据失败: {stock_code} {stock_name} {e}")
+        stats = get_fetch_stats()
+        logger.info(
+            f"日线下载统计: API调用 {stats['api_calls']} 次(全量刷新 {stats['full_refreshes']} 次)，"
+            f"下载 {stats['rows_fetched']} 行/{stats['bytes_fetched'] / 1024:.1f}KB，"
+            f"增量下载节省 {stats['rows_saved']} 行/{stats['bytes_saved'] / 1024:.1f}KB"
+        )
+        self.prepare_running = False
 
-            self.prepare_count = self.prepare_count + 1
+    @staticmethod
+    def _report_progress(count, total, message, console_print):
+        # 计算百分比
+        percent = (count / total) * 100 if total else 100.0
+        # 可视化进度条（长度为20）
+        bar_length = 20
+        filled_length = int(bar_length * count / total) if total else bar_length
+        bar = '#' * filled_length + '-' * (bar_length - filled_length)
+        if console_print:
+            # 输出进度条（\r 覆盖，end='' 不换行）
+            print(f"\r进度: [{bar}] {percent:.1f}% {count}/{total} {message}          ", end='', flush=True)
+        else:
+            logger.info(f"进度: [{bar}] {percent:.1f}% {count}/{total} {message}")
 
-            if self.interrupt_prepare:
-                self.interrupt_prepare = False
-                break
+    def _report_prepare_progress(self, stock_code, stock_name, console_print):
+        self._report_progress(self.prepare_count, self.prepare_total_count, f"{stock_name}({stock_code})", console_print)
+
+    def _report_pick_progress(self, message, console_print):
+        self._report_progress(self.process_count, self.total_count, message, console_print)
 
-            # 计算百分比
-            percent = (self.prepare_count / self.prepare_total_count) * 100
-            # 可视化进度条（长度为20）
-            bar_length = 20
-            filled_length = int(bar_length * self.prepare_count / self.prepare_total_count)
-            bar = '#' * filled_length + '-' * (bar_length - filled_length)
-            if console_print:
-                # 输出进度条（\r 覆盖，end='' 不换行）
-                print(f"\r进度: [{bar}] {percent:.1f}% {self.prepare_count}/{self.prepare_total_count} {stock_name}({stock_code})          ", end='', flush=True)
+    def _predict_and_save(self, items, pending, stock_names, console_print, job_id, failed):
+        """
+        批量预测 items=[(股票, 日期), ...] 并保存，股票的所有日期都完成后计入进度并记入任务台账
+        failed 收集有日期预测失败的股票，这些股票在台账中记为 failed，下次执行时重新预测
+        """
+        predict_requests = []
+        for stock_code, date in items:
+            try:
+                predict_requests.append(self._build_predict_request(stock_code, date))
+            except Exception as e:
+                logger.error(f"构建预测请求失败: {stock_code} {date} {e}")
+                predict_requests.append(None)
+
+        valid = [i for i, request in enumerate(predict_requests) if request is not None]
+        predictions = self._kronos.predict_many([predict_requests[i] for i in valid])
+        results = dict(zip(valid, predictions))
+
+        # {状态: [股票代码]}
+        finished = {}
+        for i, (stock_code, date) in enumerate(items):
+            prediction = results.get(i)
+            if prediction:
+                self._db.save_predict_daily_data(stock_code, date, prediction[0])
             else:
-                logger.info(f"进度: [{bar}] {percent:.1f}% {self.prepare_count}/{self.prepare_total_count} {stock_name}({stock_code})")
+                logger.error(f"预测股票失败: {stock_code} {stock_names[stock_code]} {date}")
+                failed.add(stock_code)
 
-        self.prepare_running = False
+            pending[stock_code].remove(date)
+            if not pending[stock_code]:
+                finished.setdefault('failed' if stock_code in failed else 'done', []).append(stock_code)
+                self.prepare_count = self.prepare_count + 1
+                self._report_prepare_progress(stock_code, stock_names[stock_code], console_print)
 
-    def _predict_stock(self, stock_code, datetime, current_data = pd.DataFrame()):
+        for status, stock_codes in finished.items():
+            self._db.save_job_status(job_id, 'predict', stock_codes, status)
+
+    def _build_predict_request(self, stock_code, datetime, current_data = pd.DataFrame()):
+        """
+        构建预测请求：datetime 之前200个交易日的日K线，current_data 不为空时追加为最后一根
+        """
         end_date = self._tools.get_trading_day(datetime, delta=-1)
         start_date = self._tools.get_trading_day(datetime, delta=-200)
         
         pd_data = self._fetcher.get_daily_kline(stock_code, start_date, end_date)
 
-        history_data_for_chart = []
-        for _, row in pd_data.iterrows():
-            timestamp = row.get('timestamp', row.get('date', ''))
-            if hasattr(timestamp, 'strftime'):
-                timestamp_str = timestamp.strftime("%Y-%m-%d %H:%M:%S")
-            else:
-                timestamp_str = str(timestamp)
-            
-            history_data_for_chart.append({
-                "timestamps": timestamp_str,
-                "open": float(row.get('open', 0)),
-                "high": float(row.get('high', 0)),
-                "low": float(row.get('low', 0)),
-                "close": float(row.get('close', 0)),
-                "volume": float(row.get('volume', 0))
-            })
+        history_data_for_chart = frame_to_bars(pd_data)
 
         # 如果存在今日数据，就加入，然后预测明天的
         if not current_data.empty:
@@ -146,30 +211,20 @@ class StockPicker:
                 "volume": float(current_data['volume'].iloc[0])
             })
 
-        predict_request = {
+        return {
             "predict_len": 1,
             "data": history_data_for_chart
         }
 
-        # 目标服务地址
-        target_url = "http://192.168.1.180:6030/predict"
-
-        # 发送请求
-        response = requests.post(
-            target_url,
-            json=predict_request,
-            timeout=60
-        )
+    def _predict_stock(self, stock_code, datetime, current_data = pd.DataFrame()):
+        predict_request = self._build_predict_request(stock_code, datetime, current_data)
 
         try:
-            response_data = response.json()
-            prediction_data=response_data['prediction']
+            return self._kronos.predict(predict_request['data'], predict_request['predict_len'])
         except Exception as e:
-            logger.error(f"请求失败: {response}")
-            logger.error(f"请求失败: {len(history_data_for_chart)}")
+            logger.error(f"请求失败: {len(predict_request['data'])}")
             logger.error(f"请求失败: {e}")
-        
-        return prediction_data
+            raise
 
     def _get_trade_date(self):
         """
@@ -188,39 +243,164 @@ class StockPicker:
 
         return last_date, current_date, predict_date
 
-    def _is_right_predict(self, stock_code, p_data, data, datetime):
-        prev_date = self._tools.get_trading_day(datetime, -1)
-        prev_data = self._fetcher.get_daily_kline(stock_code, prev_date, prev_date)
+    @staticmethod
+    def _screen_predict(prev_close, p_close, data_close, data_open):
+        """
+        判断预测是否准确（按股票对齐的数组，一次算出全部股票）
 
-        try:
-            prev_close = prev_data['close'].iloc[0]
-            p_close = p_data['close'].iloc[0]
-            data_close = data['close'].iloc[0]
-            data_open = data['open'].iloc[0]
+        参数:
+            prev_close: 前一交易日收盘价
+            p_close: 当日预测收盘价
+            data_close, data_open: 当日实际收盘价、开盘价
+            缺数据的股票为 NaN
 
-            increase = data_close - prev_close
-            p_increase = p_close - prev_close
+        返回:
+            (right, is_raise): 布尔数组，预测涨跌幅与实际方向一致且相差不到1%为 right，实际上涨为 is_raise；
+            缺数据或涨幅超过9%的股票两者都为 False
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = (data_close - prev_close) / prev_close
+            p_rate = (p_close - prev_close) / prev_close
+            rate_today = (data_close - data_open) / data_open
 
-            rate = increase / prev_close
-            p_rate = p_increase / prev_close
+        # 缺数据的股票
+        valid = ~(np.isnan(prev_close) | np.isnan(p_close) | np.isnan(data_close) | np.isnan(data_open))
+        #涨幅过大
+        valid &= ~(rate > 0.09)
 
-            rate_today = (data_close - data_open) / data_open
+        right = valid & (rate * p_rate * rate_today > 0) & (np.abs(rate - p_rate) < 0.01)
+        is_raise = valid & (rate > 0)
+        return right, is_raise
 
-            #if increase > 0.09:
-            #    #涨幅过大
-            #    return False
+    def _load_daily_bars(self, stock_codes, start_date, end_date, dates):
+        """
+        批量读取日K线，返回 {date: 以股票代码为索引的 open/high/low/close/volume 表}
+        库中缺少 dates 中某日数据的股票逐只经 fetcher 读取（覆盖区间不完整时会下载）
+        """
+        df = self._db.get_daily_data_many(stock_codes, start_date, end_date)
+        day_keys = [pd.Timestamp(date) for date in dates]
+
+        counts = df[df['date'].isin(day_keys)].groupby('stock_code').size()
+        missing = [code for code in stock_codes if counts.get(code, 0) < len(day_keys)]
+        if missing:
+            logger.info(f"批量读取日K线缺少 {len(missing)} 只股票的数据，逐只获取")
+            frames = [df] if not df.empty else []
+            for stock_code in missing:
+                if self.interrupt_pick:
+                    break
+                try:
+                    frame = self._fetcher.get_daily_kline(stock_code, start_date, end_date)
+                except Exception as e:
+                    logger.error(f"获取日K线数据失败: {stock_code} {e}")
+                    continue
+                if not frame.empty:
+                    frames.append(frame.assign(stock_code=stock_code))
+            if frames:
+                df = pd.concat(frames, ignore_index=True).drop_duplicates(subset=['stock_code', 'date'], keep='last')
+
+        columns = ['open', 'high', 'low', 'close', 'volume']
+        return {
+            date: df[df['date'] == key].set_index('stock_code')[columns].reindex(stock_codes)
+            for date, key in zip(dates, day_keys)
+        }
 
-            if rate > 0.09:
-                #涨幅过大
-                return False, False
+    def _load_predict_close(self, stock_codes, date, label):
+        """
+        批量读取 date 的预测收盘价（以股票代码为索引），缺少预测数据的股票批量预测并保存后再读取
+        """
+        df = self._db.get_predict_daily_data_many(stock_codes, date)
+        close = df.drop_duplicates(subset=['stock_code'], keep='last').set_index('stock_code')['close']
+
+        missing = [code for code in stock_codes if code not in close.index]
+        if missing and not self.interrupt_pick:
+            for stock_code in missing:
+                logger.info(f"{label}预测数据不存在，重新预测: {stock_code} {date}")
+            predict_requests = {}
+            for stock_code in missing:
+                try:
+                    predict_requests[stock_code] = self._build_predict_request(stock_code, date)
+                except Exception as e:
+                    logger.error(f"构建预测请求失败: {stock_code} {date} {e}")
+            predictions = self._kronos.predict_many(list(predict_requests.values()))
+            for stock_code, prediction in zip(predict_requests, predictions):
+                if prediction:
+                    self._db.save_predict_daily_data(stock_code, date, prediction[0])
+                else:
+                    logger.error(f"预测股票失败: {stock_code} {date}")
 
-            if rate * p_rate * rate_today > 0 :
-                if abs(rate - p_rate) < 0.01 :
-                    return True, rate > 0
+            df = self._db.get_predict_daily_data_many(missing, date)
+            predicted = df.drop_duplicates(subset=['stock_code'], keep='last').set_index('stock_code')['close']
+            close = pd.concat([close, predicted]) if not close.empty else predicted
 
-            return False, rate > 0
-        except Exception as e:
-            return False, False
+        return close.reindex(stock_codes).to_numpy(dtype=float)
+
+    def _screen_candidates(self, stock_codes, last_date, current_date, pick_date, console_print=False):
+        """
+        前3步筛选，每一步对全部股票一次性计算：
+            1/4 上个交易日的预测准确
+            2/4 当前交易日的预测准确（实时选股时只保留有实时数据的股票）
+            3/4 两个交易日涨跌方向一致
+        每一步结束后被淘汰的股票计入进度 process_count
+
+        返回:
+            (候选股票代码列表, 以股票代码为索引的当日 open/high/low/close/volume 表)
+        """
+        prev_last_date = self._tools.get_trading_day(last_date, -1)
+        dates = [prev_last_date, last_date] + ([current_date] if pick_date else [])
+
+        start = time.perf_counter()
+        daily = self._load_daily_bars(stock_codes, prev_last_date, dates[-1], dates)
+        logger.info(f"读取 {len(stock_codes)} 只股票的日K线，耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        # 1/4 上个交易日
+        start = time.perf_counter()
+        last_p_close = self._load_predict_close(stock_codes, last_date, "前一日交易日")
+        right, is_last_raise = self._screen_predict(
+            daily[prev_last_date]['close'].to_numpy(dtype=float), last_p_close,
+            daily[last_date]['close'].to_numpy(dtype=float), daily[last_date]['open'].to_numpy(dtype=float)
+        )
+        codes = [code for code, keep in zip(stock_codes, right) if keep]
+        is_last_raise = pd.Series(is_last_raise, index=stock_codes)
+        logger.info(f"1/4 上个交易日预测筛选: {len(stock_codes)} -> {len(codes)} 只，"
+                    f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+        self.process_count = self.total_count - len(codes)
+        self._report_pick_progress(f"剩余 {len(codes)} 只 1/4", console_print)
+        if self.interrupt_pick or not codes:
+            return [], pd.DataFrame()
+
+        # 2/4 当前交易日
+        start = time.perf_counter()
+        if not pick_date:
+            realtime = self._db.get_realtime_daily_data_many(codes, current_date)
+            current = realtime.drop_duplicates(subset=['stock_code'], keep='last').set_index('stock_code')
+            codes = [code for code in codes if code in current.index]
+            current = current.reindex(codes)[['open', 'high', 'low', 'close', 'volume']]
+        else:
+            current = daily[current_date].reindex(codes)
+        cur_p_close = self._load_predict_close(codes, current_date, "当前交易日")
+        right, is_current_raise = self._screen_predict(
+            daily[last_date]['close'].reindex(codes).to_numpy(dtype=float), cur_p_close,
+            current['close'].to_numpy(dtype=float), current['open'].to_numpy(dtype=float)
+        )
+        passed = len(codes)
+        codes = [code for code, keep in zip(codes, right) if keep]
+        is_current_raise = pd.Series(is_current_raise, index=current.index)
+        logger.info(f"2/4 当前交易日预测筛选: {passed} -> {len(codes)} 只，"
+                    f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+        self.process_count = self.total_count - len(codes)
+        self._report_pick_progress(f"剩余 {len(codes)} 只 2/4", console_print)
+
+        # 3/4 判断当前交易日与上一交易日趋势否一致
+        start = time.perf_counter()
+        passed = len(codes)
+        same_trend = is_current_raise.reindex(codes).to_numpy() == is_last_raise.reindex(codes).to_numpy()
+        codes = [code for code, keep in zip(codes, same_trend) if keep]
+        logger.info(f"3/4 趋势一致筛选: {passed} -> {len(codes)} 只，"
+                    f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+        self.process_count = self.total_count - len(codes)
+        self._report_pick_progress(f"剩余 {len(codes)} 只 3/4", console_print)
+
+        return codes, current.reindex(codes)
 
     def should_filter_stock(self, stock_code):
         """
@@ -260,11 +440,14 @@ class StockPicker:
         self.interrupt_pick = False
 
         pick_up_stocks = []
+        # 通过前3步筛选的股票 (代码, 名称, 当日数据, 预测请求)
+        candidates = []
 
         pd_data = self._fetcher.get_all_stock_info()
 
         self.process_count = 0
         self.total_count = len(pd_data)
+        reset_frame_cache_stats()
 
         if not pick_date:
             last_date, current_date, predict_date = self._get_trade_date()
@@ -282,105 +465,58 @@ class StockPicker:
         logger.info(f"当前交易日{current_date}")
         logger.info(f"预测交易日{predict_date}")
 
-        for _, row in pd_data.iterrows():  
-            stock_code = row.get('stock_code')
-            stock_name = row.get('stock_name')
+        stock_names = dict(zip(pd_data['stock_code'], pd_data['stock_name']))
+        # 过滤创业板和科创板
+        stock_codes = [code for code in stock_names if not self.should_filter_stock(code)]
 
-            self.process_count = self.process_count + 1
+        # 被过滤的股票直接计入进度
+        self.process_count = self.total_count - len(stock_codes)
+        codes, current_rows = self._screen_candidates(stock_codes, last_date, current_date, pick_date, console_print)
+        self.process_count = self.total_count - len(codes)
+
+        for stock_code in codes:
+            stock_name = stock_names[stock_code]
 
             if self.interrupt_pick:
-                self.interrupt_pick = False
                 break
 
-            # 计算百分比
-            percent = (self.process_count / self.total_count) * 100
-            # 可视化进度条（长度为20）
-            bar_length = 20
-            filled_length = int(bar_length * self.process_count / self.total_count)
-            bar = '#' * filled_length + '-' * (bar_length - filled_length)
-
-            if console_print:
-                # 输出进度条（\r 覆盖，end='' 不换行）
-                print(f"\r进度: [{bar}] {percent:.1f}% {self.process_count}/{self.total_count} {stock_name}({stock_code}) 1/4          ", end='', flush=True)
-            else:
-                logger.info(f"进度: [{bar}] {percent:.1f}% {self.process_count}/{self.total_count} {stock_name}({stock_code}) 1/4")
+            current_data = current_rows.loc[[stock_code]].reset_index(drop=True)
 
-            if self.should_filter_stock(stock_code):  # 过滤创业板和科创板
-                continue
-
-            #获取上一个交易日的股票数据与预测数据
-            try:
-                lastdate_data = self._fetcher.get_daily_kline(stock_code, last_date, last_date)
-                lastdate_p_data = self._db.get_predict_daily_data(stock_code, last_date)
-                if lastdate_p_data.empty:
-                    logger.info(f"前一日交易日预测数据不存在，重新预测: {stock_code} {last_date}")
-                    tmp = self._predict_stock(stock_code, last_date)
-                    self._db.save_predict_daily_data(stock_code, last_date, tmp[0])
-                    lastdate_p_data = self._db.get_predict_daily_data(stock_code, last_date)
-
-                right, is_last_raise = self._is_right_predict(stock_code, lastdate_p_data, lastdate_data, last_date)
-                if not right:
-                    continue
-            except Exception as e:
-                logger.error(f"获取上一个交易日的股票数据失败: {stock_code} {e}")
-                continue
-
-            if console_print:
-                # 输出进度条（\r 覆盖，end='' 不换行）
-                print(f"\r进度: [{bar}] {percent:.1f}% {self.process_count}/{self.total_count} {stock_name}({stock_code}) 2/4          ", end='', flush=True)
-            else:
-                logger.info(f"进度: [{bar}] {percent:.1f}% {self.process_count}/{self.total_count} {stock_name}({stock_code}) 2/4")
-            
-            #获取当前交易日的股票数据与预测数据
+            #构建下一个交易日的预测请求，所有候选股票收集完后统一批量预测
             try:
                 if not pick_date:
-                    current_data = self._db.get_realtime_daily_data(stock_code, current_date)
-                    if current_data.empty:
-                        continue
-
-                    curdate_p_data = self._db.get_predict_daily_data(stock_code, current_date)
-                    if curdate_p_data.empty:
-                        logger.info(f"当前交易日预测数据不存在，重新预测: {stock_code} {current_date}")
-                        tmp = self._predict_stock(stock_code, current_date)
-                        self._db.save_predict_daily_data(stock_code, current_date, tmp[0])
-                        curdate_p_data = self._db.get_predict_daily_data(stock_code, current_date)
+                    predict_request = self._build_predict_request(stock_code, current_date, current_data)
                 else:
-                    current_data = self._fetcher.get_daily_kline(stock_code, current_date, current_date)
-                    curdate_p_data = self._db.get_predict_daily_data(stock_code, current_date)
-                    if curdate_p_data.empty:
-                        logger.info(f"当前交易日预测数据不存在，重新预测: {stock_code} {current_date}")
-                        tmp = self._predict_stock(stock_code, current_date)
-                        self._db.save_predict_daily_data(stock_code, current_date, tmp[0])
-                        curdate_p_data = self._db.get_predict_daily_data(stock_code, current_date)
-
-                right, is_current_raise = self._is_right_predict(stock_code, curdate_p_data, current_data, current_date)
-                if not right:
-                    continue
+                    predict_request = self._build_predict_request(stock_code, predict_date)
+                candidates.append((stock_code, stock_name, current_data, predict_request))
             except Exception as e:
-                logger.error(f"获取当前交易日的股票数据失败: {stock_code} {e}")
+                logger.error(f"构建预测请求失败: {stock_code} {e}")
+                self.process_count = self.process_count + 1
                 continue
 
-            if console_print:
-                # 输出进度条（\r 覆盖，end='' 不换行）
-                print(f"\r进度: [{bar}] {percent:.1f}% {self.process_count}/{self.total_count} {stock_name}({stock_code}) 3/4          ", end='', flush=True)
-            else:
-                logger.info(f"进度: [{bar}] {percent:.1f}% {self.process_count}/{self.total_count} {stock_name}({stock_code}) 3/4")
-            
-            # 判断当前交易日与上一交易日趋势否一致
-            if is_current_raise != is_last_raise:
-                continue
+        #分组批量预测候选股票的下一个交易日数据，每只股票的请求只发送一次，由预测服务采样 PICK_PREDICT_SAMPLES 次
+        #每组结束后检查是否中断，中断时只对已预测的股票选股
+        logger.info(f"批量预测 {len(candidates)} 只候选股票")
+        predictions = []
+        group_size = self._kronos.batch_size * self._kronos.concurrency
+        for group_start in range(0, len(candidates), group_size):
+            if self.interrupt_pick:
+                logger.info(f"选股已中断，已预测 {len(predictions)}/{len(candidates)} 只候选股票")
+                break
+            group = candidates[group_start:group_start + group_size]
+            predictions.extend(self._kronos.predict_many([request for *_, request in group],
+                                                         num_samples=PICK_PREDICT_SAMPLES))
+        self.interrupt_pick = False
 
-            #预测下一个交易日数据，并存储
+        for (stock_code, stock_name, current_data, _), samples in zip(candidates, predictions):
+            self.process_count = self.process_count + 1
             try:
+                if samples is None or any(predict_data is None for predict_data in samples):
+                    raise ValueError("预测服务未返回结果")
+
                 total_increase = 0
                 force_pick = False
-                # 循环进行3次预测
-                for i in range(3):
-                    if not pick_date:
-                        predict_data = self._predict_stock(stock_code, current_date, current_data)
-                    else:
-                        predict_data = self._predict_stock(stock_code, predict_date)
-
+                for predict_data in samples:
                     # 计算涨幅
                     increase = (predict_data[0]['close'] - current_data['close'].iloc[0]) / current_data['close'].iloc[0]
 
@@ -401,17 +537,13 @@ class StockPicker:
                         "close": predict_data[0]['close'],
                         "high": predict_data[0]['high'],
                         "low": predict_data[0]['low'],
-                        "increase": total_increase * 100 / 3
+                        "increase": total_increase * 100 / PICK_PREDICT_SAMPLES
                     })
             except Exception as e:
-                logger.error(f"预测股票数据失败: {stock_code}")
+                logger.error(f"预测股票数据失败: {stock_code} {e}")
                 continue
 
-            if console_print:
-                # 输出进度条（\r 覆盖，end='' 不换行）
-                print(f"\r进度: [{bar}] {percent:.1f}% {self.process_count}/{self.total_count} {stock_name}({stock_code}) 4/4          ", end='', flush=True)
-            else:
-                logger.info(f"进度: [{bar}] {percent:.1f}% {self.process_count}/{self.total_count} {stock_name}({stock_code}) 4/4")    
+            self._report_pick_progress(f"{stock_name}({stock_code}) 4/4", console_print)
 
         #按increase从大到小排序
         sorted_stocks = sorted(pick_up_stocks, key=lambda x: x['increase'], reverse=True)
@@ -426,6 +558,13 @@ class StockPicker:
         # 筛选后不足3个，取排序后的前3个
             selected_stocks = sorted_stocks[:5]
 
+        stats = get_frame_cache_stats()
+        logger.info(
+            f"K线缓存统计: 命中 {stats['hits']} 次，未命中 {stats['misses']} 次，命中率 {stats['hit_rate'] * 100:.1f}%，"
+            f"淘汰 {stats['evictions']} 次，失效 {stats['invalidations']} 次，"
+            f"占用 {stats['bytes'] / 1024 / 1024:.1f}MB/{stats['max_bytes'] / 1024 / 1024:.0f}MB"
+        )
+
         self.is_running = False
 
         return selected_stocks
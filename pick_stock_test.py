@@ -2,6 +2,8 @@ import pandas as pd
 from stock_data_fetcher import StockDataFetcher
 from stock_db import StockDB
 from stock_tools import StockTools
+from stock_prefetch import StockPrefetcher
+from kline_payload import frame_to_bars, dumps, loads, encode_request
 from datetime import datetime, timedelta
 import time
 import requests
@@ -32,22 +34,7 @@ def predict_stock(stock_code, datetime):
 
     pd_data = fetcher.get_daily_kline(stock_code, start_date, end_date)
 
-    history_data_for_chart = []
-    for _, row in pd_data.iterrows():
-        timestamp = row.get('timestamp', row.get('date', ''))
-        if hasattr(timestamp, 'strftime'):
-            timestamp_str = timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        else:
-            timestamp_str = str(timestamp)
-        
-        history_data_for_chart.append({
-            "timestamps": timestamp_str,
-            "open": float(row.get('open', 0)),
-            "high": float(row.get('high', 0)),
-            "low": float(row.get('low', 0)),
-            "close": float(row.get('close', 0)),
-            "volume": float(row.get('volume', 0))
-        })
+    history_data_for_chart = frame_to_bars(pd_data)
 
     predict_request = {
         "predict_len": 1,
@@ -60,11 +47,12 @@ def predict_stock(stock_code, datetime):
     # 发送请求
     response = requests.post(
         target_url,
-        json=predict_request,
+        data=dumps(encode_request(predict_request)),
+        headers={'Content-Type': 'application/json'},
         timeout=60
     )
 
-    response_data = response.json()
+    response_data = loads(response.content)
     prediction_data=response_data['prediction']
 
     return prediction_data
@@ -74,12 +62,15 @@ def predict_all_stock_price():
     end_date = datetime.now().strftime("%Y-%m-%d")
     start_date = (datetime.now() - timedelta(days=100)).strftime("%Y-%m-%d")
 
+    # 并发下载全部股票的日线、5分钟、15分钟K线
+    stock_codes = [code for code in pd_data['stock_code'] if code]
+    StockPrefetcher().prefetch(stock_codes, start_date, end_date, min_periods=('5', '15'))
+
     for _, row in pd_data.iterrows():
         stock_code = row.get('stock_code')
         stock_name = row.get('stock_name')
         if stock_code:
             logger.info(f"开始处理 {stock_name}({stock_code})")
-            prepare_stock(stock_code, start_date=start_date, end_date=end_date)
 
             for i in range(0, 100):
                 p_date = datetime.now() - timedelta(days=i)
@@ -1,8 +1,15 @@
 from .deepseek import DeepSeekAPI
+from .deepseek_async import AsyncDeepSeekAPI
+from .llm_cache import LLMCache
 from .prompt import PromptGenerator
 from .stock_account_tplus1 import TPlusOneStockAccount, TradeDecision
+from .stock_account_compact import CompactTPlusOneStockAccount, TradeLedger
 from .stock_simulation import StockSimulation
-from .stock_strategy_deepseek import StockStrategyDeepSeek
+from .portfolio_simulation import PortfolioSimulation
+from .tick_scheduler import TickScheduler
+from .bar_view import BarView
+from .grid_engine import GridBacktestEngine, GridBacktestResult
+from .stock_strategy_deepseek import DeepSeekStrategy
 from .stock_strategy_gird_v1 import StockStrategyGridV1
 from .stock_strategy_gird_v2 import StockStrategyGridV2
 from .stock_strategy_gird_v3 import StockStrategyGridV3
@@ -11,10 +18,19 @@ __all__ = [
     "StockStrategyGridV1",
     "StockStrategyGridV2",
     "StockStrategyGridV3",
-    "StockStrategyDeepSeek",
+    "DeepSeekStrategy",
     "StockSimulation",
+    "PortfolioSimulation",
+    "TickScheduler",
+    "BarView",
+    "GridBacktestEngine",
+    "GridBacktestResult",
     "TPlusOneStockAccount",
+    "CompactTPlusOneStockAccount",
+    "TradeLedger",
     "TradeDecision",
     "DeepSeekAPI",
+    "AsyncDeepSeekAPI",
+    "LLMCache",
     "PromptGenerator",
 ]
\ No newline at end of file
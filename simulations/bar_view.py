@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+import numpy as np
+from stock_db import StockDB, to_epoch_days, to_epoch_minutes
+from stock_data_fetcher import StockDataFetcher
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _column(df, name):
+    if df.empty:
+        return np.empty(0, dtype=np.float64)
+    return df[name].to_numpy(dtype=np.float64)
+
+
+def _to_datetime(value):
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+    return value
+
+
+class BarView:
+    """
+    回测区间内单只股票K线的内存视图
+
+    构造时把 [start_date, end_date] 的日K线和分钟K线一次性读入 NumPy 数组，
+    以 epoch分钟/epoch天 为键建立 {时间: 行号} 索引，回测中的价格查询和成交判断不再访问数据库。
+
+    get_price / is_trade_success / get_daily_end_price / get_daily_start_price
+    与 StockDataFetcher 的同名方法签名和返回值一致，可以直接替换策略中的 fetcher；
+    其它股票或未加载的周期回退到 StockDataFetcher。
+    """
+
+    def __init__(self, stock_code, start_date, end_date, periods=('15',), db=None):
+        self.stock_code = stock_code
+        self._db = db or StockDB()
+        self._fetcher = StockDataFetcher()
+
+        start_day = _to_datetime(start_date).strftime('%Y-%m-%d')
+        end_day = _to_datetime(end_date).strftime('%Y-%m-%d')
+
+        # {周期: {列名: ndarray}} 与 {周期: {epoch分钟: 行号}}
+        self._min_bars = {}
+        self._min_index = {}
+        for period in periods:
+            df = self._db.get_min_data(stock_code, period, f"{start_day} 00:00:00", f"{end_day} 23:59:59")
+            minutes = to_epoch_minutes(df['datetime']) if not df.empty else np.empty(0, dtype=np.int64)
+            self._min_bars[period] = {'minute': minutes}
+            for name in ('open', 'high', 'low', 'close'):
+                self._min_bars[period][name] = _column(df, name)
+            self._min_index[period] = dict(zip(minutes.tolist(), range(len(minutes))))
+
+        df = self._db.get_daily_data(stock_code, start_day, end_day)
+        days = to_epoch_days(df['date']) if not df.empty else np.empty(0, dtype=np.int64)
+        self._daily_bars = {'day': days, 'open': _column(df, 'open'), 'close': _column(df, 'close')}
+        self._daily_index = dict(zip(days.tolist(), range(len(days))))
+
+    @staticmethod
+    def _minute_key(value):
+        return int((_to_datetime(value) - _EPOCH).total_seconds()) // 60
+
+    @staticmethod
+    def _day_key(value):
+        return (_to_datetime(value).date() - _EPOCH.date()).days
+
+    def min_bars(self, period):
+        """获取已加载的分钟K线数组 {minute, open, high, low, close}，minute 为 epoch分钟"""
+        return self._min_bars.get(period)
+
+    def daily_bars(self):
+        """获取已加载的日K线数组 {day, open, close}，day 为 epoch天数"""
+        return self._daily_bars
+
+    def _min_row(self, stock_code, period, current_datetime):
+        """返回 (行号, 周期数组)；不在视图内返回 None，由调用方回退到 fetcher"""
+        if stock_code != self.stock_code or period not in self._min_bars:
+            return None
+        return self._min_index[period].get(self._minute_key(current_datetime)), self._min_bars[period]
+
+    def get_price(self, stock_code: str, period: str, current_datetime: datetime) -> float:
+        """决策时刻的价格：以 current_datetime 开始的这根K线（时间标记为结束时刻）的开盘价"""
+        found = self._min_row(stock_code, period, current_datetime + timedelta(minutes=15))
+        if found is None:
+            return self._fetcher.get_price(stock_code, period, current_datetime)
+
+        row, bars = found
+        if row is None:
+            return None
+        return float(bars['open'][row])
+
+    def is_trade_success(self, stock_code: str, period: str, price: float, quantity: int, action: str, current_datetime: str) -> bool:
+        """判断交易是否成功：价格落在 current_datetime 这根K线的最低价和最高价之间"""
+        found = self._min_row(stock_code, period, current_datetime)
+        if found is None:
+            return self._fetcher.is_trade_success(stock_code, period, price, quantity, action, current_datetime)
+
+        row, bars = found
+        if row is None:
+            return False
+        return bool(bars['low'][row] <= price <= bars['high'][row])
+
+    def _daily_price(self, stock_code, current_datetime, column):
+        row = self._daily_index.get(self._day_key(current_datetime))
+        if row is None:
+            return None
+        return float(self._daily_bars[column][row])
+
+    def get_daily_end_price(self, stock_code: str, current_datetime: datetime) -> float:
+        if stock_code != self.stock_code:
+            return self._fetcher.get_daily_end_price(stock_code, current_datetime)
+        return self._daily_price(stock_code, current_datetime, 'close')
+
+    def get_daily_start_price(self, stock_code: str, current_datetime: datetime) -> float:
+        if stock_code != self.stock_code:
+            return self._fetcher.get_daily_start_price(stock_code, current_datetime)
+        return self._daily_price(stock_code, current_datetime, 'open')
@@ -1,24 +1,57 @@
 # deepseek.py
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import logging
 import os
+import time
 from dotenv import load_dotenv
 import logging
+from llm_cache import LLMCache
 
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+DEEPSEEK_API_URL = os.environ.get("DEEPSEEK_API_URL", "https://api.deepseek.com/v1/chat/completions")
+# on: 先查缓存，未命中再请求接口并写入缓存; replay: 只读缓存，未命中返回 None; off: 不使用缓存
+CACHE_MODES = ("on", "replay", "off")
+
+
 class DeepSeekAPI:
-    def __init__(self):
+    def __init__(self, url=None, cache=None, cache_mode=None, pool_size=None):
+        """
+        Args:
+            url (str): Chat completions endpoint, defaults to DEEPSEEK_API_URL
+            cache (LLMCache): Response cache, created from LLM_CACHE_DB when needed
+            cache_mode (str): on / replay / off, defaults to DEEPSEEK_CACHE_MODE or "on"
+            pool_size (int): Keep-alive connections kept by the session, defaults to DEEPSEEK_CONCURRENCY or 8
+        """
         self._api_key = os.environ.get("DEEPSEEK_API_KEY")
+        self.url = url or DEEPSEEK_API_URL
+        self.cache_mode = cache_mode or os.environ.get("DEEPSEEK_CACHE_MODE", "on")
+        if self.cache_mode not in CACHE_MODES:
+            raise ValueError(f"cache_mode must be one of {CACHE_MODES}, got {self.cache_mode}")
+        self._cache = cache if cache is not None or self.cache_mode == "off" else LLMCache()
+        self.pool_size = pool_size or int(os.environ.get("DEEPSEEK_CONCURRENCY", 8))
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
         self.token_cost = 0
-    
+        self.latency_ms = 0.0
+        self.cache_hit = False
+
+    def close(self):
+        self._session.close()
+
     def ask_question(self, prompt, model="deepseek-chat", timeout=60):
         """
         Send question to DeepSeek API and get response
-        
+
+        With the cache enabled, a prompt already answered by the same model is served from
+        the cache; token_cost is 0 for such calls and every call is recorded in the cache db.
+
         Args:
             prompt (str): The question or prompt to send
             model (str): Model to use
@@ -27,13 +60,48 @@ class DeepSeekAPI:
         Returns:
             str: API response content, or None if failed
         """
+        result = self.call(prompt, model, timeout)
+        self.token_cost = result["total_tokens"]
+        self.latency_ms = result["latency_ms"]
+        self.cache_hit = result["cache_hit"]
+        return result["content"]
+
+    def call(self, prompt, model="deepseek-chat", timeout=60):
+        """
+        Same as ask_question but returns the per-call statistics instead of storing them
+        on the instance, so it can be called from several threads at once
+
+        Returns:
+            dict: {content, total_tokens, latency_ms, cache_hit}, content is None if failed
+        """
+        start = time.perf_counter()
+        if self._cache is not None and self.cache_mode != "off":
+            cached = self._cache.get(model, prompt)
+            if cached is not None:
+                latency_ms = (time.perf_counter() - start) * 1000
+                self._cache.record_call(cached["cache_key"], model, True, latency_ms=latency_ms)
+                return {"content": cached["response"], "total_tokens": 0, "latency_ms": latency_ms, "cache_hit": True}
+            if self.cache_mode == "replay":
+                logger.error("❌ DeepSeek cache miss in replay mode")
+                return {"content": None, "total_tokens": 0, "latency_ms": 0.0, "cache_hit": False}
+
+        content, usage = self._request(prompt, model, timeout)
+        latency_ms = (time.perf_counter() - start) * 1000
+        if content is not None and self._cache is not None and self.cache_mode != "off":
+            key = self._cache.put(model, prompt, content, usage, latency_ms)
+            self._cache.record_call(key, model, False, usage, latency_ms)
+        return {"content": content, "total_tokens": (usage or {}).get("total_tokens", 0),
+                "latency_ms": latency_ms, "cache_hit": False}
+
+    def _request(self, prompt, model, timeout):
+        """Returns (content, usage), content is None if failed"""
         if not self._api_key:
             error_msg = "DeepSeek API key not configured"
             logger.error(error_msg)
-            return None
+            return None, None
         
         try:
-            url = "https://api.deepseek.com/v1/chat/completions"
+            url = self.url
             headers = {
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {self._api_key}"
@@ -52,25 +120,24 @@ class DeepSeekAPI:
             
             logger.info("Sending request to DeepSeek API...")
             
-            response = requests.post(url, headers=headers, json=data, timeout=timeout)
+            response = self._session.post(url, headers=headers, json=data, timeout=timeout)
             
             if response.status_code == 200:
                 result = response.json()
-                self.token_cost = result["usage"]["total_tokens"]
                 logger.info(f"消耗token数: {result['usage']['total_tokens']}")
                 content = result["choices"][0]["message"]["content"]
                 logger.info("DeepSeek API request successful")
-                return content
+                return content, result["usage"]
             else:
                 logger.error(f"DeepSeek API error: {response.status_code} - {response.text}")
-                return None
+                return None, None
                 
         except requests.exceptions.RequestException as e:
             logger.error(f"Network error calling DeepSeek API: {str(e)}")
-            return None
+            return None, None
         except Exception as e:
             logger.error(f"Error calling DeepSeek API: {str(e)}")
-            return None
+            return None, None
     
 # Test function
 if __name__ == "__main__":
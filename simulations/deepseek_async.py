@@ -0,0 +1,68 @@
+# deepseek_async.py
+"""
+DeepSeek 异步客户端
+
+在 asyncio 中并发请求 DeepSeek：同时在途的请求数由 asyncio.Semaphore 限制为 concurrency，
+请求在同样大小的线程池中通过 DeepSeekAPI 的 requests.Session 发出，保持长连接复用；
+缓存、回放和调用记录与同步的 DeepSeekAPI 完全相同。
+
+环境变量:
+    DEEPSEEK_CONCURRENCY  同时在途的请求数，默认 8
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from deepseek import DeepSeekAPI
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDeepSeekAPI:
+    def __init__(self, api=None, concurrency=None):
+        """
+        Args:
+            api (DeepSeekAPI): 同步客户端，决定接口地址和缓存，默认新建一个
+            concurrency (int): 同时在途的请求数，默认 DEEPSEEK_CONCURRENCY 或 8
+        """
+        self.concurrency = concurrency or int(os.environ.get("DEEPSEEK_CONCURRENCY", 8))
+        self._api = api or DeepSeekAPI(pool_size=self.concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='deepseek')
+        # Semaphore 绑定创建它的事件循环，每次 asyncio.run 都是新的循环，需要按循环重新创建
+        self._loop = None
+        self._semaphore = None
+        self.total_tokens = 0
+        self.calls = 0
+        self.cache_hits = 0
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._api.close()
+
+    def _get_semaphore(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def call(self, prompt, model="deepseek-chat", timeout=60):
+        """
+        返回:
+            dict: {content, total_tokens, latency_ms, cache_hit}，失败时 content 为 None
+        """
+        async with self._get_semaphore():
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._api.call, prompt, model, timeout
+            )
+        self.calls += 1
+        self.total_tokens += result["total_tokens"]
+        self.cache_hits += result["cache_hit"]
+        return result
+
+    async def ask_question(self, prompt, model="deepseek-chat", timeout=60):
+        """
+        返回:
+            str: 接口应答内容，失败时为 None
+        """
+        return (await self.call(prompt, model, timeout))["content"]
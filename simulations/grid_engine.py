@@ -0,0 +1,332 @@
+from datetime import datetime, timedelta
+import numpy as np
+from stock_tools import StockTools
+from simulations.stock_strategy_gird_v1 import StockStrategyGridV1
+from simulations.stock_strategy_gird_v2 import StockStrategyGridV2
+from simulations.stock_strategy_gird_v3 import StockStrategyGridV3
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# 与 StockSimulation.run 相同的16个决策时刻（距当日0点的分钟数），价格取以该时刻开始的15分钟K线
+DECISION_MINUTES = np.array([
+    9 * 60 + 30, 9 * 60 + 45, 10 * 60, 10 * 60 + 15, 10 * 60 + 30, 10 * 60 + 45, 11 * 60, 11 * 60 + 15,
+    13 * 60, 13 * 60 + 15, 13 * 60 + 30, 13 * 60 + 45, 14 * 60, 14 * 60 + 15, 14 * 60 + 30, 14 * 60 + 45,
+], dtype=np.int64)
+
+STRATEGY_VERSIONS = {
+    StockStrategyGridV1: 1,
+    StockStrategyGridV2: 2,
+    StockStrategyGridV3: 3,
+}
+
+ACTION_BUY = 1
+ACTION_SELL = -1
+
+# 与 TPlusOneStockAccount 相同的费用
+TRANSACTION_FEE = 5
+STAMP_DUTY_RATE = 0.0005
+
+
+def _clamp(index, count):
+    if index >= count:
+        return count - 1
+    if index < 0:
+        return 0
+    return index
+
+
+def _grid_loop(version, grid_sizes, price, low, high, valid, initial_cash):
+    """
+    网格策略 + T+1账户的逐tick模拟，price/low/high/valid 为 (交易日数, 16) 的二维数组
+
+    逐条对应 StockStrategyGridV1/V2/V3.make_decision 与 TPlusOneStockAccount.buy/sell/next_trading_day，
+    浮点运算顺序与原实现一致，保证结果逐位相同。
+
+    返回:
+        (成交数, 成交tick序号, 成交方向, 成交价, 成交数量, 现金, 是否持仓, 总数量, 可售数量, 成本价)
+    """
+    n_days, n_ticks = price.shape
+    n_sizes = len(grid_sizes)
+
+    trade_tick = np.empty(n_days * n_ticks, dtype=np.int64)
+    trade_action = np.empty(n_days * n_ticks, dtype=np.int64)
+    trade_price = np.empty(n_days * n_ticks, dtype=np.float64)
+    trade_quantity = np.empty(n_days * n_ticks, dtype=np.float64)
+    n_trades = 0
+
+    cash = float(initial_cash)
+    has_holding = False
+    hold_total = 0.0
+    hold_available = 0.0
+    hold_cost = 0.0
+
+    has_base = False
+    base_price = 0.0
+    base_volume = 0.0
+    buy_index = 0
+    sell_index = 0
+    buy_cache = 0.0
+    sell_cache = 0.0
+
+    for day in range(n_days):
+        for tick in range(n_ticks):
+            if not valid[day, tick]:
+                continue
+            p = price[day, tick]
+
+            available = hold_available if has_holding else 0.0
+            if available == 0 and cash < 100 * p:
+                continue
+
+            action = 0
+            quantity = 0.0
+
+            if not has_base:
+                total = hold_total if has_holding else 0.0
+                can_buy = float(int(cash / (p * 100)) * 100)
+                base_volume = float(int((total + can_buy) / 1000) * 100)
+                base_price = p
+                has_base = True
+                if can_buy > total:
+                    volume = float(int(((can_buy - total) / 2) / 100) * 100)
+                    if volume > 0:
+                        action = ACTION_BUY
+                        quantity = volume
+                else:
+                    volume = float(int(((total - can_buy) / 2) / 100) * 100)
+                    if volume > 0:
+                        action = ACTION_SELL
+                        quantity = volume
+
+            elif version == 1:
+                if p < base_price * (1 - grid_sizes[buy_index]):
+                    if base_volume > 0 and cash >= p * base_volume:
+                        if buy_index < n_sizes - 1:
+                            buy_index += 1
+                        if sell_index > 0:
+                            sell_index -= 1
+                        base_price = p + (base_volume * p * 0.0005 + 10) / base_volume
+                        action = ACTION_BUY
+                        quantity = base_volume
+                elif p > base_price * (1 + grid_sizes[sell_index]):
+                    if available >= base_volume:
+                        if sell_index < n_sizes - 1:
+                            sell_index += 1
+                        if buy_index > 0:
+                            buy_index -= 1
+                        base_price = p
+                        action = ACTION_SELL
+                        quantity = base_volume
+
+            else:
+                grid_up_edge = base_price * (1 + grid_sizes[_clamp(sell_index, n_sizes)])
+                grid_down_edge = base_price * (1 - grid_sizes[_clamp(buy_index, n_sizes)])
+
+                if p < grid_down_edge:
+                    if base_volume > 0 and cash >= p * base_volume:
+                        k_volume = 0.0
+                        down_edge = base_price
+                        down_edge -= base_price * grid_sizes[_clamp(buy_index, n_sizes)]
+                        while True:
+                            buy_index += 1
+                            sell_index -= 1
+                            k_volume += 1.0
+                            down_edge -= base_price * grid_sizes[_clamp(buy_index, n_sizes)]
+                            if p > down_edge:
+                                break
+
+                        if version == 2:
+                            base_price = p + (base_volume * p * 0.0005 + 10) / base_volume
+                            action = ACTION_BUY
+                            quantity = base_volume
+                        elif sell_cache == k_volume:
+                            base_price = p + (base_volume * p * 0.0005 + 10) / base_volume
+                            sell_cache = 0.0
+                        elif sell_cache > k_volume:
+                            quantity = base_volume * (sell_cache - k_volume)
+                            base_price = p + (base_volume * p * 0.0005 + 10) / base_volume
+                            sell_cache = 0.0
+                            action = ACTION_SELL
+                        else:
+                            k_volume = k_volume - sell_cache
+                            sell_cache = 0.0
+                            if k_volume > 1.0:
+                                buy_cache += k_volume
+                            base_price = p + (base_volume * p * 0.0005 + 10) / base_volume
+                            action = ACTION_BUY
+                            quantity = base_volume
+
+                elif p > grid_up_edge:
+                    if available >= base_volume:
+                        k_volume = 0.0
+                        up_edge = base_price
+                        up_edge += base_price * grid_sizes[_clamp(sell_index, n_sizes)]
+                        while True:
+                            sell_index += 1
+                            buy_index -= 1
+                            k_volume += 1.0
+                            up_edge += base_price * grid_sizes[_clamp(sell_index, n_sizes)]
+                            if p < up_edge:
+                                break
+
+                        if version == 2:
+                            base_price = p
+                            action = ACTION_SELL
+                            quantity = float(int((base_volume * k_volume) / 100) * 100)
+                        elif buy_cache == k_volume:
+                            base_price = p
+                            buy_cache = 0.0
+                        elif buy_cache > k_volume:
+                            quantity = base_volume * (buy_cache - k_volume)
+                            base_price = p
+                            buy_cache = 0.0
+                            action = ACTION_BUY
+                        else:
+                            k_volume = k_volume - buy_cache
+                            buy_cache = 0.0
+                            if k_volume > 1.0:
+                                sell_cache += k_volume
+                            base_price = p
+                            action = ACTION_SELL
+                            quantity = float(int(base_volume / 100) * 100)
+
+            if action == 0:
+                continue
+            # 成交判断：决策价落在这根K线的最低价和最高价之间
+            if not (low[day, tick] <= p <= high[day, tick]):
+                continue
+            # 交易数量必须是100的正整数倍
+            if quantity <= 0 or quantity % 100 != 0:
+                continue
+
+            if action == ACTION_BUY:
+                total_cost = p * quantity
+                total_expense = total_cost + TRANSACTION_FEE * 2 + (TRANSACTION_FEE + total_cost * STAMP_DUTY_RATE)
+                if cash < total_expense:
+                    continue
+                cash -= total_expense
+                if has_holding:
+                    new_total = hold_total + quantity
+                    hold_cost = (hold_total * hold_cost + total_expense) / new_total
+                    hold_total = new_total
+                else:
+                    has_holding = True
+                    hold_total = quantity
+                    hold_available = 0.0
+                    hold_cost = total_expense / quantity
+            else:
+                if not has_holding or hold_available < quantity:
+                    continue
+                cash += p * quantity
+                hold_total = hold_total - quantity
+                hold_available = hold_available - quantity
+
+            trade_tick[n_trades] = day * n_ticks + tick
+            trade_action[n_trades] = action
+            trade_price[n_trades] = p
+            trade_quantity[n_trades] = quantity
+            n_trades += 1
+
+        # 进入下一个交易日：清除零持仓，当日买入的股票变为可售
+        if has_holding:
+            if hold_total == 0:
+                has_holding = False
+                hold_total = 0.0
+                hold_available = 0.0
+                hold_cost = 0.0
+            else:
+                hold_available = hold_total
+
+    return (n_trades, trade_tick, trade_action, trade_price, trade_quantity,
+            cash, has_holding, hold_total, hold_available, hold_cost)
+
+
+if njit is not None:
+    _clamp = njit(cache=True)(_clamp)
+    _grid_loop = njit(cache=True)(_grid_loop)
+
+
+class GridBacktestResult:
+    def __init__(self, trades, cash, quantity, final_value, change_rate, new_change_rate):
+        # [(成交时间, 'buy'/'sell', 价格, 数量), ...]
+        self.trades = trades
+        self.cash = cash
+        self.quantity = quantity
+        self.final_value = final_value
+        # 与 StockSimulation.run 的返回值相同：不交易的涨跌幅，交易后的收益率
+        self.change_rate = change_rate
+        self.new_change_rate = new_change_rate
+
+
+class GridBacktestEngine:
+    """
+    网格策略的数组回测引擎
+
+    构造时把回测区间的15分钟K线展开为 (交易日数, 16) 的决策价格矩阵，之后每次 run 只是一趟紧凑的数值循环，
+    安装了 numba 时会编译为机器码。结果（成交列表、最终资产）与 StockSimulation 逐tick回测一致，
+    适合对 _grid_size 网格梯度做大批量参数扫描。
+    """
+
+    def __init__(self, bar_view, start_date, end_date):
+        trading_days = StockTools().trading_days_between(start_date, end_date)
+        self.stock_code = bar_view.stock_code
+        self._days = trading_days
+
+        bars = bar_view.min_bars('15')
+        tick_minutes = trading_days.astype(np.int64)[:, None] * 1440 + DECISION_MINUTES[None, :] + 15
+        index = np.searchsorted(bars['minute'], tick_minutes)
+        index = np.minimum(index, max(len(bars['minute']) - 1, 0))
+        if len(bars['minute']):
+            self._valid = bars['minute'][index] == tick_minutes
+            self._price = np.where(self._valid, bars['open'][index], 0.0)
+            self._low = np.where(self._valid, bars['low'][index], 0.0)
+            self._high = np.where(self._valid, bars['high'][index], 0.0)
+        else:
+            self._valid = np.zeros(tick_minutes.shape, dtype=bool)
+            self._price = self._low = self._high = np.zeros(tick_minutes.shape)
+
+        self._start_price = bar_view.get_daily_start_price(self.stock_code, start_date)
+        self._end_price = bar_view.get_daily_end_price(self.stock_code, end_date)
+        # 交易后资产按最后一个交易日的收盘价计算
+        self._last_close = bar_view.get_daily_end_price(self.stock_code, self._day_datetime(-1)) if len(trading_days) else None
+
+    def _day_datetime(self, day):
+        return datetime.strptime(str(self._days[day]), '%Y-%m-%d')
+
+    def _tick_datetime(self, tick):
+        day, offset = divmod(int(tick), len(DECISION_MINUTES))
+        return self._day_datetime(day) + timedelta(minutes=int(DECISION_MINUTES[offset]))
+
+    def run(self, version=1, grid_sizes=(0.02,), initial_cash=100000):
+        """
+        运行一次回测
+
+        参数:
+            version: 网格策略版本 1/2/3，对应 StockStrategyGridV1/V2/V3
+            grid_sizes: 网格间隔梯度，对应策略的 _grid_size
+            initial_cash: 初始资金
+        """
+        (n_trades, trade_tick, trade_action, trade_price, trade_quantity,
+         cash, has_holding, hold_total, _, _) = _grid_loop(
+            version, np.asarray(grid_sizes, dtype=np.float64),
+            self._price, self._low, self._high, self._valid, float(initial_cash)
+        )
+
+        trades = [
+            (self._tick_datetime(trade_tick[i]), 'buy' if trade_action[i] == ACTION_BUY else 'sell',
+             float(trade_price[i]), float(trade_quantity[i]))
+            for i in range(n_trades)
+        ]
+
+        quantity = hold_total if has_holding else 0.0
+        final_value = (quantity * self._last_close if has_holding else 0) + cash
+        change_rate = (self._end_price - self._start_price) / self._start_price
+        new_change_rate = (final_value - initial_cash) / initial_cash
+        return GridBacktestResult(trades, cash, quantity, final_value, change_rate, new_change_rate)
+
+    def run_strategy(self, strategy, initial_cash=100000):
+        """用网格策略实例的版本和 _grid_size 运行回测"""
+        return self.run(STRATEGY_VERSIONS[type(strategy)], strategy._grid_size, initial_cash)
@@ -0,0 +1,135 @@
+# llm_cache.py
+"""
+大模型应答缓存
+
+以 sha256(模型 + 提示词) 为键把应答保存在 SQLite 中，同一个回测再次运行时直接返回上次的应答，
+不再请求接口，结果也与上次完全一致。
+
+表结构:
+    llm_responses  每个键一条：模型、提示词、应答、首次请求时的token用量和耗时
+    llm_calls      每次调用一条：是否命中缓存、token用量、耗时，用于统计成本和性能
+
+环境变量:
+    LLM_CACHE_DB  缓存数据库路径，默认 llm_cache.db
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_DB = os.environ.get('LLM_CACHE_DB', 'llm_cache.db')
+
+
+def cache_key(model, prompt):
+    """模型和提示词的内容哈希，模型名中不会出现换行，用换行分隔不会产生歧义"""
+    return hashlib.sha256(f"{model}\n{prompt}".encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, db_path=None):
+        self.db_path = db_path or LLM_CACHE_DB
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                response TEXT NOT NULL,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                total_tokens INTEGER,
+                latency_ms REAL,
+                created_at TEXT DEFAULT (datetime('now', 'localtime'))
+            );
+            CREATE TABLE IF NOT EXISTS llm_calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cache_key TEXT NOT NULL,
+                model TEXT NOT NULL,
+                cached INTEGER NOT NULL,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                total_tokens INTEGER,
+                latency_ms REAL,
+                called_at TEXT DEFAULT (datetime('now', 'localtime'))
+            );
+        """)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, model, prompt):
+        """
+        查询缓存
+
+        返回:
+            dict: {cache_key, response, prompt_tokens, completion_tokens, total_tokens, latency_ms}，未命中为 None
+        """
+        key = cache_key(model, prompt)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, prompt_tokens, completion_tokens, total_tokens, latency_ms "
+                "FROM llm_responses WHERE cache_key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'cache_key': key, 'response': row[0], 'prompt_tokens': row[1],
+            'completion_tokens': row[2], 'total_tokens': row[3], 'latency_ms': row[4],
+        }
+
+    def put(self, model, prompt, response, usage=None, latency_ms=None):
+        """保存一次接口应答，usage 为接口返回的 usage 字段"""
+        key = cache_key(model, prompt)
+        usage = usage or {}
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses "
+                "(cache_key, model, prompt, response, prompt_tokens, completion_tokens, total_tokens, latency_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, prompt, response, usage.get('prompt_tokens'), usage.get('completion_tokens'),
+                 usage.get('total_tokens'), latency_ms)
+            )
+            self._conn.commit()
+        return key
+
+    def record_call(self, key, model, cached, usage=None, latency_ms=None):
+        """记录一次调用，命中缓存时 token 用量记为 0"""
+        usage = usage or {}
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO llm_calls "
+                "(cache_key, model, cached, prompt_tokens, completion_tokens, total_tokens, latency_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, int(cached), usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0),
+                 usage.get('total_tokens', 0), latency_ms)
+            )
+            self._conn.commit()
+
+    def stats(self):
+        """
+        按是否命中缓存汇总调用记录
+
+        返回:
+            dict: {'hit': {...}, 'miss': {...}}，每项包含 calls、total_tokens、avg_latency_ms、max_latency_ms
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT cached, COUNT(*), COALESCE(SUM(total_tokens), 0), AVG(latency_ms), MAX(latency_ms) "
+                "FROM llm_calls GROUP BY cached"
+            ).fetchall()
+        result = {name: {'calls': 0, 'total_tokens': 0, 'avg_latency_ms': 0.0, 'max_latency_ms': 0.0}
+                  for name in ('hit', 'miss')}
+        for cached, calls, total_tokens, avg_latency, max_latency in rows:
+            result['hit' if cached else 'miss'] = {
+                'calls': calls, 'total_tokens': total_tokens,
+                'avg_latency_ms': avg_latency or 0.0, 'max_latency_ms': max_latency or 0.0,
+            }
+        return result
@@ -3,7 +3,10 @@ import os
 sys.path.append("../")
 from datetime import datetime
 from simulations.stock_simulation import StockSimulation
+from simulations.tick_scheduler import TickScheduler
 from simulations.stock_strategy_deepseek import DeepSeekStrategy
+from simulations.deepseek import DeepSeekAPI
+from simulations.deepseek_async import AsyncDeepSeekAPI
 from simulations.stock_strategy_gird_v1 import StockStrategyGridV1
 from simulations.stock_strategy_gird_v2 import StockStrategyGridV2
 from simulations.stock_strategy_gird_v3 import StockStrategyGridV3
@@ -44,8 +47,21 @@ if __name__ == '__main__':
 
     log_file_dir_base = f'./log/{datetime.now().strftime("%Y%m%d%H%M%S")}'
 
+    # 所有 DeepSeekStrategy 共用一个连接池和一个并发上限，网格策略不需要
+    concurrency = int(os.environ.get("DEEPSEEK_CONCURRENCY", 8))
+    deepseek_api = None
+    async_deepseek_api = None
+    if DeepSeekStrategy in stratepys_classes:
+        deepseek_api = DeepSeekAPI(pool_size=concurrency)
+        async_deepseek_api = AsyncDeepSeekAPI(deepseek_api, concurrency=concurrency)
+
+    def make_strategy(strategy_class):
+        if strategy_class is DeepSeekStrategy:
+            return DeepSeekStrategy(api=deepseek_api, async_api=async_deepseek_api)
+        return strategy_class()
+
     for strategy_class in stratepys_classes:
-        tmp = strategy_class()
+        tmp = make_strategy(strategy_class)
         log_file_dir = f'{log_file_dir_base}/{tmp.name()}'
         os.makedirs(log_file_dir, exist_ok=True)
 
@@ -55,13 +71,18 @@ if __name__ == '__main__':
         total_old = 0
         total_new = 0
         with open(summary_file, 'w', encoding='utf-8') as f:
+            simulations = []
             for stock in stocks:
                 stock_code = stock['stock_code']
                 stock_name = stock['stock_name']
-                strategy = strategy_class()
-                simulation = StockSimulation(stock_code, stock_name, start_date, end_date, strategy, initial_cash=initial_cash, log_dir_path=log_file_dir, summary_file=f)
-                old, new = simulation.run()
+                strategy = make_strategy(strategy_class)
+                simulations.append(StockSimulation(stock_code, stock_name, start_date, end_date, strategy, initial_cash=initial_cash, log_dir_path=log_file_dir))
 
+            # 各股票按决策时刻同步推进，同一时刻的 DeepSeek 请求并发发出，收益与逐只运行一致；
+            # 各回测结束的先后不固定，汇总行在全部结束后按股票顺序写出
+            results = TickScheduler(simulations, concurrency=concurrency).run()
+            for simulation, (old, new) in zip(simulations, results):
+                f.write(simulation.summary_line(old, new))
                 performance_diff = new - old
 
                 total_old += old * initial_cash
@@ -78,4 +99,8 @@ if __name__ == '__main__':
             else:
                 f.write(f"平均跑输: {total_performance / len(stocks):.2f}%\n")
 
-            f.write(f"胜率    : {(win_count / len(stocks)):.2f}%\n")
\ No newline at end of file
+            f.write(f"胜率    : {(win_count / len(stocks)):.2f}%\n")
+
+    if async_deepseek_api is not None:
+        # 同时关闭共用的 DeepSeekAPI
+        async_deepseek_api.close()
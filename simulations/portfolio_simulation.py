@@ -0,0 +1,294 @@
+"""
+多股票组合回测
+
+多只股票共用一个T+1账户和同一个时钟：每只股票的15分钟K线按交易日分段载入为 BarView，
+逐段生成 (决策时刻, 股票序号, ...) 事件流，heapq.merge 把各股票的事件流归并为一条按时间排序的流，
+同一决策时刻内按股票顺序依次调用各自的策略。每只股票同一时间只持有当前分段的K线，
+内存占用约为 股票数 × chunk_days 个交易日的K线，与回测区间长度无关。
+
+单只股票的决策、成交判断和每日结算规则与 StockSimulation 相同。
+
+用法:
+    python simulations/portfolio_simulation.py --stocks 603220:中贝通信 600036 --start 2025-06-02 --end 2025-12-01 \\
+        [--strategy StockStrategyGridV1] [--cash 500000] [--chunk-days 20]
+    python simulations/portfolio_simulation.py --all --start 2025-11-03 --end 2025-12-01 --log-mode none
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, 'simulations')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import argparse
+import heapq
+import itertools
+import math
+import time
+import uuid
+from datetime import datetime, timedelta
+import numpy as np
+from stock_tools import StockTools
+from simulations.bar_view import BarView
+from simulations.grid_engine import DECISION_MINUTES
+from simulations.simulation_log import SimulationLog
+from simulations.stock_account_tplus1 import TPlusOneStockAccount
+import logging
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class PortfolioSimulation:
+    def __init__(self, stocks, start_date, end_date, strategy_factory, initial_cash=100000,
+                 log_dir_path: str = "./log", log_mode: str = "full", account_class=TPlusOneStockAccount,
+                 chunk_days=20, prefetch=False):
+        """
+        参数:
+            stocks: [{'stock_code': ..., 'stock_name': ...}, ...]，可以直接使用 StockPicker.pick_up_stock 的返回值
+            strategy_factory: 无参可调用对象（通常是策略类），每只股票创建一个策略实例
+            chunk_days: 每只股票每次载入的交易日数
+            prefetch: 是否先用 StockPrefetcher 下载所有股票的日K线和15分钟K线
+        """
+        self.stocks = [(stock['stock_code'], stock.get('stock_name') or stock['stock_code']) for stock in stocks]
+        self.start_date = start_date
+        self.end_date = end_date
+        self.strategies = [strategy_factory() for _ in self.stocks]
+        self.chunk_days = chunk_days
+        self.account = None
+        self._account_class = account_class
+        self._initial_cash = initial_cash
+        self.uuid = str(uuid.uuid4())
+
+        strategy_name = self.strategies[0].name() if self.strategies else ''
+        self.simluation_name = f"portfolio({len(self.stocks)})-{start_date.strftime('%Y-%m%d')}-{end_date.strftime('%m%d')}-{strategy_name}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        if log_mode != "none":
+            os.makedirs(log_dir_path, exist_ok=True)
+        self.log_file = f"{log_dir_path}/{self.simluation_name}.log"
+        self.decision_file = f"{log_dir_path}/{self.simluation_name}.json"
+        self._log = SimulationLog(self.log_file, self.decision_file, {
+            "name": self.simluation_name,
+            "uuid": self.uuid,
+            "stock_codes": [stock_code for stock_code, _ in self.stocks],
+            "start_date": start_date.strftime('%Y-%m-%d'),
+            "end_date": end_date.strftime('%Y-%m-%d'),
+            "strategy": strategy_name,
+            "created_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }, mode=log_mode)
+
+        if prefetch:
+            from stock_prefetch import StockPrefetcher
+            StockPrefetcher().prefetch([stock_code for stock_code, _ in self.stocks],
+                                       start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'),
+                                       daily=True, min_periods=('15',))
+
+        # 每个决策时刻（同一时钟tick）的处理耗时，单位秒
+        self.tick_times = []
+        # 每个交易日结束时的总资产 [(日期, 总资产), ...]
+        self.equity_curve = []
+
+    def _log_message(self, message, to_console: bool = False):
+        self._log.message(message, to_console)
+
+    def _events(self, index, stock_code, trading_days):
+        """
+        按交易日分段载入一只股票的K线，按时间顺序生成事件
+        (决策时刻epoch分钟, 股票序号, K线行号, K线数组, BarView, 当日开盘价, 当日收盘价)
+        """
+        for chunk_start in range(0, len(trading_days), self.chunk_days):
+            days = trading_days[chunk_start:chunk_start + self.chunk_days]
+            first_day = datetime.strptime(str(days[0]), '%Y-%m-%d')
+            last_day = datetime.strptime(str(days[-1]), '%Y-%m-%d')
+            view = BarView(stock_code, first_day, last_day)
+            bars = view.min_bars('15')
+            if not len(bars['minute']):
+                continue
+
+            # 以 t 开始的K线时间标记为 t+15，决策时刻为标记减15分钟
+            decision_minutes = bars['minute'] - 15
+            day_numbers = decision_minutes // 1440
+            mask = np.isin(decision_minutes % 1440, DECISION_MINUTES) & np.isin(day_numbers, days.astype(np.int64))
+            rows = np.nonzero(mask)[0]
+
+            daily = view.daily_bars()
+            day_open = np.full(len(rows), np.nan)
+            day_close = np.full(len(rows), np.nan)
+            if len(daily['day']):
+                day_rows = np.minimum(np.searchsorted(daily['day'], day_numbers[rows]), len(daily['day']) - 1)
+                found = daily['day'][day_rows] == day_numbers[rows]
+                day_open[found] = daily['open'][day_rows[found]]
+                day_close[found] = daily['close'][day_rows[found]]
+
+            for minute, row, open_price, close_price in zip(decision_minutes[rows].tolist(), rows.tolist(), day_open.tolist(), day_close.tolist()):
+                yield minute, index, row, bars, view, open_price, close_price
+
+    def _decide(self, index, row, bars, cur_datetime):
+        stock_code, stock_name = self.stocks[index]
+        strategy = self.strategies[index]
+        current_price = float(bars['open'][row])
+
+        if self._log.enabled:
+            self._log_message(f"=== {stock_name}({stock_code}) 决策时间: {cur_datetime} 当前价格: {current_price} ===")
+
+        availiable_quantity = self.account.availiable_quantity(stock_code)
+        if availiable_quantity == 0 and self.account.cash < 100 * current_price:
+            return
+
+        decision = strategy.make_decision(stock_name, stock_code, self.account, cur_datetime)
+        if decision.action not in ("buy", "sell"):
+            return
+
+        # 成交判断：决策价落在这根K线的最低价和最高价之间
+        if not bars['low'][row] <= decision.price <= bars['high'][row]:
+            return
+
+        if decision.action == "buy":
+            success = self.account.buy(decision.stock_code, decision.price, decision.quantity, decision)
+        else:
+            success = self.account.sell(decision.stock_code, decision.price, decision.quantity, decision)
+
+        if success and self._log.enabled:
+            self._log.decision({
+                "decision_time": cur_datetime.strftime('%Y-%m-%d %H:%M:%S'),
+                "action": decision.action,
+                "stock_code": decision.stock_code,
+                "price": decision.price,
+                "quantity": decision.quantity,
+                "reason": decision.reason,
+                "stop_loss": getattr(decision, 'stop_loss', None),
+                "take_profit": getattr(decision, 'take_profit', None)
+            })
+            self._log_message(f"成功{'买入' if decision.action == 'buy' else '卖出'} {decision.stock_code} {decision.quantity}股 @ {decision.price}")
+
+    def _end_day(self, day, end_prices):
+        self.account.next_trading_day()
+        total_value = self.account.get_total_value(end_prices)
+        self.equity_curve.append((day, total_value))
+        if self._log.enabled:
+            self._log_message(f"\n=== {day.strftime('%Y-%m-%d')} 交易日结束 ===")
+            self._log_message(self.account.display_portfolio(end_prices))
+
+    def run(self):
+        try:
+            return self._run()
+        finally:
+            self._log.close()
+
+    def _run(self):
+        if not self.account:
+            self.account = self._account_class(self._initial_cash)
+
+        trading_days = StockTools().trading_days_between(self.start_date, self.end_date)
+        streams = [self._events(index, stock_code, trading_days) for index, (stock_code, _) in enumerate(self.stocks)]
+
+        # 收盘价缺失（停牌等）时沿用上一个收盘价；开盘价取回测区间第一天的日K线
+        start_prices = {}
+        end_prices = {}
+        views = [None] * len(self.stocks)
+        current_day = None
+        self.tick_times = []
+        self.equity_curve = []
+
+        for minute, events in itertools.groupby(heapq.merge(*streams), key=lambda event: event[0]):
+            day = minute // 1440
+            if current_day is not None and day != current_day:
+                self._end_day(_EPOCH + timedelta(days=current_day), end_prices)
+            current_day = day
+
+            cur_datetime = _EPOCH + timedelta(minutes=minute)
+            tick_start = time.perf_counter()
+            for _, index, row, bars, view, day_open, day_close in events:
+                stock_code = self.stocks[index][0]
+                if views[index] is not view:
+                    # 进入新的K线分段，策略改用新的 BarView
+                    views[index] = view
+                    if hasattr(self.strategies[index], "set_bar_view"):
+                        self.strategies[index].set_bar_view(view)
+                if stock_code not in start_prices and not math.isnan(day_open):
+                    start_prices[stock_code] = day_open
+                if not math.isnan(day_close):
+                    end_prices[stock_code] = day_close
+
+                self._decide(index, row, bars, cur_datetime)
+            self.tick_times.append(time.perf_counter() - tick_start)
+
+        if current_day is not None:
+            self._end_day(_EPOCH + timedelta(days=current_day), end_prices)
+
+        return self._summarize(start_prices, end_prices)
+
+    def tick_stats(self):
+        """每个时钟tick（所有股票的一个决策时刻）的耗时统计，单位毫秒"""
+        if not self.tick_times:
+            return {"ticks": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        times = np.array(self.tick_times) * 1000
+        return {
+            "ticks": len(times),
+            "mean_ms": float(times.mean()),
+            "p50_ms": float(np.percentile(times, 50)),
+            "p99_ms": float(np.percentile(times, 99)),
+            "max_ms": float(times.max()),
+        }
+
+    def _summarize(self, start_prices, end_prices):
+        """
+        返回:
+            (等权持有各股票的涨跌幅, 组合交易后的收益率)
+        """
+        rates = [(end_prices[code] - start_prices[code]) / start_prices[code]
+                 for code in start_prices if code in end_prices]
+        change_rate = sum(rates) / len(rates) if rates else 0.0
+        new_value = self.account.get_total_value(end_prices)
+        new_change_rate = (new_value - self._initial_cash) / self._initial_cash
+
+        stats = self.tick_stats()
+        self._log_message(f"\n=== 组合模拟交易结束 ===")
+        self._log_message(f"股票数：{len(self.stocks)}，有行情 {len(start_prices)} 只", True)
+        self._log_message(f"模拟期间：{self.start_date.strftime('%Y-%m-%d')} 至 {self.end_date.strftime('%Y-%m-%d')}", True)
+        self._log_message(f"等权持有利润率（不交易）：{change_rate*100:.2f}%", True)
+        self._log_message(f"实际总资产（交易后）：{new_value:.2f} 元, 利润率：{new_change_rate*100:.2f}%", True)
+        self._log_message(f"时钟tick {stats['ticks']} 个，每tick耗时 平均 {stats['mean_ms']:.3f}ms "
+                          f"p50 {stats['p50_ms']:.3f}ms p99 {stats['p99_ms']:.3f}ms 最大 {stats['max_ms']:.3f}ms", True)
+        return change_rate, new_change_rate
+
+
+def main():
+    from simulations.sweep import _strategy_classes
+
+    parser = argparse.ArgumentParser(description='多股票组合回测')
+    parser.add_argument('--stocks', nargs='*', default=[], help='股票代码，可写成 代码:名称')
+    parser.add_argument('--all', action='store_true', help='使用股票列表中的全部股票')
+    parser.add_argument('--start', required=True, help='YYYY-MM-DD')
+    parser.add_argument('--end', required=True, help='YYYY-MM-DD')
+    parser.add_argument('--strategy', default='StockStrategyGridV1')
+    parser.add_argument('--cash', type=float, default=500000)
+    parser.add_argument('--chunk-days', type=int, default=20)
+    parser.add_argument('--log-mode', choices=('full', 'jsonl', 'none'), default='full')
+    parser.add_argument('--prefetch', action='store_true', help='先下载所有股票的K线')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    if args.all:
+        from stock_data_fetcher import StockDataFetcher
+        stocks = StockDataFetcher().get_all_stock_info()[['stock_code', 'stock_name']].to_dict('records')
+    else:
+        stocks = []
+        for value in args.stocks:
+            stock_code, _, stock_name = value.partition(':')
+            stocks.append({'stock_code': stock_code, 'stock_name': stock_name or stock_code})
+    if not stocks:
+        parser.error('请用 --stocks 指定股票或使用 --all')
+
+    simulation = PortfolioSimulation(
+        stocks, datetime.strptime(args.start, '%Y-%m-%d'), datetime.strptime(args.end, '%Y-%m-%d'),
+        _strategy_classes()[args.strategy], initial_cash=args.cash, log_mode=args.log_mode,
+        chunk_days=args.chunk_days, prefetch=args.prefetch
+    )
+    simulation.run()
+
+
+if __name__ == '__main__':
+    main()
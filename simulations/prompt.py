@@ -1,51 +1,230 @@
 import logging
 import os
+import time
+from collections import deque
 from datetime import datetime, timedelta
+import numpy as np
 from stock_data_fetcher import StockDataFetcher
+from stock_db import StockDB
 from deepseek import DeepSeekAPI
 from stock_tools import StockTools
 from dotenv import load_dotenv
 from simulations.stock_account_tplus1 import TradeDecision, TPlusOneStockAccount
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
+# 每次从数据库补数据时，额外预读当前时间之后多少天的K线，回测中大部分tick不再访问数据库
+PROMPT_PRELOAD_DAYS = int(os.environ.get("PROMPT_PRELOAD_DAYS", 20))
+
+_DAILY_HEADER = "这只股票近期的日K线数据(CSV):\ndate,open,high,low,close,volume\n"
+_MIN15_HEADER = "这只股票近期的15分钟K线数据(CSV):\ndatetime,open,high,low,close,volume\n"
+
+_PROMPT_END = (
+    " 请根据以上信息，给出你的操作建议。输出格式为json，包含以下字段：\n"
+    "datetime 操作时间格式%Y-%m-%d %H:%M:%S\n"
+    "action, 操作buy/sell/none\n"
+    "stock_code 股票代码\n"
+    "price 买入或者卖出价格,如果操作为none为0\n"
+    "quantity 买入卖出手数，必须为100的倍数\n"
+    "reason 操作的原因，50字以内\n"
+    "stop_loss 止损价格, take_profit 止盈价格，买入必须给，如果是反T操作则按照做空给出止损和止盈价格\n"
+    "交易可能有1-2分钟延迟，请买入或者卖出价格时候请注意留余量\n"
+    "只需要给出json，不要输出任何其它内容\n"
+)
+
+
+def _num(value):
+    """价格最多保留3位小数，去掉末尾的0"""
+    return f"{value:.3f}".rstrip('0').rstrip('.')
+
+
+def render_bars(df, time_column, time_format):
+    """
+    把K线渲染为CSV行，每根K线只渲染一次
+
+    返回:
+        list: [(时间键, CSV行, 收盘价), ...]，时间键是可按字典序比较的字符串
+    """
+    if df is None or df.empty:
+        return []
+    keys = df[time_column].dt.strftime('%Y-%m-%d %H:%M:%S' if time_column == 'datetime' else '%Y-%m-%d')
+    labels = df[time_column].dt.strftime(time_format)
+    rows = []
+    for key, label, open_price, high, low, close, volume in zip(
+        keys, labels, df['open'].to_numpy(), df['high'].to_numpy(), df['low'].to_numpy(),
+        df['close'].to_numpy(), df['volume'].to_numpy(),
+    ):
+        rows.append((key, f"{label},{_num(open_price)},{_num(high)},{_num(low)},{_num(close)},{int(volume)}", float(close)))
+    return rows
+
+
+class KlineWindow:
+    """
+    一只股票一个周期的滚动K线窗口
+
+    已渲染的CSV行保存在双端队列中，每个tick只追加新出现的K线、弹出滑出窗口的K线，
+    窗口内容变化时才重新拼接文本。数据按 load(开始键, 结束键) 补齐（经过 StockDataFetcher，缺数据时会下载），
+    再用 read_ahead(结束键) 直接从数据库预读后续K线，预读的K线到时间后才进入窗口。
+    时间倒退（重新回测）时清空窗口重新加载。
+    """
+
+    def __init__(self, load, read_ahead):
+        self._load = load
+        self._read_ahead = read_ahead
+        self._reset()
+
+    def _reset(self):
+        self._keys = deque()
+        self._lines = deque()
+        self._pending = []
+        self._pending_pos = 0
+        self._last_key = None
+        self._loaded_until = None
+        self._text = ""
+        self.last_close = None
+
+    def _refill(self, start_key, cur_key):
+        begin = start_key if self._loaded_until is None else self._loaded_until
+        rows = self._load(begin, cur_key) + self._read_ahead(cur_key)
+
+        known = self._pending[-1][0] if self._pending_pos < len(self._pending) else (self._keys[-1] if self._keys else "")
+        pending = self._pending[self._pending_pos:]
+        for row in sorted(rows):
+            if row[0] > known:
+                pending.append(row)
+                known = row[0]
+        self._pending = pending
+        self._pending_pos = 0
+        self._loaded_until = max(cur_key, pending[-1][0]) if pending else cur_key
+
+    def advance(self, start_key, cur_key):
+        """窗口移动到 [start_key, cur_key]，返回窗口内K线的CSV文本"""
+        if self._last_key is not None and cur_key < self._last_key:
+            self._reset()
+        if self._loaded_until is None or cur_key > self._loaded_until:
+            self._refill(start_key, cur_key)
+
+        changed = False
+        pending = self._pending
+        while self._pending_pos < len(pending) and pending[self._pending_pos][0] <= cur_key:
+            key, line, close = pending[self._pending_pos]
+            self._pending_pos += 1
+            self._keys.append(key)
+            self._lines.append(line)
+            self.last_close = close
+            changed = True
+        while self._keys and self._keys[0] < start_key:
+            self._keys.popleft()
+            self._lines.popleft()
+            changed = True
+
+        self._last_key = cur_key
+        if changed:
+            self._text = "\n".join(self._lines) + "\n" if self._lines else ""
+        return self._text
+
+
 class PromptGenerator:
+    """
+    增量构建提示词
+
+    每只股票保持日K和15分钟K线两个滚动窗口（KlineWindow），K线以紧凑CSV渲染；
+    与时间无关的文本（角色说明、输出格式）按股票缓存。每次构建的耗时记录在 build_times 中。
+    """
+
     def __init__(self):
         self.daily_kline_days = int(os.environ.get("DAYLI_KLINE_DAYS"))
         self.min15_kline_days = int(os.environ.get("MIN15_KLINE_DAYS"))
+        self.preload_days = PROMPT_PRELOAD_DAYS
+        self._fetcher = StockDataFetcher()
+        self._db = StockDB()
+        # {股票代码: (日K窗口, 15分钟K线窗口)}
+        self._windows = {}
+        # {(股票名称, 股票代码): 提示词开头}
+        self._prefixes = {}
+        self.build_times = []
+
+    def _load_daily(self, stock_code, begin_key, cur_key):
+        df = self._fetcher.get_daily_kline(stock_code, begin_key[:10], cur_key[:10])
+        return render_bars(df, 'date', '%Y-%m-%d')
+
+    def _read_ahead_daily(self, stock_code, cur_key):
+        cur_date = datetime.strptime(cur_key[:10], "%Y-%m-%d")
+        df = self._db.get_daily_data(stock_code, (cur_date + timedelta(days=1)).strftime("%Y-%m-%d"),
+                                     (cur_date + timedelta(days=self.preload_days)).strftime("%Y-%m-%d"))
+        return render_bars(df, 'date', '%Y-%m-%d')
+
+    def _load_min15(self, stock_code, begin_key, cur_key):
+        df = self._fetcher.get_min_kline(stock_code, "15", begin_key[:10], cur_key, realtime=True)
+        return render_bars(df, 'datetime', '%Y-%m-%d %H:%M')
+
+    def _read_ahead_min15(self, stock_code, cur_key):
+        cur_datetime = datetime.strptime(cur_key, "%Y-%m-%d %H:%M:%S")
+        # 实盘时当前时间之后还没有数据，预读为空，下个tick再补
+        df = self._db.get_min_data(stock_code, "15", cur_key,
+                                   (cur_datetime + timedelta(days=self.preload_days)).strftime("%Y-%m-%d %H:%M:%S"))
+        if df is not None and not df.empty:
+            df = df[df['datetime'] > np.datetime64(cur_datetime)]
+        return render_bars(df, 'datetime', '%Y-%m-%d %H:%M')
+
+    def _get_windows(self, stock_code):
+        windows = self._windows.get(stock_code)
+        if windows is None:
+            windows = self._windows[stock_code] = (
+                KlineWindow(lambda begin, cur: self._load_daily(stock_code, begin, cur),
+                            lambda cur: self._read_ahead_daily(stock_code, cur)),
+                KlineWindow(lambda begin, cur: self._load_min15(stock_code, begin, cur),
+                            lambda cur: self._read_ahead_min15(stock_code, cur)),
+            )
+        return windows
+
+    def _get_prefix(self, stock_name, stock_code):
+        prefix = self._prefixes.get((stock_name, stock_code))
+        if prefix is None:
+            prefix = self._prefixes[(stock_name, stock_code)] = (
+                f"你是一个专业的短线股票操盘手，擅长日内盘，做T或反T，现在你在操盘股票{stock_name},代码{stock_code}，当前时间是"
+            )
+        return prefix
 
     def generate_prompt(self, stock_name: str, stock_code: str, account: TPlusOneStockAccount, current_datetime: datetime):
-        prompt_header = f"你是一个专业的短线股票操盘手，擅长日内盘，做T或反T，现在你在操盘股票{stock_name},代码{stock_code}，当前时间是{current_datetime}。\n"
-        prompt_header += f"你操作的是中国大陆A股市场，是T+1的市场，今日买入明日才能卖出，手续费买入卖出为5元，印花税万分之5\n"
-        fetcher = StockDataFetcher()
-
-        daily_start_time = (current_datetime - timedelta(days=self.daily_kline_days)).strftime("%Y-%m-%d")
-        daily_end_time = current_datetime.strftime("%Y-%m-%d")
-
-        daily_data = fetcher.get_daily_kline(stock_code, daily_start_time, daily_end_time)
-
-        min15_start_time = (current_datetime - timedelta(days=self.min15_kline_days)).strftime("%Y-%m-%d")
-        min15_end_time = current_datetime.strftime("%Y-%m-%d %H:%M:%S")
-
-        min15_data = fetcher.get_min_kline(stock_code, "15", min15_start_time, min15_end_time, realtime=True)
-        
-        daily_data_str = "这只股票近期的日K线数据:\n" + daily_data.to_string() + "\n"
-        min15_data_str = "这只股票近期的15分钟K线数据:\n" + min15_data.to_string() + "\n"
-
-        current_price = min15_data['close'].iloc[-1]
-        current_prices = {stock_code: current_price}
-        account_prompt = "你的账户情况:\n" + account.get_portfolio_summary(current_prices)
-        history_prompt = "你的历史操作与说明:\n" + account.get_recent_decisions_summary()
-
-        prompt_end = " 请根据以上信息，给出你的操作建议。输出格式为json，包含以下字段：\n"
-        prompt_end += "datetime 操作时间格式%Y-%m-%d %H:%M:%S\n"
-        prompt_end += "action, 操作buy/sell/none\n"
-        prompt_end += "stock_code 股票代码\n"
-        prompt_end += "price 买入或者卖出价格,如果操作为none为0\n"
-        prompt_end += "quantity 买入卖出手数，必须为100的倍数\n"
-        prompt_end += "reason 操作的原因，50字以内\n"
-        prompt_end += "stop_loss 止损价格, take_profit 止盈价格，买入必须给，如果是反T操作则按照做空给出止损和止盈价格\n"
-        prompt_end += "交易可能有1-2分钟延迟，请买入或者卖出价格时候请注意留余量\n"
-        prompt_end += "只需要给出json，不要输出任何其它内容\n"
-
-        return prompt_header + daily_data_str + min15_data_str + account_prompt + history_prompt + prompt_end
+        start = time.perf_counter()
+
+        cur_key = current_datetime.strftime("%Y-%m-%d %H:%M:%S")
+        daily_start = (current_datetime - timedelta(days=self.daily_kline_days)).strftime("%Y-%m-%d")
+        min15_start = (current_datetime - timedelta(days=self.min15_kline_days)).strftime("%Y-%m-%d") + " 09:30:00"
+
+        daily_window, min15_window = self._get_windows(stock_code)
+        # 日K按日期比较，当天的日K线也在窗口内
+        daily_text = daily_window.advance(daily_start, cur_key[:10])
+        min15_text = min15_window.advance(min15_start, cur_key)
+
+        current_price = min15_window.last_close
+        current_prices = {stock_code: current_price} if current_price is not None else {}
+
+        prompt = "".join((
+            self._get_prefix(stock_name, stock_code), cur_key, "。\n",
+            "你操作的是中国大陆A股市场，是T+1的市场，今日买入明日才能卖出，手续费买入卖出为5元，印花税万分之5\n",
+            _DAILY_HEADER, daily_text,
+            _MIN15_HEADER, min15_text,
+            "你的账户情况:\n", account.get_portfolio_summary(current_prices), "\n",
+            "你的历史操作与说明:\n", account.get_recent_decisions_summary(), "\n",
+            _PROMPT_END,
+        ))
+
+        self.build_times.append(time.perf_counter() - start)
+        return prompt
+
+    def build_stats(self):
+        """提示词构建耗时统计，单位毫秒"""
+        if not self.build_times:
+            return {"builds": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        times = np.array(self.build_times) * 1000
+        return {
+            "builds": len(times),
+            "mean_ms": float(times.mean()),
+            "p50_ms": float(np.percentile(times, 50)),
+            "p99_ms": float(np.percentile(times, 99)),
+            "max_ms": float(times.max()),
+        }
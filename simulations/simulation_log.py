@@ -0,0 +1,113 @@
+import json
+import os
+import time
+from datetime import datetime
+
+LOG_MODES = ('full', 'jsonl', 'none')
+
+
+class SimulationLog:
+    """
+    回测日志与决策记录
+
+    文本日志和决策记录各保持一个打开的文件句柄，决策以 JSONL 逐行追加，写入经过缓冲，
+    距上次落盘超过 flush_interval 秒或 close 时刷新到磁盘，每条记录的开销与已有记录数无关。
+
+    mode:
+        full   写文本日志和 JSONL，close 时把 JSONL 整理为原有的 {"simulation_info", "decisions"} JSON 文件
+        jsonl  只写文本日志和 JSONL
+        none   不写任何文件，用于参数扫描
+    """
+
+    def __init__(self, log_file, decision_file, simulation_info, mode='full', flush_interval=None):
+        if mode not in LOG_MODES:
+            raise ValueError(f"未知的日志模式 {mode}，可选: {', '.join(LOG_MODES)}")
+
+        self.mode = mode
+        self.enabled = mode != 'none'
+        self.log_file = log_file
+        self.decision_file = decision_file
+        self.jsonl_file = os.path.splitext(decision_file)[0] + '.jsonl'
+        self.simulation_info = simulation_info
+        if flush_interval is None:
+            flush_interval = float(os.environ.get('SIMULATION_LOG_FLUSH_INTERVAL', 1.0))
+        self.flush_interval = flush_interval
+
+        self._log = None
+        self._decisions = None
+        self._last_flush = time.monotonic()
+
+        if not self.enabled:
+            return
+
+        try:
+            self._log = open(self.log_file, 'w', encoding='utf-8')
+        except Exception as e:
+            print(f"创建日志文件失败: {e}")
+
+        try:
+            self._decisions = open(self.jsonl_file, 'w', encoding='utf-8')
+            if self.mode == 'full':
+                # 先写出空的决策文件，运行中途也能按原格式读取
+                self._write_json([])
+        except Exception as e:
+            print(f"创建决策文件失败: {e}")
+
+    def _write_json(self, decisions):
+        with open(self.decision_file, 'w', encoding='utf-8') as f:
+            json.dump({"simulation_info": self.simulation_info, "decisions": decisions}, f, ensure_ascii=False, indent=2)
+
+    def _maybe_flush(self):
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self.flush()
+            self._last_flush = now
+
+    def write(self, text):
+        """原样写入文本日志（不加时间戳）"""
+        if self._log:
+            self._log.write(text)
+            self._maybe_flush()
+
+    def message(self, message, to_console=False):
+        """写一行带时间戳的文本日志，to_console 时同时输出到控制台"""
+        if not to_console and not self._log:
+            return
+        log_entry = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}"
+        if to_console:
+            print(log_entry)
+        if self._log:
+            self._log.write(log_entry + '\n')
+            self._maybe_flush()
+
+    def decision(self, record):
+        """追加一条决策记录"""
+        if self._decisions:
+            self._decisions.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._maybe_flush()
+
+    def flush(self):
+        for f in (self._log, self._decisions):
+            if f:
+                f.flush()
+
+    def close(self):
+        """刷新并关闭文件，full 模式下把 JSONL 整理为 JSON 决策文件；可以重复调用"""
+        if self._decisions:
+            self._decisions.close()
+            self._decisions = None
+            if self.mode == 'full':
+                try:
+                    self.finalize()
+                except Exception as e:
+                    self.message(f"整理决策文件失败: {e}")
+        if self._log:
+            self._log.close()
+            self._log = None
+
+    def finalize(self):
+        """把 JSONL 决策记录整理为原有格式的 JSON 决策文件"""
+        with open(self.jsonl_file, 'r', encoding='utf-8') as f:
+            decisions = [json.loads(line) for line in f if line.strip()]
+        self._write_json(decisions)
+        os.remove(self.jsonl_file)
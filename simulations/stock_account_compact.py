@@ -0,0 +1,225 @@
+import sys
+from datetime import datetime, timedelta
+import numpy as np
+from simulations.stock_account_tplus1 import TPlusOneStockAccount, TradeDecision
+
+_EPOCH = datetime(1970, 1, 1)
+
+_ACTION_CODES = {'buy': 1, 'sell': -1}
+_ACTION_NAMES = {1: 'buy', -1: 'sell'}
+
+
+class TradeLedger:
+    """
+    交易记录的列式存储
+
+    时间（epoch秒）、方向、价格、数量、止损、止盈存放在预分配的 NumPy 列中，容量不足时按2倍扩容；
+    股票代码和操作理由只保存字符串引用（代码经过 sys.intern），不再为每笔交易保留一个 TradeDecision 对象。
+    新记录先以元组暂存，攒满 FLUSH_ROWS 条或读取时再批量写入数组，避免逐个元素赋值的开销。
+    按下标或迭代访问时才临时还原为 TradeDecision，与 trade_history 列表的用法兼容。
+    """
+
+    FLUSH_ROWS = 4096
+    _COLUMNS = (
+        ('time', np.int64), ('action', np.int8), ('price', np.float64), ('quantity', np.float64),
+        # 数量是否为整数，还原时保持 int/float 类型与原决策一致
+        ('int_quantity', np.bool_), ('stop_loss', np.float64), ('take_profit', np.float64),
+    )
+
+    __slots__ = ('_size', '_columns', '_pending', '_codes', '_reasons', '_keep_reasons')
+
+    def __init__(self, capacity=4096, keep_reasons=True):
+        self._size = 0
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in self._COLUMNS}
+        self._pending = []
+        self._codes = []
+        self._reasons = []
+        self._keep_reasons = keep_reasons
+
+    def append(self, decision: TradeDecision):
+        quantity = decision.quantity
+        self._pending.append((
+            int((decision.datetime - _EPOCH).total_seconds()),
+            _ACTION_CODES.get(decision.action, 0),
+            decision.price,
+            quantity,
+            isinstance(quantity, int),
+            np.nan if decision.stop_loss is None else decision.stop_loss,
+            np.nan if decision.take_profit is None else decision.take_profit,
+        ))
+        self._codes.append(sys.intern(decision.stock_code))
+        self._reasons.append(decision.reason if self._keep_reasons else None)
+        if len(self._pending) >= self.FLUSH_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+
+        count = len(self._pending)
+        capacity = len(self._columns['time'])
+        if self._size + count > capacity:
+            while self._size + count > capacity:
+                capacity *= 2
+            for name, column in self._columns.items():
+                grown = np.empty(capacity, dtype=column.dtype)
+                grown[:self._size] = column[:self._size]
+                self._columns[name] = grown
+
+        for (name, dtype), values in zip(self._COLUMNS, zip(*self._pending)):
+            self._columns[name][self._size:self._size + count] = np.array(values, dtype=dtype)
+        self._size += count
+        self._pending = []
+
+    def columns(self):
+        """返回各列的只读视图 {time, action, price, quantity, stop_loss, take_profit}，time 为 epoch秒"""
+        self._flush()
+        result = {}
+        for name in ('time', 'action', 'price', 'quantity', 'stop_loss', 'take_profit'):
+            view = self._columns[name][:self._size]
+            view.flags.writeable = False
+            result[name] = view
+        return result
+
+    def __len__(self):
+        return self._size + len(self._pending)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, index):
+        size = len(self)
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(size))]
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError('trade ledger index out of range')
+
+        self._flush()
+        columns = self._columns
+        quantity = columns['quantity'][index]
+        stop_loss = columns['stop_loss'][index]
+        take_profit = columns['take_profit'][index]
+        return TradeDecision(
+            _EPOCH + timedelta(seconds=int(columns['time'][index])),
+            _ACTION_NAMES.get(int(columns['action'][index]), 'none'),
+            self._codes[index],
+            float(columns['price'][index]),
+            int(quantity) if columns['int_quantity'][index] else float(quantity),
+            self._reasons[index],
+            None if np.isnan(stop_loss) else float(stop_loss),
+            None if np.isnan(take_profit) else float(take_profit),
+        )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __reversed__(self):
+        for i in range(len(self) - 1, -1, -1):
+            yield self[i]
+
+
+class CompactTPlusOneStockAccount:
+    """
+    紧凑的T+1交易股票账户
+
+    与 TPlusOneStockAccount 的接口和计算结果一致，可以直接替换：
+    - 使用 __slots__，holdings 仍是 {股票代码: [总数量, 可售数量, 成本价]}，策略可以照常读取
+    - trade_history 是 TradeLedger 列式账本，不保留 TradeDecision 对象；keep_reasons=False 时连理由也不保存
+    - total_assets 在读取时才计算，买卖时不再更新；仓位摘要同样只在调用时生成
+    """
+
+    __slots__ = ('cash', 'holdings', 'transaction_fee', 'stamp_duty_rate', 'trade_history')
+
+    def __init__(self, initial_cash=0, keep_reasons=True):
+        self.cash = initial_cash
+        # 持股信息 {股票代码: [总数量, 可售数量, 成本价]}
+        self.holdings = {}
+        self.transaction_fee = 5  # 买入/卖出固定手续费(元)
+        self.stamp_duty_rate = 0.0005  # 印花税率(万分之五)
+        self.trade_history = TradeLedger(keep_reasons=keep_reasons)
+
+    # 查询和格式化与 TPlusOneStockAccount 共用同一份实现
+    get_recent_decisions = TPlusOneStockAccount.get_recent_decisions
+    get_recent_decisions_summary = TPlusOneStockAccount.get_recent_decisions_summary
+    _is_valid_quantity = TPlusOneStockAccount._is_valid_quantity
+    _calculate_buy_cost = TPlusOneStockAccount._calculate_buy_cost
+    next_trading_day = TPlusOneStockAccount.next_trading_day
+    get_break_even_price = TPlusOneStockAccount.get_break_even_price
+    get_total_value = TPlusOneStockAccount.get_total_value
+    display_portfolio = TPlusOneStockAccount.display_portfolio
+    availiable_quantity = TPlusOneStockAccount.availiable_quantity
+    get_portfolio_summary = TPlusOneStockAccount.get_portfolio_summary
+
+    @property
+    def total_assets(self):
+        """总资产（现金 + 按成本价计算的持股市值）"""
+        total_stock_value = 0
+        for total_quantity, _, cost_price in self.holdings.values():
+            total_stock_value += total_quantity * cost_price
+        return self.cash + total_stock_value
+
+    def buy(self, code, price, quantity, decision: TradeDecision):
+        """
+        买入股票
+
+        Args:
+            code (str): 股票代码
+            price (float): 买入价格
+            quantity (int): 买入数量
+        """
+        if not self._is_valid_quantity(quantity):
+            return False
+
+        # 计算买入总成本（含所有费用）
+        total_expense = self._calculate_buy_cost(price, quantity)
+
+        if self.cash < total_expense:
+            print(f"现金不足！需要{total_expense:.2f}元，当前现金{self.cash:.2f}元")
+            return False
+
+        self.cash -= total_expense
+
+        holding = self.holdings.get(code)
+        if holding is not None:
+            total_quantity, available_quantity, old_cost = holding
+            new_total_quantity = total_quantity + quantity
+            # 新买入的不可出售，平均成本包含所有交易费用
+            self.holdings[code] = [new_total_quantity, available_quantity, (total_quantity * old_cost + total_expense) / new_total_quantity]
+        else:
+            self.holdings[code] = [quantity, 0, total_expense / quantity]
+
+        self.trade_history.append(decision)
+        return True
+
+    def sell(self, code, price, quantity, decision: TradeDecision):
+        """
+        卖出股票
+
+        Args:
+            code (str): 股票代码
+            price (float): 卖出价格
+            quantity (int): 卖出数量
+        """
+        if not self._is_valid_quantity(quantity):
+            return False
+
+        holding = self.holdings.get(code)
+        if holding is None:
+            print(f"未持有股票{code}")
+            return False
+
+        total_quantity, available_quantity, cost_price = holding
+        if available_quantity < quantity:
+            print(f"可售数量不足！可售{available_quantity}股，持有{total_quantity}股，尝试卖出{quantity}股")
+            return False
+
+        # 费用已在买入时计入成本，卖出不再扣除
+        self.cash += price * quantity
+        # 不清除零持股，成本价保持不变
+        self.holdings[code] = [total_quantity - quantity, available_quantity - quantity, cost_price]
+
+        self.trade_history.append(decision)
+        return True
@@ -2,6 +2,8 @@ import json
 from datetime import datetime
 
 class TradeDecision:
+    __slots__ = ('datetime', 'action', 'stock_code', 'price', 'quantity', 'reason', 'stop_loss', 'take_profit')
+
     def __init__(self, datetime, action, stock_code, price, quantity, 
                  reason, stop_loss=None, take_profit=None):
         self.datetime = datetime
@@ -1,15 +1,16 @@
 
 from datetime import datetime, timedelta
 from simulations.stock_account_tplus1 import TPlusOneStockAccount, TradeDecision
+from simulations.bar_view import BarView
+from simulations.simulation_log import SimulationLog
 from stock_data_fetcher import StockDataFetcher
 from deepseek import DeepSeekAPI
 from stock_tools import StockTools
 import os
 import uuid
-import json
 
 class StockSimulation:
-    def __init__(self, stock_code, stock_name, start_date, end_date, strategy, initial_cash=100000, log_dir_path: str = "./log", summary_file = None):
+    def __init__(self, stock_code, stock_name, start_date, end_date, strategy, initial_cash=100000, log_dir_path: str = "./log", summary_file = None, bar_view = None, log_mode: str = "full", account_class = TPlusOneStockAccount):
         self.simluation_name = f"{stock_name}({stock_code})-{start_date.strftime('%Y-%m%d')}-{end_date.strftime('%m%d')}-{strategy.name()}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
         
         self.stock_code = stock_code
@@ -19,108 +20,78 @@ class StockSimulation:
         self.end_date = end_date
         self.uuid = str(uuid.uuid4())
 
-        os.makedirs(log_dir_path, exist_ok=True)
+        if log_mode != "none":
+            os.makedirs(log_dir_path, exist_ok=True)
 
         self.log_file = f"{log_dir_path}/{self.simluation_name}.log"
         self.decision_file = f"{log_dir_path}/{self.simluation_name}.json"
 
         self.account = None
+        # 账户实现，可替换为 CompactTPlusOneStockAccount
+        self._account_class = account_class
 
         self._fetcher = StockDataFetcher()
-        # 初始化日志文件
+        # 初始化日志文件；log_mode 为 full / jsonl / none，见 SimulationLog
+        self._log_mode = log_mode
         self._setup_logging()
-        self._setup_decision_file()
-        self._data_preparation()
+        # 回测区间的K线一次性载入内存，价格查询和成交判断不再访问数据库；
+        # 传入 bar_view 时复用调用方已加载的数据（参数扫描中同一股票同一区间只加载一次）
+        if bar_view is None:
+            self._data_preparation()
+            bar_view = BarView(self.stock_code, self.start_date, self.end_date)
+        self._bars = bar_view
+        if hasattr(self.strategy, "set_bar_view"):
+            self.strategy.set_bar_view(self._bars)
         self._initial_cash = initial_cash
 
         self._summary_file = summary_file
 
     def set_initial_state(self, initial_cash: float):
-        self.account = TPlusOneStockAccount(initial_cash)
+        self.account = self._account_class(initial_cash)
 
     def _setup_logging(self):
-        """设置日志文件"""
-        try:
-            # 清空或创建日志文件
-            with open(self.log_file, 'w', encoding='utf-8') as f:
-                f.write(f"=== 股票模拟交易日志 ===\n")
-                f.write(f"模拟名称: {self.simluation_name}\n")
-                f.write(f"uuid: {self.uuid}\n")
-                f.write(f"股票: {self.stock_name}({self.stock_code})\n")
-                f.write(f"期间: {self.start_date} 至 {self.end_date}\n")
-                f.write(f"策略: {self.strategy.name()}\n")
-                f.write("=" * 50 + "\n\n")
-        except Exception as e:
-            print(f"创建日志文件失败: {e}")
+        """设置日志文件，文本日志和决策记录各保持一个打开的句柄"""
+        self._log = SimulationLog(self.log_file, self.decision_file, {
+            "name": self.simluation_name,
+            "uuid": self.uuid,
+            "stock_code": self.stock_code,
+            "stock_name": self.stock_name,
+            "start_date": self.start_date.strftime('%Y-%m-%d'),
+            "end_date": self.end_date.strftime('%Y-%m-%d'),
+            "strategy": self.strategy.name(),
+            "created_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }, mode=self._log_mode)
+
+        self._log.write(f"=== 股票模拟交易日志 ===\n")
+        self._log.write(f"模拟名称: {self.simluation_name}\n")
+        self._log.write(f"uuid: {self.uuid}\n")
+        self._log.write(f"股票: {self.stock_name}({self.stock_code})\n")
+        self._log.write(f"期间: {self.start_date} 至 {self.end_date}\n")
+        self._log.write(f"策略: {self.strategy.name()}\n")
+        self._log.write("=" * 50 + "\n\n")
+        if self._log.enabled:
+            self._log_message(f"决策文件已创建: {self.decision_file}")
 
     def _log_message(self, message, to_console : bool = False):
         """将消息同时输出到控制台和日志文件"""
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        log_entry = f"[{timestamp}] {message}"
-        
-        # 输出到控制台
-        if to_console:
-            print(log_entry)
-        
-        # 输出到文件
-        try:
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                f.write(log_entry + '\n')
-        except Exception as e:
-            print(f"写入日志失败: {e}")
-
-    def _setup_decision_file(self):
-            """初始化决策记录文件"""
-            try:
-                with open(self.decision_file, 'w', encoding='utf-8') as f:
-                    initial_data = {
-                        "simulation_info": {
-                            "name": self.simluation_name,
-                            "uuid": self.uuid,
-                            "stock_code": self.stock_code,
-                            "stock_name": self.stock_name,
-                            "start_date": self.start_date.strftime('%Y-%m-%d'),
-                            "end_date": self.end_date.strftime('%Y-%m-%d'),
-                            "strategy": self.strategy.name(),
-                            "created_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        },
-                        "decisions": []
-                    }
-                    json.dump(initial_data, f, ensure_ascii=False, indent=2)
-                self._log_message(f"决策文件已创建: {self.decision_file}")
-            except Exception as e:
-                self._log_message(f"创建决策文件失败: {e}")
+        self._log.message(message, to_console)
 
     def _log_decision(self, decision: TradeDecision, decision_time: datetime):
-        """记录交易决策到JSON文件"""
-        try:
-            # 读取现有的决策数据
-            with open(self.decision_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # 构建决策记录
-            decision_record = {
-                "decision_time": decision_time.strftime('%Y-%m-%d %H:%M:%S'),
-                "action": decision.action,
-                "stock_code": decision.stock_code,
-                "price": decision.price,
-                "quantity": decision.quantity,
-                "reason": decision.reason,
-                "stop_loss": getattr(decision, 'stop_loss', None),
-                "take_profit": getattr(decision, 'take_profit', None)
-            }
-            
-            # 添加决策记录
-            data["decisions"].append(decision_record)
-            
-            # 写回文件
-            with open(self.decision_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-                
-            self._log_message(f"决策已记录到: {self.decision_file}")
-            
-        except Exception as e:
-            self._log_message(f"记录决策失败: {e}")
+        """追加一条交易决策到 JSONL 决策记录"""
+        if not self._log.enabled:
+            return
+
+        self._log.decision({
+            "decision_time": decision_time.strftime('%Y-%m-%d %H:%M:%S'),
+            "action": decision.action,
+            "stock_code": decision.stock_code,
+            "price": decision.price,
+            "quantity": decision.quantity,
+            "reason": decision.reason,
+            "stop_loss": getattr(decision, 'stop_loss', None),
+            "take_profit": getattr(decision, 'take_profit', None)
+        })
+        self._log_message(f"决策已记录到: {self._log.jsonl_file}")
 
     def _data_preparation(self):
         #获取日K线
@@ -130,14 +101,44 @@ class StockSimulation:
         #获取15分钟K线
         self._fetcher.get_min_kline(self.stock_code, '15', self.start_date.strftime("%Y-%m-%d"), self.end_date.strftime("%Y-%m-%d"))
 
+    def summary_line(self, change_rate, new_change_rate):
+        """汇总文件中本股票的一行"""
+        performance_diff = (new_change_rate - change_rate) * 100
+        return f"{self.stock_name}({self.stock_code}) \t理论利润率：{change_rate*100:8.2f}% \t实际利润率：{new_change_rate*100:8.2f}% \t跑赢了{performance_diff:6.2f}%\n"
+
     def run(self):
         if not hasattr(self.strategy, "make_decision"):
             return
 
+        steps = self.steps()
+        try:
+            cur_datetime = next(steps)
+            while True:
+                decision = self.strategy.make_decision(self.stock_name, self.stock_code, self.account, cur_datetime)
+                cur_datetime = steps.send(decision)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            steps.close()
+
+    def steps(self):
+        """
+        逐个决策时刻推进回测的生成器
+
+        每到需要策略决策的时刻 yield 决策时间，调用方用 send(决策) 继续；回测结束时通过
+        StopIteration.value 返回 (涨跌幅, 交易后收益率)。run() 同步驱动它，TickScheduler 用它让多只股票按时刻同步推进。
+        """
+        try:
+            return (yield from self._run())
+        finally:
+            # 回测结束或中途异常都要把缓冲的日志落盘
+            self._log.close()
+
+    def _run(self):
         if not self.account:
-            self.account = TPlusOneStockAccount(self._initial_cash)
+            self.account = self._account_class(self._initial_cash)
 
-        fetcher = StockDataFetcher()
+        fetcher = self._bars
 
         cur_date = self.start_date
 
@@ -179,14 +180,15 @@ class StockSimulation:
                     continue
                 
                 current_prices = {self.stock_code : current_price}
-                self._log_message(f"\n=== 仓位情况: {self.account.get_portfolio_summary(current_prices)}")
+                if self._log.enabled:
+                    self._log_message(f"\n=== 仓位情况: {self.account.get_portfolio_summary(current_prices)}")
 
                 availiable_quantity = self.account.availiable_quantity(self.stock_code)
                 if availiable_quantity == 0 and self.account.cash < 100 * current_price:
                     self._log_message(f"=== 账户可售股票为0，且资金不足, 无法买入股票，跳过此决策===")
                     continue
            
-                decision = self.strategy.make_decision(self.stock_name, self.stock_code, self.account, cur_datetime)
+                decision = yield cur_datetime
                 
                 if decision.action == "buy":
                     if fetcher.is_trade_success(decision.stock_code, '15', decision.price, decision.quantity, 'buy', cur_datetime + timedelta(minutes=15)):
@@ -209,7 +211,7 @@ class StockSimulation:
                 else:
                     self._log_message(f"操作说明: {decision.reason}")
 
-            end_price = self._fetcher.get_daily_end_price(self.stock_code, cur_date)
+            end_price = self._bars.get_daily_end_price(self.stock_code, cur_date)
             end_prices = {self.stock_code : end_price}
 
             # 进入下一个交易日
@@ -219,10 +221,11 @@ class StockSimulation:
             # 显示每日总结
             
             self._log_message(f"\n=== {cur_date.strftime('%Y-%m-%d')} 交易日结束 ===")
-            self._log_message(self.account.display_portfolio(end_prices))
+            if self._log.enabled:
+                self._log_message(self.account.display_portfolio(end_prices))
 
-        start_price = self._fetcher.get_daily_start_price(self.stock_code, self.start_date)
-        end_price = self._fetcher.get_daily_end_price(self.stock_code, self.end_date)
+        start_price = self._bars.get_daily_start_price(self.stock_code, self.start_date)
+        end_price = self._bars.get_daily_end_price(self.stock_code, self.end_date)
 
         change_rate = (end_price - start_price) / start_price
         origin_value = self._initial_cash * (1 + change_rate)
@@ -248,6 +251,6 @@ class StockSimulation:
         self._log_message(f"模拟交易日志已保存到: \n    {self.log_file}")
 
         if self._summary_file:
-            self._summary_file.write(f"{self.stock_name}({self.stock_code}) \t理论利润率：{change_rate*100:8.2f}% \t实际利润率：{new_change_rate*100:8.2f}% \t跑赢了{performance_diff:6.2f}%\n")
+            self._summary_file.write(self.summary_line(change_rate, new_change_rate))
 
         return change_rate, new_change_rate
@@ -1,11 +1,18 @@
 from prompt import PromptGenerator
 from deepseek import DeepSeekAPI
+from deepseek_async import AsyncDeepSeekAPI
 from simulations.stock_account_tplus1 import TPlusOneStockAccount, TradeDecision
 from datetime import datetime
 
 class DeepSeekStrategy:
-    def __init__(self):
-        self._deepseek_api = DeepSeekAPI()
+    def __init__(self, api: DeepSeekAPI = None, async_api: AsyncDeepSeekAPI = None):
+        """
+        Args:
+            api: 同步客户端，默认新建
+            async_api: 异步客户端，多只股票并发回测时共享同一个以统一限制并发数；默认在第一次异步决策时包装 api
+        """
+        self._deepseek_api = api or DeepSeekAPI()
+        self._async_api = async_api
         self._prompt_generator = PromptGenerator()
 
     def name(self) -> str:
@@ -13,6 +20,20 @@ class DeepSeekStrategy:
 
     def make_decision(self, stock_name: str, stock_code: str, account: TPlusOneStockAccount, cur_datetime: datetime) -> TradeDecision:
         prompt = self._prompt_generator.generate_prompt(stock_name, stock_code, account, cur_datetime)
-        response = self._deepseek_api.ask_question(prompt)        
-        decision = TradeDecision.from_json(response)
-        return decision
\ No newline at end of file
+        response = self._deepseek_api.ask_question(prompt)
+        return self._to_decision(response, stock_code, cur_datetime)
+
+    async def make_decision_async(self, stock_name: str, stock_code: str, account: TPlusOneStockAccount, cur_datetime: datetime) -> TradeDecision:
+        """与 make_decision 相同，等待接口应答时让出事件循环，供 TickScheduler 并发调用"""
+        if self._async_api is None:
+            self._async_api = AsyncDeepSeekAPI(self._deepseek_api)
+        prompt = self._prompt_generator.generate_prompt(stock_name, stock_code, account, cur_datetime)
+        response = await self._async_api.ask_question(prompt)
+        return self._to_decision(response, stock_code, cur_datetime)
+
+    @staticmethod
+    def _to_decision(response, stock_code, cur_datetime):
+        if response is None:
+            # 接口失败或回放模式下缓存未命中，本次不操作
+            return TradeDecision(cur_datetime, "none", stock_code, 0, 0, "DeepSeek 无应答，不操作")
+        return TradeDecision.from_json(response)
@@ -20,6 +20,10 @@ class StockStrategyGridV3:
         self._sell_cache = 0
         self._buy_cache = 0
 
+    def set_bar_view(self, bar_view):
+        """回测时使用预加载的K线视图查询价格，代替逐次查询数据库的 fetcher"""
+        self._fetcher = bar_view
+
     def name(self) -> str:
         return "Grid Strategy v3"
     
@@ -42,13 +46,15 @@ class StockStrategyGridV3:
         return self._grid_size[index]
 
     def _can_buy_a_base_line(self, stock_code, cur_price, account) -> bool:
-        if account.cash >= cur_price * self._base_line.volume:
+        # 基础网格数量为0时无法按网格买入（手续费摊销会除以0）
+        if self._base_line.volume > 0 and account.cash >= cur_price * self._base_line.volume:
             return True
         else:
             return False
         
     def _can_sell_a_base_line(self, stock_code, cur_price, account) -> bool:
-        if account.holdings[stock_code][1] >= self._base_line.volume:
+        # 组合回测中可能从未持有或已清仓，持仓记录不存在时可售数量为0
+        if account.availiable_quantity(stock_code) >= self._base_line.volume:
             return True
         else:
             return False
@@ -0,0 +1,308 @@
+"""
+多进程参数扫描
+
+对 股票 × 回测区间 × 策略 × 网格梯度 × 初始资金 的笛卡尔积逐一回测，结果逐行追加到一张 CSV 汇总表。
+
+- 主进程先用 StockPrefetcher 把所有股票的日K线、5/15分钟K线下载入库，子进程只读数据库
+- 同一 (股票, 区间) 的回测按 --chunk-size 打包提交给同一个子进程，子进程内按 (股票, 区间) 缓存 BarView /
+  GridBacktestEngine，每份行情在每个子进程中只加载一次
+- 每组回测有确定的 run_id，汇总表中已成功的 run_id 在重新运行时跳过，崩溃或中断后可以直接续跑
+- --engine grid 使用数组回测引擎（仅网格策略），--engine simulation 使用 StockSimulation（所有策略，默认不写回测日志，见 --log-mode）
+
+用法:
+    python simulations/sweep.py --stocks 603220:中贝通信 600036 \\
+        --windows 2025-06-02:2025-08-29 2025-09-01:2025-12-01 \\
+        --strategies StockStrategyGridV2 StockStrategyGridV3 \\
+        --grid-sizes 0.02,0.03,0.05,0.10 0.01,0.02,0.04 --cash 50000 100000 \\
+        --output ./log/sweep.csv [--workers 8] [--engine grid]
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, 'simulations')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import argparse
+import csv
+import functools
+import hashlib
+import itertools
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+RESULT_FIELDS = [
+    'run_id', 'stock_code', 'stock_name', 'start_date', 'end_date', 'strategy', 'grid_sizes', 'initial_cash',
+    'engine', 'change_rate', 'new_change_rate', 'performance_diff', 'trades', 'elapsed', 'worker_pid', 'error',
+]
+
+# 子进程内的行情缓存 {(股票, 开始日期, 结束日期): BarView / GridBacktestEngine}
+_bar_views = {}
+_grid_engines = {}
+
+
+def _strategy_classes():
+    from simulations.stock_strategy_deepseek import DeepSeekStrategy
+    from simulations.stock_strategy_gird_v1 import StockStrategyGridV1
+    from simulations.stock_strategy_gird_v2 import StockStrategyGridV2
+    from simulations.stock_strategy_gird_v3 import StockStrategyGridV3
+    return {cls.__name__: cls for cls in (StockStrategyGridV1, StockStrategyGridV2, StockStrategyGridV3, DeepSeekStrategy)}
+
+
+def make_run_id(task):
+    """由回测参数计算确定的 run_id，用于续跑时识别已完成的回测"""
+    key = json.dumps([task['stock_code'], task['start_date'], task['end_date'], task['strategy'],
+                      task['grid_sizes'], task['initial_cash'], task['engine']])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def build_tasks(stocks, windows, strategies, grid_sizes_list, cash_list, engine):
+    """
+    生成回测任务列表
+
+    参数:
+        stocks: [(股票代码, 股票名称), ...]
+        windows: [(开始日期, 结束日期), ...]，日期为 'YYYY-MM-DD'
+        strategies: 策略类名列表
+        grid_sizes_list: 网格梯度列表，None 表示使用策略默认值
+        cash_list: 初始资金列表
+        engine: 'simulation' 或 'grid'
+    """
+    tasks = []
+    for (stock_code, stock_name), (start_date, end_date), strategy, grid_sizes, initial_cash in itertools.product(
+            stocks, windows, strategies, grid_sizes_list, cash_list):
+        task = {
+            'stock_code': stock_code, 'stock_name': stock_name, 'start_date': start_date, 'end_date': end_date,
+            'strategy': strategy, 'grid_sizes': grid_sizes, 'initial_cash': initial_cash, 'engine': engine,
+        }
+        task['run_id'] = make_run_id(task)
+        tasks.append(task)
+    return tasks
+
+
+def load_completed(output):
+    """读取汇总表中已成功完成的 run_id；崩溃时写了一半的最后一行会被忽略"""
+    completed = set()
+    if not os.path.exists(output):
+        return completed
+    with open(output, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            if row.get('worker_pid') and not row.get('error'):
+                completed.add(row['run_id'])
+    return completed
+
+
+def _get_bar_view(stock_code, start_date, end_date):
+    from simulations.bar_view import BarView
+
+    key = (stock_code, start_date, end_date)
+    if key not in _bar_views:
+        _bar_views[key] = BarView(stock_code, datetime.strptime(start_date, '%Y-%m-%d'), datetime.strptime(end_date, '%Y-%m-%d'))
+    return _bar_views[key]
+
+
+def _get_grid_engine(stock_code, start_date, end_date):
+    from simulations.grid_engine import GridBacktestEngine
+
+    key = (stock_code, start_date, end_date)
+    if key not in _grid_engines:
+        _grid_engines[key] = GridBacktestEngine(
+            _get_bar_view(stock_code, start_date, end_date),
+            datetime.strptime(start_date, '%Y-%m-%d'), datetime.strptime(end_date, '%Y-%m-%d')
+        )
+    return _grid_engines[key]
+
+
+def _run_one(task, log_dir, log_mode):
+    strategy = _strategy_classes()[task['strategy']]()
+    if task['grid_sizes'] is not None:
+        strategy._grid_size = list(task['grid_sizes'])
+
+    if task['engine'] == 'grid':
+        engine = _get_grid_engine(task['stock_code'], task['start_date'], task['end_date'])
+        result = engine.run_strategy(strategy, task['initial_cash'])
+        return result.change_rate, result.new_change_rate, len(result.trades)
+
+    from simulations.stock_simulation import StockSimulation
+    from simulations.stock_account_compact import CompactTPlusOneStockAccount
+
+    bar_view = _get_bar_view(task['stock_code'], task['start_date'], task['end_date'])
+    simulation = StockSimulation(
+        task['stock_code'], task['stock_name'],
+        datetime.strptime(task['start_date'], '%Y-%m-%d'), datetime.strptime(task['end_date'], '%Y-%m-%d'),
+        strategy, initial_cash=task['initial_cash'], log_dir_path=log_dir, bar_view=bar_view,
+        log_mode=log_mode, account_class=functools.partial(CompactTPlusOneStockAccount, keep_reasons=log_mode != 'none')
+    )
+    change_rate, new_change_rate = simulation.run()
+    return change_rate, new_change_rate, len(simulation.account.trade_history)
+
+
+def run_chunk(tasks, log_dir, log_mode='none'):
+    """子进程入口：顺序执行同一 (股票, 区间) 的一组回测，返回汇总表的行"""
+    rows = []
+    for task in tasks:
+        row = {field: task.get(field) for field in RESULT_FIELDS}
+        row['grid_sizes'] = ','.join(str(size) for size in task['grid_sizes']) if task['grid_sizes'] is not None else ''
+        row['worker_pid'] = os.getpid()
+        start = time.perf_counter()
+        try:
+            change_rate, new_change_rate, trades = _run_one(task, log_dir, log_mode)
+            row.update({
+                'change_rate': change_rate, 'new_change_rate': new_change_rate,
+                'performance_diff': (new_change_rate - change_rate) * 100, 'trades': trades, 'error': '',
+            })
+        except Exception as e:
+            row['error'] = f"{type(e).__name__}: {e}"
+        row['elapsed'] = round(time.perf_counter() - start, 4)
+        rows.append(row)
+    return rows
+
+
+def _chunks(tasks, chunk_size):
+    """按 (股票, 区间) 分组后切块，同一块内的回测共享子进程里缓存的行情"""
+    groups = {}
+    for task in tasks:
+        groups.setdefault((task['stock_code'], task['start_date'], task['end_date']), []).append(task)
+    for group in groups.values():
+        for start in range(0, len(group), chunk_size):
+            yield group[start:start + chunk_size]
+
+
+def prefetch_market_data(tasks, workers=None):
+    """在主进程中把所有股票在各回测区间的K线下载入库，子进程只读数据库"""
+    from stock_prefetch import StockPrefetcher
+
+    windows = {}
+    for task in tasks:
+        windows.setdefault((task['start_date'], task['end_date']), set()).add(task['stock_code'])
+    prefetcher = StockPrefetcher(max_workers=workers)
+    for (start_date, end_date), stock_codes in windows.items():
+        prefetcher.prefetch(sorted(stock_codes), start_date, end_date, daily=True, min_periods=('5', '15'))
+
+
+def run_sweep(tasks, output, workers=None, chunk_size=16, log_dir='./log/sweep', prefetch=True, log_mode='none'):
+    """
+    并行执行回测任务并把结果逐行追加到 output
+
+    返回:
+        (本次执行的回测数, 跳过的已完成回测数)
+    """
+    completed = load_completed(output)
+    pending = [task for task in tasks if task['run_id'] not in completed]
+    skipped = len(tasks) - len(pending)
+    if skipped:
+        logger.info(f"✅ 汇总表中已完成 {skipped} 组回测，跳过")
+    if not pending:
+        return 0, skipped
+
+    if prefetch:
+        prefetch_market_data(pending)
+
+    output_dir = os.path.dirname(output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    write_header = not os.path.exists(output) or os.path.getsize(output) == 0
+    if not write_header:
+        # 上次崩溃时可能留下没有换行的半行，补上换行避免和新行拼在一起
+        with open(output, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                with open(output, 'a', encoding='utf-8') as tail:
+                    tail.write('\n')
+    done = 0
+    start = time.time()
+    with open(output, 'a', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        if write_header:
+            writer.writeheader()
+            f.flush()
+
+        # 用 spawn 启动子进程：主进程预取时已经启动了 StockDB 的写线程并打开了连接，
+        # fork 出的子进程会继承失去线程的写队列和父进程的 sqlite 连接，写入时会一直阻塞
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = [executor.submit(run_chunk, chunk, log_dir, log_mode) for chunk in _chunks(pending, chunk_size)]
+            for future in as_completed(futures):
+                rows = future.result()
+                writer.writerows(rows)
+                # 每块完成即落盘，崩溃后只需重跑未写入的块
+                f.flush()
+                done += len(rows)
+                failed = sum(1 for row in rows if row['error'])
+                if failed:
+                    logger.warning(f"⚠️ {rows[0]['stock_code']} 有 {failed} 组回测失败: {rows[-1]['error'] or '见汇总表'}")
+                logger.info(f"进度 {done}/{len(pending)}  {done / max(time.time() - start, 1e-9):.1f} 组/秒")
+
+    return done, skipped
+
+
+def _parse_stock(value):
+    stock_code, _, stock_name = value.partition(':')
+    return stock_code, stock_name or stock_code
+
+
+def _parse_window(value):
+    start_date, end_date = value.split(':')
+    return start_date, end_date
+
+
+def _parse_grid_sizes(value):
+    if value == 'default':
+        return None
+    return [float(size) for size in value.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多进程回测参数扫描')
+    parser.add_argument('--stocks', nargs='+', required=True, help='股票代码，可写成 代码:名称')
+    parser.add_argument('--windows', nargs='+', required=True, help='回测区间 YYYY-MM-DD:YYYY-MM-DD')
+    parser.add_argument('--strategies', nargs='+', default=['StockStrategyGridV1'], help='策略类名')
+    parser.add_argument('--grid-sizes', nargs='+', default=['default'], help='逗号分隔的网格梯度，default 为策略默认值')
+    parser.add_argument('--cash', nargs='+', type=float, default=[50000], help='初始资金')
+    parser.add_argument('--engine', choices=('simulation', 'grid'), default='simulation')
+    parser.add_argument('--output', default='./log/sweep.csv', help='CSV 汇总表，已完成的回测在续跑时跳过')
+    parser.add_argument('--parquet', default=None, help='全部完成后另存为 Parquet（需要 pyarrow）')
+    parser.add_argument('--workers', type=int, default=None, help='子进程数，默认CPU核数')
+    parser.add_argument('--chunk-size', type=int, default=16, help='每次提交给子进程的回测数')
+    parser.add_argument('--log-dir', default='./log/sweep', help='StockSimulation 回测日志目录')
+    parser.add_argument('--log-mode', choices=('full', 'jsonl', 'none'), default='none', help='StockSimulation 回测日志模式')
+    parser.add_argument('--no-prefetch', action='store_true', help='跳过下载，直接使用数据库中已有的K线')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    strategy_classes = _strategy_classes()
+    for strategy in args.strategies:
+        if strategy not in strategy_classes:
+            parser.error(f"未知策略 {strategy}，可选: {', '.join(strategy_classes)}")
+
+    tasks = build_tasks(
+        [_parse_stock(value) for value in args.stocks],
+        [_parse_window(value) for value in args.windows],
+        args.strategies,
+        [_parse_grid_sizes(value) for value in args.grid_sizes],
+        args.cash,
+        args.engine,
+    )
+
+    start = time.time()
+    done, skipped = run_sweep(tasks, args.output, args.workers, args.chunk_size, args.log_dir,
+                              not args.no_prefetch, args.log_mode)
+    logger.info(f"✅ 参数扫描完成: 执行 {done} 组，跳过 {skipped} 组，耗时 {time.time() - start:.1f}s，结果: {args.output}")
+
+    if args.parquet:
+        import pandas as pd
+        pd.read_csv(args.output, dtype={'stock_code': str}).drop_duplicates('run_id', keep='last').to_parquet(args.parquet)
+        logger.info(f"✅ 已另存为 {args.parquet}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# tick_scheduler.py
+"""
+多只股票回测的并发决策调度
+
+每只股票仍是独立的 StockSimulation（独立账户），由 StockSimulation.steps() 逐个决策时刻推进。
+调度器每轮取所有未结束回测中最早的决策时刻，把处于该时刻的股票的决策同时发出
+（策略实现了 make_decision_async 时并发等待，否则同步调用），全部返回后再按传入顺序依次应用，
+因此成交和日志的顺序与并发完成的先后无关，结果与逐只串行运行一致。
+各回测结束的先后取决于各自的K线，传入 summary_file 时汇总行按结束顺序写入，
+需要按股票顺序的汇总时由调用方在 run 返回后写出（见 main.py）。
+
+环境变量:
+    DEEPSEEK_CONCURRENCY  同一时刻最多同时等待的决策数，默认 8
+"""
+import asyncio
+import os
+import time
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TickScheduler:
+    def __init__(self, simulations, concurrency=None):
+        """
+        Args:
+            simulations (list): StockSimulation 列表，决策按此顺序应用
+            concurrency (int): 同时等待的决策数上限，默认 DEEPSEEK_CONCURRENCY 或 8
+        """
+        self.simulations = simulations
+        self.concurrency = concurrency or int(os.environ.get("DEEPSEEK_CONCURRENCY", 8))
+        # 每个决策时刻（发出到全部应用完）的耗时，单位秒
+        self.tick_times = []
+
+    def run(self):
+        """
+        运行全部回测
+
+        返回:
+            list: 与 simulations 一一对应的 (涨跌幅, 交易后收益率)，策略不支持决策的为 None
+        """
+        return asyncio.run(self.run_async())
+
+    @staticmethod
+    async def _decide(simulation, cur_datetime, semaphore):
+        strategy = simulation.strategy
+        if hasattr(strategy, "make_decision_async"):
+            async with semaphore:
+                return await strategy.make_decision_async(simulation.stock_name, simulation.stock_code,
+                                                          simulation.account, cur_datetime)
+        return strategy.make_decision(simulation.stock_name, simulation.stock_code, simulation.account, cur_datetime)
+
+    async def run_async(self):
+        results = [None] * len(self.simulations)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        steps = {}
+        # {序号: 等待决策的时刻}
+        pending = {}
+        try:
+            for index, simulation in enumerate(self.simulations):
+                if not hasattr(simulation.strategy, "make_decision"):
+                    continue
+                steps[index] = simulation.steps()
+                try:
+                    pending[index] = next(steps[index])
+                except StopIteration as stop:
+                    results[index] = stop.value
+
+            while pending:
+                start = time.perf_counter()
+                cur_datetime = min(pending.values())
+                batch = [index for index in sorted(pending) if pending[index] == cur_datetime]
+                decisions = await asyncio.gather(*(
+                    self._decide(self.simulations[index], cur_datetime, semaphore) for index in batch
+                ))
+                for index, decision in zip(batch, decisions):
+                    try:
+                        pending[index] = steps[index].send(decision)
+                    except StopIteration as stop:
+                        results[index] = stop.value
+                        del pending[index]
+                self.tick_times.append(time.perf_counter() - start)
+        finally:
+            for step in steps.values():
+                step.close()
+
+        return results
+
+    def tick_stats(self):
+        """每个决策时刻的耗时统计，单位毫秒"""
+        if not self.tick_times:
+            return {"ticks": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        times = np.array(self.tick_times) * 1000
+        return {
+            "ticks": len(times),
+            "mean_ms": float(times.mean()),
+            "p50_ms": float(np.percentile(times, 50)),
+            "p99_ms": float(np.percentile(times, 99)),
+            "max_ms": float(times.max()),
+        }
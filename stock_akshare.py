@@ -2,6 +2,7 @@ import pandas as pd
 from datetime import datetime, timedelta
 import akshare as ak
 import time
+from stock_rate_limit import get_limiter
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,6 +26,7 @@ class StockAKShare:
         """
         try:
             # 获取日线数据
+            get_limiter('sina').acquire()
             stock_data = ak.stock_zh_a_daily(
                 symbol=symbol,
                 period='daily',
@@ -89,6 +91,7 @@ class StockAKShare:
                 symbol = f"sz{stock_code}"  # 深圳
             
             # 获取日线数据
+            get_limiter('sina').acquire()
             stock_data = ak.stock_zh_a_daily(
                 symbol=symbol,
                 start_date=start_date,
@@ -148,6 +151,7 @@ class StockAKShare:
                 symbol = f"sz{stock_code}"  # 深圳
             
             # 获取分钟数据
+            get_limiter('sina').acquire()
             stock_data = ak.stock_zh_a_minute(
                 symbol=symbol,
                 period=period,
@@ -179,6 +183,7 @@ class StockAKShare:
         
     def _get_index_info_from_api(self, symbol, symbol_name):
         try:
+            get_limiter('csindex').acquire()
             index_stock_cons_csindex_df = ak.index_stock_cons_csindex(symbol=symbol)
             if not index_stock_cons_csindex_df.empty:
                 stock_info = index_stock_cons_csindex_df.rename(columns={
@@ -215,6 +220,7 @@ class StockAKShare:
         return self._get_index_info_from_api(symbol, '中证500')
 
     def get_today_data_realtime(self, date):
+        get_limiter('sina').acquire()
         stock_data = ak.stock_zh_a_spot()
         if not stock_data.empty:
             required_columns = ['代码', '名称', '最新价', '今开', '最高', '最低', '成交量', '名称', '成交额']
@@ -0,0 +1,262 @@
+# stock_column_store.py
+"""
+K线列式存储
+
+按 股票/周期 分区，每一列保存为一个 .npy 文件，读取时通过内存映射零拷贝访问：
+    {root}/daily/{stock_code}/date.npy open.npy ... amount.npy
+    {root}/min5/{stock_code}/datetime.npy open.npy ... volume.npy
+
+时间列为 int64 的epoch秒（按本地时间当作UTC换算，不做时区转换），
+价格列为 float32，成交量为 int64，成交额数值较大，使用 float64。
+
+数据以 SQLite 为准，列存储只是只读副本：
+StockDB 写入K线时会删除对应分区，读取回退到 SQLite，直到下一次同步。
+
+同步/压缩:
+    python stock_column_store.py sync [--db stock_data.db] [--root stock_columns] [--periods 5 15]
+"""
+import os
+import shutil
+import threading
+import argparse
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+DAILY_COLUMNS = {
+    'date': np.int64,
+    'open': np.float32,
+    'high': np.float32,
+    'low': np.float32,
+    'close': np.float32,
+    'volume': np.int64,
+    'amount': np.float64,
+}
+
+MIN_COLUMNS = {
+    'datetime': np.int64,
+    'open': np.float32,
+    'high': np.float32,
+    'low': np.float32,
+    'close': np.float32,
+    'volume': np.int64,
+}
+
+# float32 还原为 float64 时保留的小数位，消除 10.23 -> 10.229999 这类误差
+PRICE_DECIMALS = 4
+
+
+def to_epoch_seconds(values):
+    """日期/时间序列（字符串、datetime 或 Series）转换为 int64 epoch秒数组"""
+    return pd.to_datetime(values).values.astype('datetime64[s]').astype(np.int64)
+
+
+def _epoch_second(value):
+    """单个日期/时间转换为 epoch秒"""
+    return pd.Timestamp(value).value // 10**9
+
+
+class StockColumnStore:
+    def __init__(self, root='stock_columns'):
+        self.root = root
+        # 已打开的内存映射 {分区目录: ((inode, mtime), {列名: np.memmap})}
+        self._mapped = {}
+        self._lock = threading.Lock()
+
+    def _partition_dir(self, kind, stock_code):
+        return os.path.join(self.root, kind, stock_code)
+
+    @staticmethod
+    def _min_kind(period):
+        return f"min{period}"
+
+    def has_daily(self, stock_code):
+        return os.path.isdir(self._partition_dir('daily', stock_code))
+
+    def has_min(self, stock_code, period):
+        return os.path.isdir(self._partition_dir(self._min_kind(period), stock_code))
+
+    def _load(self, kind, stock_code, columns):
+        """
+        打开分区的全部列（内存映射），分区不存在返回None
+        缓存的映射按分区目录的 inode/mtime 校验，其它进程重写或删除分区后重新打开
+        """
+        path = self._partition_dir(kind, stock_code)
+        with self._lock:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self._mapped.pop(path, None)
+                return None
+            key = (stat.st_ino, stat.st_mtime_ns)
+
+            cached = self._mapped.get(path)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+
+            try:
+                arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in columns}
+            except FileNotFoundError:
+                # 分区正在被其它进程替换或删除
+                self._mapped.pop(path, None)
+                return None
+            self._mapped[path] = (key, arrays)
+            return arrays
+
+    def _write(self, kind, stock_code, arrays):
+        """先写临时目录再整体替换，读者不会看到只写了一半的分区"""
+        path = self._partition_dir(kind, stock_code)
+        tmp_path = path + '.tmp'
+        old_path = path + '.old'
+
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), values)
+
+        with self._lock:
+            self._mapped.pop(path, None)
+            if os.path.isdir(path):
+                shutil.rmtree(old_path, ignore_errors=True)
+                os.rename(path, old_path)
+            os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    def _drop(self, kind, stock_code):
+        path = self._partition_dir(kind, stock_code)
+        with self._lock:
+            self._mapped.pop(path, None)
+            if not os.path.isdir(path):
+                return
+            # 先改名再删除，避免其它读者打开半删除的目录
+            trash_path = f"{path}.drop.{os.getpid()}.{threading.get_ident()}"
+            os.rename(path, trash_path)
+        shutil.rmtree(trash_path, ignore_errors=True)
+
+    def drop_daily(self, stock_code):
+        self._drop('daily', stock_code)
+
+    def drop_min(self, stock_code, period):
+        self._drop(self._min_kind(period), stock_code)
+
+    @staticmethod
+    def _columns_from_frame(df, time_column, columns):
+        df = df.sort_values(time_column).drop_duplicates(time_column, keep='last')
+        arrays = {time_column: to_epoch_seconds(df[time_column])}
+        for name, dtype in columns.items():
+            if name == time_column:
+                continue
+            if name in df.columns:
+                arrays[name] = pd.to_numeric(df[name]).fillna(0).to_numpy(dtype=dtype)
+            else:
+                arrays[name] = np.zeros(len(df), dtype=dtype)
+        return arrays
+
+    def write_daily(self, stock_code, kline_data):
+        """用日K线 DataFrame 覆盖整个分区"""
+        self._write('daily', stock_code, self._columns_from_frame(kline_data, 'date', DAILY_COLUMNS))
+
+    def write_min(self, stock_code, period, kline_data):
+        """用分钟K线 DataFrame 覆盖整个分区"""
+        self._write(self._min_kind(period), stock_code, self._columns_from_frame(kline_data, 'datetime', MIN_COLUMNS))
+
+    @staticmethod
+    def _slice(arrays, time_column, start, end):
+        """按时间范围（闭区间）切片，返回的仍是内存映射上的视图"""
+        ts = arrays[time_column]
+        lo = np.searchsorted(ts, _epoch_second(start), side='left')
+        hi = np.searchsorted(ts, _epoch_second(end), side='right')
+        return {name: values[lo:hi] for name, values in arrays.items()}
+
+    def read_daily_arrays(self, stock_code, start_date, end_date):
+        """零拷贝读取日K线，返回 {列名: ndarray视图}，分区不存在返回None"""
+        arrays = self._load('daily', stock_code, DAILY_COLUMNS)
+        if arrays is None:
+            return None
+        return self._slice(arrays, 'date', start_date, end_date)
+
+    def read_min_arrays(self, stock_code, period, start_datetime, end_datetime):
+        """零拷贝读取分钟K线，返回 {列名: ndarray视图}，分区不存在返回None"""
+        arrays = self._load(self._min_kind(period), stock_code, MIN_COLUMNS)
+        if arrays is None:
+            return None
+        return self._slice(arrays, 'datetime', start_datetime, end_datetime)
+
+    @staticmethod
+    def _to_frame(stock_code, arrays, time_column, columns):
+        data = {'stock_code': [stock_code] * len(arrays[time_column])}
+        data[time_column] = pd.to_datetime(np.asarray(arrays[time_column]), unit='s')
+        for name, dtype in columns.items():
+            if name == time_column:
+                continue
+            values = np.asarray(arrays[name])
+            if dtype is np.float32:
+                values = values.astype(np.float64).round(PRICE_DECIMALS)
+            data[name] = values
+        return pd.DataFrame(data)
+
+    def read_daily(self, stock_code, start_date, end_date):
+        """读取日K线，返回与 StockDB.get_daily_data 相同结构的 DataFrame，分区不存在返回None"""
+        arrays = self.read_daily_arrays(stock_code, start_date, end_date)
+        if arrays is None:
+            return None
+        return self._to_frame(stock_code, arrays, 'date', DAILY_COLUMNS)
+
+    def read_min(self, stock_code, period, start_datetime, end_datetime):
+        """读取分钟K线，返回与 StockDB.get_min_data 相同结构的 DataFrame，分区不存在返回None"""
+        arrays = self.read_min_arrays(stock_code, period, start_datetime, end_datetime)
+        if arrays is None:
+            return None
+        return self._to_frame(stock_code, arrays, 'datetime', MIN_COLUMNS)
+
+    def sync_from_db(self, db, periods=('5', '15'), stock_codes=None):
+        """
+        从 SQLite 导出全部K线并重写列存储分区
+
+        返回:
+            dict: 每类数据导出的分区数
+        """
+        counts = {'daily': 0}
+        codes = stock_codes or db.get_daily_stock_codes()
+        for stock_code in codes:
+            df = db._sqlite_daily_data(stock_code, '1900-01-01', '2199-12-31')
+            if not df.empty:
+                self.write_daily(stock_code, df)
+                counts['daily'] += 1
+
+        for period in periods:
+            kind = self._min_kind(period)
+            counts[kind] = 0
+            codes = stock_codes or db.get_min_stock_codes(period)
+            for stock_code in codes:
+                df = db._sqlite_min_data(stock_code, period, '1900-01-01 00:00:00', '2199-12-31 23:59:59')
+                if not df.empty:
+                    self.write_min(stock_code, period, df)
+                    counts[kind] += 1
+
+        return counts
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
+    parser = argparse.ArgumentParser(description='K线列式存储工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    sync_parser = subparsers.add_parser('sync', help='从SQLite导出K线，重写列存储分区')
+    sync_parser.add_argument('--db', default='stock_data.db')
+    sync_parser.add_argument('--root', default='stock_columns')
+    sync_parser.add_argument('--periods', nargs='*', default=['5', '15'])
+    sync_parser.add_argument('--stocks', nargs='*', default=None)
+    args = parser.parse_args()
+
+    from stock_db import StockDB
+
+    counts = StockColumnStore(args.root).sync_from_db(StockDB(args.db), periods=args.periods, stock_codes=args.stocks)
+    for kind, count in counts.items():
+        logger.info(f"✅ {kind}: 已同步 {count} 个分区")
@@ -1,13 +1,71 @@
+import os
+import threading
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import matplotlib.dates as mdates
 from stock_tools import StockTools
 from stock_akshare import StockAKShare
 from stock_db import StockDB
+from stock_frame_cache import get_frame_cache, DAILY
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 从未下载过的股票，一次下载的历史天数
+FULL_REFRESH_DAYS = 1000
+# 日K线缓存未命中时，从请求开始日期往前多缓存的天数（覆盖预测请求的200个交易日窗口）
+FRAME_CACHE_LOOKBACK_DAYS = int(os.environ.get('FRAME_CACHE_LOOKBACK_DAYS', 400))
+
+# 进程内日线下载统计，prepare_stock 每轮开始时重置，结束时输出
+_fetch_stats_lock = threading.Lock()
+_fetch_stats = {}
+
+
+def reset_fetch_stats():
+    with _fetch_stats_lock:
+        _fetch_stats.update({
+            'api_calls': 0,
+            'full_refreshes': 0,
+            'rows_fetched': 0,
+            'bytes_fetched': 0,
+            'rows_saved': 0,
+            'bytes_saved': 0,
+        })
+
+
+def get_fetch_stats():
+    """
+    获取日线下载统计
+    rows_saved/bytes_saved 为增量下载相对于整窗口重新下载所节省的行数和字节数（按本次下载的平均行大小估算）
+    """
+    with _fetch_stats_lock:
+        return dict(_fetch_stats)
+
+
+def _record_fetch(data):
+    with _fetch_stats_lock:
+        _fetch_stats['api_calls'] += 1
+        _fetch_stats['rows_fetched'] += len(data)
+        _fetch_stats['bytes_fetched'] += int(data.memory_usage(deep=True).sum()) if not data.empty else 0
+
+
+def _record_saving(data, skipped_rows):
+    if skipped_rows <= 0 or data.empty:
+        return
+    row_bytes = int(data.memory_usage(deep=True).sum()) / len(data)
+    with _fetch_stats_lock:
+        _fetch_stats['rows_saved'] += skipped_rows
+        _fetch_stats['bytes_saved'] += int(skipped_rows * row_bytes)
+
+
+def _full_refresh_start(start_date):
+    full_start = (datetime.now() - timedelta(days=FULL_REFRESH_DAYS)).strftime("%Y-%m-%d")
+    return min(full_start, start_date)
+
+
+reset_fetch_stats()
+
 class StockDataFetcher:
     """
     股票数据获取类
@@ -16,9 +74,17 @@ class StockDataFetcher:
     
     def __init__(self):
         pass
-    def get_daily_kline(self, stock_code, start_date=None, end_date=None, sleep_time=0):
+    def get_daily_kline(self, stock_code, start_date=None, end_date=None, sleep_time=0, raise_errors=False):
         """
-        获取股票日K线数据 - 简化缓存版本
+        获取股票日K线数据 - 按覆盖区间增量下载
+
+        daily_coverage 表记录每只股票已经从API下载过的日期区间，只下载请求范围内缺失的部分：
+        - 从未下载过：下载最近 FULL_REFRESH_DAYS 天（或更早的请求开始日期）的完整数据
+        - 尾部缺失：从数据库最新日期开始下载到结束日期，重叠的一天用于校验前复权价格
+          如果重叠日收盘价变化（发生了除权除息，复权因子改变），全量刷新该股票
+        - 头部/中间缺失：只下载缺失的区间
+
+        raise_errors=True 时下载失败抛出异常而不是返回空数据，供预取任务判断是否需要重试
         """
         # 设置默认时间范围
         if end_date is None:
@@ -32,43 +98,167 @@ class StockDataFetcher:
         
         try:
             db = StockDB()
+            cache = get_frame_cache()
+            cache_key = (db.db_path, stock_code, DAILY)
+            cached = cache.get(cache_key, start_date, end_date, 'date')
+            if cached is not None:
+                return cached
 
-            # 先检查最新日期
-            latest_db_date = db.get_latest_daily_date(stock_code)
+            today = datetime.now().strftime("%Y-%m-%d")
+            # 今天之后的数据还不存在，不需要下载
+            fetch_end = min(end_date, today)
 
-            # 如果数据库中已经有数据且覆盖了请求范围，直接返回
-            if latest_db_date and latest_db_date >= end_date:
-                db_data = db.get_daily_data(stock_code, start_date, end_date)
-                return db_data
+            coverage = db.get_daily_coverage(stock_code)
+            if not coverage:
+                # 旧版本下载的数据没有覆盖区间记录，用已有数据的日期范围作为覆盖区间
+                first_date, last_date = db.get_daily_date_range(stock_code)
+                if first_date:
+                    db.add_daily_coverage(stock_code, first_date, last_date)
+                    coverage = [(first_date, last_date)]
+
+            success = True
+            if not coverage:
+                success = self._refresh_daily_kline(db, stock_code, start_date, fetch_end, sleep_time)
             else:
-                # 否则从API获取数据并更新数据库
-                # 直接获取1000天的数据，确保数据完整
-                one_year_ago = (datetime.now() - timedelta(days=1000)).strftime("%Y%m%d")
-                full_data = StockAKShare().get_daily_kline_from_api_sina(stock_code, one_year_ago, end_date.replace('-', ''), sleep_time=sleep_time)
+                for gap_start, gap_end in self._coverage_gaps(coverage, start_date, fetch_end):
+                    if gap_start > coverage[-1][1]:
+                        success &= self._fetch_daily_tail(db, stock_code, start_date, fetch_end, sleep_time)
+                    else:
+                        success &= self._fetch_daily_gap(db, stock_code, gap_start, gap_end, sleep_time,
+                                                         head=gap_end < coverage[0][0])
 
-                if not full_data.empty:
-                    db.save_daily_data(stock_code, full_data)
-                    
-                    # 从完整数据中提取请求的时间范围
-                    update_data = full_data[
-                        (full_data['date'] >= pd.to_datetime(start_date)) & 
-                        (full_data['date'] <= pd.to_datetime(end_date))
-                    ]
+            if not success and raise_errors:
+                raise RuntimeError(f"{stock_code} 日线数据下载失败")
 
-                    required_columns = ['date', 'open', 'high', 'low', 'close', 'volume', 'amount']
-                    update_data = update_data[required_columns]
-                    update_data['stock_code'] = stock_code
+            # 下载后 [start_date, fetch_end] 落在一个覆盖区间内时，该区间内的查询都不会再下载，
+            # 缓存请求开始日期往前 FRAME_CACHE_LOOKBACK_DAYS 天到覆盖区间结束的整段数据，后续的单日和窗口查询都从中切片
+            if success:
+                span = next((span for span in db.get_daily_coverage(stock_code)
+                             if span[0] <= start_date and fetch_end <= span[1]), None)
+                if span is not None:
+                    lookback = (datetime.strptime(start_date, "%Y-%m-%d") - timedelta(days=FRAME_CACHE_LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+                    return self._load_cached(cache, cache_key, start_date, end_date, max(span[0], lookback), span[1],
+                                             'date', lambda lo, hi: db.get_daily_data(stock_code, lo, hi))
 
-                    return update_data
-                else:
-                    logger.error("⚠️ 未获取到API数据")
-                    return pd.DataFrame()
+            return db.get_daily_data(stock_code, start_date, end_date)
                     
         except Exception as e:
             logger.error(f"❌ 获取daily数据失败: {e}")
+            if raise_errors:
+                raise
             return pd.DataFrame()
+
+    @staticmethod
+    def _load_cached(cache, cache_key, start, end, lo, hi, time_column, read):
+        """
+        [lo, hi] 已确认完整，从数据库读取后放入缓存（与已缓存的重叠区间合并），返回其中 [start, end] 的部分
+        read(开始, 结束) 从数据库读取数据帧
+        """
+        bounds = cache.bounds(cache_key)
+        if bounds is not None and bounds[0] <= hi and lo <= bounds[1]:
+            lo, hi = min(lo, bounds[0]), max(hi, bounds[1])
+
+        version = cache.version(cache_key)
+        frame = read(lo, hi)
+        cache.put(cache_key, lo, hi, frame, version)
+        if frame.empty:
+            return frame
+        times = frame[time_column]
+        first = times.searchsorted(pd.Timestamp(start), side='left')
+        last = times.searchsorted(pd.Timestamp(end), side='right')
+        return frame.iloc[first:last].reset_index(drop=True).copy()
+
+    @staticmethod
+    def _coverage_gaps(coverage, start_date, end_date):
+        """[start_date, end_date] 中未被覆盖区间包含的部分，返回 [(开始, 结束), ...]"""
+        gaps = []
+        cursor = start_date
+        for span_start, span_end in coverage:
+            if cursor > end_date:
+                break
+            if span_end < cursor:
+                continue
+            if span_start > cursor:
+                day_before = (datetime.strptime(span_start, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+                gaps.append((cursor, min(day_before, end_date)))
+            cursor = (datetime.strptime(span_end, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        if cursor <= end_date:
+            gaps.append((cursor, end_date))
+        return gaps
+
+    def _download_daily(self, stock_code, start_date, end_date, sleep_time):
+        """调用新浪接口下载日K线，并计入下载统计"""
+        data = StockAKShare().get_daily_kline_from_api_sina(
+            stock_code, start_date.replace('-', ''), end_date.replace('-', ''), sleep_time=sleep_time
+        )
+        _record_fetch(data)
+        return data
+
+    def _refresh_daily_kline(self, db, stock_code, start_date, end_date, sleep_time):
+        """全量刷新：下载最近 FULL_REFRESH_DAYS 天的数据，替换该股票已有的日线和覆盖区间"""
+        full_start = _full_refresh_start(start_date)
+        full_data = self._download_daily(stock_code, full_start, end_date, sleep_time)
+        if full_data.empty:
+            logger.error("⚠️ 未获取到API数据")
+            return False
+
+        with _fetch_stats_lock:
+            _fetch_stats['full_refreshes'] += 1
+        # 日线和覆盖区间在同一事务中写入，写入失败时都不生效，下次重新下载
+        return db.save_daily_data(stock_code, full_data, replace=True,
+                                  coverage=(full_start, full_data['date'].max().strftime("%Y-%m-%d")))
+
+    def _fetch_daily_tail(self, db, stock_code, start_date, end_date, sleep_time):
+        """下载数据库最新日期之后的数据，重叠一天校验复权价格"""
+        latest_db_date = db.get_latest_daily_date(stock_code)
+        stored = db.get_daily_data(stock_code, latest_db_date, latest_db_date)
+        new_data = self._download_daily(stock_code, latest_db_date, end_date, sleep_time)
+        if new_data.empty:
+            logger.error("⚠️ 未获取到API数据")
+            return False
+
+        overlap = new_data[new_data['date'] == pd.to_datetime(latest_db_date)]
+        if not stored.empty and not overlap.empty and not np.isclose(
+            float(overlap['close'].iloc[0]), float(stored['close'].iloc[0]), rtol=1e-4
+        ):
+            logger.info(f"{stock_code} {latest_db_date} 收盘价变化，复权因子已改变，全量刷新")
+            return self._refresh_daily_kline(db, stock_code, start_date, end_date, sleep_time)
+
+        if not db.save_daily_data(stock_code, new_data,
+                                  coverage=(latest_db_date, new_data['date'].max().strftime("%Y-%m-%d"))):
+            return False
+
+        # 旧逻辑在这里会重新下载整个窗口，已存储的部分就是本次节省的下载量
+        skipped_rows = db.count_daily_data(stock_code, _full_refresh_start(start_date), latest_db_date) - 1
+        _record_saving(new_data, skipped_rows)
+        return True
+
+    def _fetch_daily_gap(self, db, stock_code, gap_start, gap_end, sleep_time, head=False):
+        """
+        下载覆盖区间之前或之间缺失的区间
+        只下载区间内第一个到最后一个交易日，区间内没有交易日（周末、节假日）时直接记为已覆盖
+
+        参数:
+            head (bool): 区间在已有数据之前，接口没有返回数据说明股票当时还未上市，同样记为已覆盖
+        """
+        trading_days = StockTools().trading_days_between(gap_start, gap_end)
+        if len(trading_days) == 0:
+            db.add_daily_coverage(stock_code, gap_start, gap_end)
+            return True
+
+        gap_data = self._download_daily(stock_code, str(trading_days[0]), str(trading_days[-1]), sleep_time)
+        if gap_data.empty:
+            if head:
+                logger.info(f"{stock_code} {gap_start}~{gap_end} 无数据（未上市），记为已覆盖")
+                db.add_daily_coverage(stock_code, gap_start, gap_end)
+                return True
+            # 中间缺失时接口失败和停牌无法区分，不记录覆盖区间，下次重试
+            logger.warning(f"⚠️ {stock_code} {gap_start}~{gap_end} 未获取到API数据")
+            return False
+
+        return db.save_daily_data(stock_code, gap_data, coverage=(gap_start, gap_end))
             
-    def get_min_kline(self, stock_code, period='5', start_date=None, end_date=None, realtime=False, adjust=''):
+    def get_min_kline(self, stock_code, period='5', start_date=None, end_date=None, realtime=False, adjust='', raise_errors=False):
         """
         获取股票分钟K线数据 - 支持缓存
         
@@ -78,6 +268,7 @@ class StockDataFetcher:
             start_date (str): 开始日期 "YYYY-MM-DD"，默认今天
             end_date (str): 结束日期 "YYYY-MM-DD"，默认今天
             adjust (str): 复权类型
+            raise_errors (bool): 下载失败时抛出异常而不是返回空数据
             
         返回:
             pandas.DataFrame: 分钟K线数据
@@ -107,14 +298,20 @@ class StockDataFetcher:
         
         try:
             db = StockDB()
+            cache = get_frame_cache()
+            cache_key = (db.db_path, stock_code, str(period))
+            cached = cache.get(cache_key, start_datetime, end_datetime, 'datetime')
+            if cached is not None:
+                return cached
             
             # 获取数据库中最新的分钟数据时间
             latest_min_datetime = db.get_latest_min_datetime(stock_code, period)
             
             # 如果数据库中有数据且覆盖了请求范围，直接返回
             if latest_min_datetime and latest_min_datetime >= end_datetime:
-                db_data = db.get_min_data(stock_code, period, start_datetime, end_datetime)
-                return db_data
+                # 数据库中直到最新时间的数据都不会再触发下载，缓存到最新时间
+                return self._load_cached(cache, cache_key, start_datetime, end_datetime, start_datetime, latest_min_datetime,
+                                         'datetime', lambda lo, hi: db.get_min_data(stock_code, period, lo, hi))
             else:
                 # 数据库数据不够新，从API获取最新数据
                 api_data = StockAKShare().get_all_min_kline_from_api(stock_code, period=period, adjust=adjust)
@@ -129,11 +326,15 @@ class StockDataFetcher:
                         (api_data['datetime'] <= pd.to_datetime(end_datetime))
                     ]
                     return filtered_data
-                
+
+                if raise_errors:
+                    raise RuntimeError(f"{stock_code} {period}分钟K线数据下载失败")
                 return pd.DataFrame()
                 
         except Exception as e:
             logger.error(f"❌ 获取{period}分钟K线数据失败: {e}")
+            if raise_errors:
+                raise
             return pd.DataFrame()
 
     def get_daily_end_price(self, stock_code: str, current_datetime: datetime) -> float:
@@ -1,24 +1,342 @@
 # stock_db.py
+import os
+import queue
 import sqlite3
+import threading
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from stock_tools import StockTools
+from stock_column_store import StockColumnStore
+from stock_frame_cache import get_frame_cache, DAILY
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 每个线程持有自己的连接 {db_path: sqlite3.Connection}，跨调用复用
+_thread_local = threading.local()
+# 建表只在进程内执行一次，记录每个数据库的K线表结构版本 {db_path: 版本}
+_schema_lock = threading.Lock()
+_schema_versions = {}
+
+# K线表结构版本
+# 1: daily_kline / minute_kline，股票代码与时间均为文本
+# 2: daily_bar / minute_bar，整数股票id + 整数epoch时间，WITHOUT ROWID 聚簇存储
+BAR_SCHEMA_TEXT = 1
+BAR_SCHEMA_INT = 2
+
+BAR_SCHEMA_INT_SQL = [
+    '''
+        CREATE TABLE IF NOT EXISTS stock_ids (
+            stock_id INTEGER PRIMARY KEY,
+            stock_code TEXT NOT NULL UNIQUE
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS daily_bar (
+            stock_id INTEGER,
+            day INTEGER,            -- epoch天数
+            open REAL, high REAL, low REAL, close REAL,
+            volume INTEGER, amount REAL,
+            PRIMARY KEY (stock_id, day)
+        ) WITHOUT ROWID
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS minute_bar (
+            stock_id INTEGER,
+            period INTEGER,
+            minute INTEGER,         -- epoch分钟数
+            open REAL, high REAL, low REAL, close REAL,
+            volume INTEGER,
+            PRIMARY KEY (stock_id, period, minute)
+        ) WITHOUT ROWID
+    ''',
+]
+
+_SQL_ADD_STOCK_ID = 'INSERT OR IGNORE INTO stock_ids (stock_code) VALUES (?)'
+_SQL_STOCK_ID = '(SELECT stock_id FROM stock_ids WHERE stock_code = ?)'
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch_days(values):
+    """日期序列转换为 int64 epoch天数数组（按本地日期计算，不做时区转换）"""
+    return pd.to_datetime(values).values.astype('datetime64[D]').astype(np.int64)
+
+
+def to_epoch_minutes(values):
+    """时间序列转换为 int64 epoch分钟数数组（按本地时间计算，不做时区转换）"""
+    return pd.to_datetime(values).values.astype('datetime64[m]').astype(np.int64)
+
+
+def _epoch_day(value):
+    return pd.Timestamp(value).value // (86400 * 10**9)
+
+
+def _epoch_minute(value):
+    return pd.Timestamp(value).value // (60 * 10**9)
+
+
+def _day_str(day):
+    return (_EPOCH + timedelta(days=day)).strftime('%Y-%m-%d')
+
+
+def _minute_str(minute):
+    return (_EPOCH + timedelta(minutes=minute)).strftime('%Y-%m-%d %H:%M:%S')
+
+# 数据库运行参数，可通过环境变量覆盖，或在创建StockDB之前调用configure_db修改
+DB_CONFIG = {
+    'journal_mode': os.environ.get('STOCK_DB_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('STOCK_DB_SYNCHRONOUS', 'NORMAL'),
+    'cache_size': int(os.environ.get('STOCK_DB_CACHE_SIZE', -64000)),  # 负数表示KB，约64MB
+    'mmap_size': int(os.environ.get('STOCK_DB_MMAP_SIZE', 256 * 1024 * 1024)),
+    'temp_store': os.environ.get('STOCK_DB_TEMP_STORE', 'MEMORY'),
+    'busy_timeout': float(os.environ.get('STOCK_DB_BUSY_TIMEOUT', 30)),
+    'writer_queue': os.environ.get('STOCK_DB_WRITER_QUEUE', '1') == '1',  # 所有写入由单独的写线程执行
+    'writer_batch_size': int(os.environ.get('STOCK_DB_WRITER_BATCH_SIZE', 64)),  # 一次组提交最多合并的写请求数
+    'column_store': os.environ.get('STOCK_DB_COLUMN_STORE', ''),  # 列式存储目录，为空表示不启用
+}
+
+# 每个数据库一个写线程 {db_path: _DBWriter}
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def configure_db(**options):
+    """修改数据库运行参数，需在首次访问数据库之前调用"""
+    unknown = set(options) - set(DB_CONFIG)
+    if unknown:
+        raise ValueError(f"未知的数据库参数: {', '.join(sorted(unknown))}")
+    DB_CONFIG.update(options)
+
+
+def _connect(db_path):
+    """创建连接并设置连接级别的pragma"""
+    conn = sqlite3.connect(db_path, timeout=DB_CONFIG['busy_timeout'])
+    conn.execute(f"PRAGMA synchronous={DB_CONFIG['synchronous']}")
+    conn.execute(f"PRAGMA cache_size={DB_CONFIG['cache_size']}")
+    conn.execute(f"PRAGMA mmap_size={DB_CONFIG['mmap_size']}")
+    conn.execute(f"PRAGMA temp_store={DB_CONFIG['temp_store']}")
+    return conn
+
+
+class _WriteRequest:
+    """一次写请求，包含需要在同一事务中执行的若干 (sql, rows)"""
+    def __init__(self, ops):
+        self.ops = ops
+        self.error = None
+        self.done = threading.Event()
+
+
+class _DBWriter:
+    """
+    单写线程
+    从队列中取出待写请求，合并成一次事务提交（group commit），
+    读操作不经过这里，WAL模式下可以与写并发进行
+    写线程异常退出后，排队中和之后提交的请求都直接失败，不会一直等待
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.pid = os.getpid()
+        self._fatal = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"StockDBWriter-{db_path}", daemon=True)
+        self._thread.start()
+
+    @property
+    def alive(self):
+        """写线程属于当前进程且仍在运行（fork 出的子进程中继承的写线程并不存在）"""
+        return self.pid == os.getpid() and self._thread.is_alive()
+
+    def submit(self, ops):
+        """提交写请求并等待其提交完成，失败时抛出原始异常"""
+        if not self.alive:
+            raise self._dead_error()
+        request = _WriteRequest(ops)
+        self._queue.put(request)
+        while not request.done.wait(1):
+            if not self._thread.is_alive():
+                # 写线程在取走请求前退出
+                if not request.done.is_set():
+                    raise self._dead_error()
+        if request.error is not None:
+            raise request.error
+
+    def _dead_error(self):
+        error = sqlite3.OperationalError(f"数据库写线程已退出: {self.db_path}")
+        error.__cause__ = self._fatal
+        return error
+
+    def _run(self):
+        try:
+            self._serve()
+        except BaseException as e:
+            self._fatal = e
+            logger.error(f"❌ 数据库写线程异常退出 {self.db_path}: {e}")
+            # 让排队中的请求立即失败
+            while True:
+                try:
+                    request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                request.error = self._dead_error()
+                request.done.set()
+
+    def _serve(self):
+        conn = _connect(self.db_path)
+        conn.isolation_level = None  # 手动控制事务
+
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < DB_CONFIG['writer_batch_size']:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._commit(conn, batch)
+            except Exception:
+                # 合并提交失败时逐个重试，只让出错的请求失败
+                for request in batch:
+                    try:
+                        self._commit(conn, [request])
+                    except Exception as e:
+                        request.error = e
+
+            for request in batch:
+                request.done.set()
+
+    @staticmethod
+    def _commit(conn, batch):
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for request in batch:
+                for sql, rows in request.ops:
+                    conn.executemany(sql, rows)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+
+def _get_writer(db_path):
+    """取数据库的写线程，不存在、已退出或继承自父进程时重新创建"""
+    with _writers_lock:
+        writer = _writers.get(db_path)
+        if writer is None or not writer.alive:
+            if writer is not None and writer.pid == os.getpid():
+                logger.warning(f"⚠️ 数据库写线程已退出，重新创建: {db_path}")
+            writer = _writers[db_path] = _DBWriter(db_path)
+        return writer
+
+
+# fork 出的子进程中只有调用 fork 的线程存活：父进程的写线程不存在，锁可能停留在被持有的状态，
+# 继承来的 sqlite 连接也不能继续使用，子进程中清空这些状态，首次访问时重新创建
+_inherited_conns = []
+
+
+def _reset_after_fork():
+    global _thread_local, _writers_lock, _schema_lock
+    conns = getattr(_thread_local, 'conns', None)
+    if conns:
+        # 只丢弃不关闭，关闭父进程打开的连接可能影响父进程的文件锁和WAL
+        _inherited_conns.extend(conns.values())
+    _thread_local = threading.local()
+    _writers.clear()
+    _writers_lock = threading.Lock()
+    _schema_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# 列式存储按目录共享，复用已打开的内存映射 {root: StockColumnStore}
+_column_stores = {}
+
+
 class StockDB:
-    def __init__(self, db_path='stock_data.db'):
+    def __init__(self, db_path='stock_data.db', column_store=None):
+        """
+        参数:
+            db_path (str): SQLite数据库路径
+            column_store (str): 列式存储目录，默认取 DB_CONFIG['column_store']，为空则只使用SQLite
+        """
         self.db_path = db_path
-        self._init_daily_database()
-        self._init_min_database()
-        self._init_stock_code_db()
-        self._init_stock_predict_daily_db()
-        self._init_stock_realtime_daily_db()
+        column_store = column_store if column_store is not None else DB_CONFIG['column_store']
+        self._column_store = None
+        if column_store:
+            with _schema_lock:
+                self._column_store = _column_stores.setdefault(column_store, StockColumnStore(column_store))
+        with _schema_lock:
+            if db_path not in _schema_versions:
+                self._get_conn().execute(f"PRAGMA journal_mode={DB_CONFIG['journal_mode']}")
+                version = self._detect_bar_schema()
+                if version == BAR_SCHEMA_TEXT:
+                    self._init_daily_database()
+                    self._init_min_database()
+                else:
+                    self._init_bar_database()
+                self._init_stock_code_db()
+                self._init_stock_predict_daily_db()
+                self._init_stock_realtime_daily_db()
+                self._init_daily_coverage_db()
+                self._init_job_ledger_db()
+                _schema_versions[db_path] = version
+        self._bar_schema = _schema_versions[db_path]
+
+    def _get_conn(self):
+        """获取当前线程的数据库连接，不存在则创建"""
+        conns = getattr(_thread_local, 'conns', None)
+        if conns is None:
+            conns = _thread_local.conns = {}
+
+        conn = conns.get(self.db_path)
+        if conn is None:
+            conn = _connect(self.db_path)
+            conns[self.db_path] = conn
+        return conn
+
+    def _rollback(self):
+        """写入失败时回滚，避免复用的连接停留在未结束的事务中"""
+        try:
+            self._get_conn().rollback()
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        """关闭当前线程持有的连接（线程退出前调用）"""
+        conns = getattr(_thread_local, 'conns', None)
+        if conns and self.db_path in conns:
+            conns.pop(self.db_path).close()
     
+    def _detect_bar_schema(self):
+        """
+        判断K线表结构版本
+        已有旧表且未迁移的数据库继续使用文本结构，新建的数据库直接使用整数结构
+        """
+        conn = self._get_conn()
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= BAR_SCHEMA_INT:
+            return BAR_SCHEMA_INT
+
+        legacy = conn.execute('''
+            SELECT COUNT(*) FROM sqlite_master
+            WHERE type = 'table' AND name IN ('daily_kline', 'minute_kline')
+        ''').fetchone()[0]
+        return BAR_SCHEMA_TEXT if legacy else BAR_SCHEMA_INT
+
+    def _init_bar_database(self):
+        """初始化整数结构的日线/分钟线表"""
+        conn = self._get_conn()
+        for sql in BAR_SCHEMA_INT_SQL:
+            conn.execute(sql)
+        conn.execute(f'PRAGMA user_version = {BAR_SCHEMA_INT}')
+        conn.commit()
+
     def _init_daily_database(self):
         """初始化日线数据库"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_conn()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -33,11 +351,10 @@ class StockDB:
 
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_daily_stock_date ON daily_kline(stock_code, date)')
         conn.commit()
-        conn.close()
     
     def _init_min_database(self):
         """初始化统一分钟数据表"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_conn()
         cursor = conn.cursor()
         
         # 创建统一分钟K线数据表
@@ -58,11 +375,10 @@ class StockDB:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_minute_period ON minute_kline(period)')
         
         conn.commit()
-        conn.close()
 
     def _init_stock_code_db(self):
         """初始化股票代码数据库"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_conn()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -74,11 +390,10 @@ class StockDB:
         ''')
         
         conn.commit()
-        conn.close()
 
     def _init_stock_predict_daily_db(self):
         """初始化日线数据库"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_conn()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -95,11 +410,10 @@ class StockDB:
 
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_predict_daily_stock_date ON predict_daily_kline(stock_code, date)')
         conn.commit()
-        conn.close()
 
     def _init_stock_realtime_daily_db(self):
         """初始化日线数据库"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_conn()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -117,31 +431,110 @@ class StockDB:
 
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_predict_daily_stock_date ON predict_daily_kline(stock_code, date)')
         conn.commit()
-        conn.close()
     
-    def save_daily_data(self, stock_code, kline_data):
-        """保存日K线数据"""
+    def _init_daily_coverage_db(self):
+        """初始化日线覆盖区间表，记录每只股票已经从API下载过的日期区间"""
+        conn = self._get_conn()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS daily_coverage (
+                stock_code TEXT,
+                start_date DATE,
+                end_date DATE,
+                PRIMARY KEY (stock_code, start_date)
+            )
+        ''')
+        conn.commit()
+
+    def _init_job_ledger_db(self):
+        """初始化任务台账表，记录批量任务中每只股票各阶段的完成状态，任务中断后据此续跑"""
+        conn = self._get_conn()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS job_ledger (
+                job_id TEXT,
+                stock_code TEXT,
+                stage TEXT,
+                status TEXT,
+                finished_at TEXT,
+                PRIMARY KEY (job_id, stage, stock_code)
+            )
+        ''')
+        conn.commit()
+
+    def _write(self, ops):
+        """
+        在一个事务内执行若干 (sql, rows) 批量写入
+        开启写队列时交给写线程合并提交，否则直接在当前线程的连接上执行
+        """
+        if DB_CONFIG['writer_queue']:
+            _get_writer(self.db_path).submit(ops)
+            return
+
+        conn = self._get_conn()
+        with conn:
+            for sql, rows in ops:
+                conn.executemany(sql, rows)
+
+    def _executemany(self, sql, rows):
+        """在一个显式事务内批量写入"""
+        self._write([(sql, rows)])
+
+    @staticmethod
+    def _to_rows(columns):
+        """按列构造写入用的元组列表，tolist() 会把numpy标量转成sqlite可绑定的Python类型"""
+        values = [col.tolist() if hasattr(col, 'tolist') else col for col in columns]
+        return list(zip(*values))
+
+    def save_daily_data(self, stock_code, kline_data, replace=False, coverage=None):
+        """
+        保存日K线数据
+        replace=True 时在同一事务中先删除该股票已有的日线和覆盖区间（复权价格变化后全量刷新用）
+        coverage=(开始日期, 结束日期) 时在同一事务中记录覆盖区间，写入失败时覆盖区间也不会记录
+        """
         if kline_data.empty:
             return False
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            for _, row in kline_data.iterrows():
-                cursor.execute('''
+            count = len(kline_data)
+            amount = kline_data['amount'] if 'amount' in kline_data.columns else [0] * count
+            prices = [
+                kline_data['open'], kline_data['high'], kline_data['low'], kline_data['close'],
+                kline_data['volume'], amount
+            ]
+
+            if self._bar_schema == BAR_SCHEMA_INT:
+                rows = self._to_rows([[stock_code] * count, to_epoch_days(kline_data['date'])] + prices)
+                ops = [(_SQL_ADD_STOCK_ID, [(stock_code,)])]
+                if replace:
+                    ops.append((f'DELETE FROM daily_bar WHERE stock_id = {_SQL_STOCK_ID}', [(stock_code,)]))
+                ops.append((f'''
+                    INSERT OR REPLACE INTO daily_bar 
+                    VALUES ({_SQL_STOCK_ID}, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows))
+            else:
+                dates = pd.to_datetime(kline_data['date']).dt.strftime('%Y-%m-%d')
+                rows = self._to_rows([[stock_code] * count, dates] + prices)
+                ops = []
+                if replace:
+                    ops.append(('DELETE FROM daily_kline WHERE stock_code = ?', [(stock_code,)]))
+                ops.append(('''
                     INSERT OR REPLACE INTO daily_kline 
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    stock_code, row['date'].strftime('%Y-%m-%d'),
-                    row['open'], row['high'], row['low'], row['close'],
-                    row['volume'], row.get('amount', 0)
-                ))
-            
-            conn.commit()
-            conn.close()
+                ''', rows))
+
+            if replace:
+                ops.append(('DELETE FROM daily_coverage WHERE stock_code = ?', [(stock_code,)]))
+            if coverage is not None:
+                ops.append(self._coverage_op(stock_code, *coverage))
+            self._write(ops)
+            # 写入已提交，进程内缓存的数据帧失效
+            get_frame_cache().invalidate((self.db_path, stock_code, DAILY))
+
+            # 列式存储中的分区已过期，删除后读取回退到SQLite，等待下次同步
+            if self._column_store is not None:
+                self._column_store.drop_daily(stock_code)
             return True
         except Exception as e:
+            self._rollback()
             logger.error(f"保存数据失败: {e}")
             return False
     
@@ -153,41 +546,75 @@ class StockDB:
             return False
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            saved_count = 0
-            for _, row in kline_data.iterrows():
-                cursor.execute('''
+            count = len(kline_data)
+            prices = [
+                kline_data['open'], kline_data['high'], kline_data['low'], kline_data['close'],
+                kline_data['volume']
+            ]
+
+            if self._bar_schema == BAR_SCHEMA_INT:
+                rows = self._to_rows([[stock_code] * count, [int(period)] * count,
+                                      to_epoch_minutes(kline_data['datetime'])] + prices)
+                self._write([
+                    (_SQL_ADD_STOCK_ID, [(stock_code,)]),
+                    (f'''
+                        INSERT OR REPLACE INTO minute_bar 
+                        (stock_id, period, minute, open, high, low, close, volume)
+                        VALUES ({_SQL_STOCK_ID}, ?, ?, ?, ?, ?, ?, ?)
+                    ''', rows),
+                ])
+            else:
+                datetimes = pd.to_datetime(kline_data['datetime']).dt.strftime('%Y-%m-%d %H:%M:%S')
+                rows = self._to_rows([[stock_code] * count, [period] * count, datetimes] + prices)
+                self._executemany('''
                     INSERT OR REPLACE INTO minute_kline 
                     (stock_code, period, datetime, open, high, low, close, volume)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    stock_code, period,
-                    row['datetime'].strftime('%Y-%m-%d %H:%M:%S'),
-                    row['open'], row['high'], row['low'], row['close'],
-                    row['volume']
-                ))
-                saved_count += 1
-            
-            conn.commit()
-            conn.close()
+                ''', rows)
+
+            get_frame_cache().invalidate((self.db_path, stock_code, str(period)))
+            if self._column_store is not None:
+                self._column_store.drop_min(stock_code, period)
             return True
         except Exception as e:
+            self._rollback()
             logger.error(f"❌ 保存{period}分钟K线数据失败: {e}")
             return False
 
     def get_daily_data(self, stock_code, start_date, end_date):
-        """获取日K线数据"""
+        """获取日K线数据，已同步到列式存储的股票直接从内存映射读取"""
+        if self._column_store is not None:
+            try:
+                df = self._column_store.read_daily(stock_code, start_date, end_date)
+                if df is not None:
+                    return df
+            except Exception as e:
+                logger.error(f"❌ 从列式存储读取日K线失败，改用SQLite: {e}")
+
+        return self._sqlite_daily_data(stock_code, start_date, end_date)
+
+    def _sqlite_daily_data(self, stock_code, start_date, end_date):
+        """从SQLite获取日K线数据"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_conn()
+            if self._bar_schema == BAR_SCHEMA_INT:
+                query = '''
+                    SELECT s.stock_code, d.day AS date, d.open, d.high, d.low, d.close, d.volume, d.amount
+                    FROM daily_bar d JOIN stock_ids s ON d.stock_id = s.stock_id
+                    WHERE s.stock_code = ? AND d.day BETWEEN ? AND ?
+                    ORDER BY d.day
+                '''
+                df = pd.read_sql_query(query, conn, params=[stock_code, _epoch_day(start_date), _epoch_day(end_date)])
+                if not df.empty:
+                    df['date'] = pd.to_datetime(df['date'], unit='D')
+                return df
+
             query = '''
                 SELECT * FROM daily_kline 
                 WHERE stock_code = ? AND date BETWEEN ? AND ?
                 ORDER BY date
             '''
             df = pd.read_sql_query(query, conn, params=[stock_code, start_date, end_date])
-            conn.close()
             
             if not df.empty:
                 df['date'] = pd.to_datetime(df['date'])
@@ -197,15 +624,40 @@ class StockDB:
 
     def get_min_data(self, stock_code, period, start_datetime, end_datetime):
         """
-        从统一分钟表获取分钟K线数据
+        从统一分钟表获取分钟K线数据，已同步到列式存储的股票直接从内存映射读取
         """
         valid_periods = ['1', '5', '15', '30', '60']
         if period not in valid_periods:
             logger.error(f"❌ 不支持的周期: {period}")
             return pd.DataFrame()
 
+        if self._column_store is not None:
+            try:
+                df = self._column_store.read_min(stock_code, period, start_datetime, end_datetime)
+                if df is not None:
+                    return df
+            except Exception as e:
+                logger.error(f"❌ 从列式存储读取{period}分钟K线失败，改用SQLite: {e}")
+
+        return self._sqlite_min_data(stock_code, period, start_datetime, end_datetime)
+
+    def _sqlite_min_data(self, stock_code, period, start_datetime, end_datetime):
+        """从SQLite获取分钟K线数据"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_conn()
+            if self._bar_schema == BAR_SCHEMA_INT:
+                query = '''
+                    SELECT s.stock_code, m.minute AS datetime, m.open, m.high, m.low, m.close, m.volume
+                    FROM minute_bar m JOIN stock_ids s ON m.stock_id = s.stock_id
+                    WHERE s.stock_code = ? AND m.period = ? AND m.minute BETWEEN ? AND ?
+                    ORDER BY m.minute
+                '''
+                df = pd.read_sql_query(query, conn, params=[
+                    stock_code, int(period), _epoch_minute(start_datetime), _epoch_minute(end_datetime)
+                ])
+                if not df.empty:
+                    df['datetime'] = pd.to_datetime(df['datetime'], unit='m')
+                return df
             
             query = '''
                 SELECT stock_code, datetime, open, high, low, close, volume
@@ -214,7 +666,6 @@ class StockDB:
                 ORDER BY datetime
             '''
             df = pd.read_sql_query(query, conn, params=[stock_code, period, start_datetime, end_datetime])
-            conn.close()
             
             if not df.empty:
                 df['datetime'] = pd.to_datetime(df['datetime'])
@@ -224,32 +675,192 @@ class StockDB:
         except Exception as e:
             logger.error(f"❌ 获取{period}分钟K线数据失败: {e}")
             return pd.DataFrame()
+
+    def get_daily_stock_codes(self):
+        """获取日线表中有数据的股票代码"""
+        if self._bar_schema == BAR_SCHEMA_INT:
+            query = '''
+                SELECT stock_code FROM stock_ids s
+                WHERE EXISTS (SELECT 1 FROM daily_bar d WHERE d.stock_id = s.stock_id)
+                ORDER BY stock_code
+            '''
+            cursor = self._get_conn().execute(query)
+        else:
+            cursor = self._get_conn().execute('SELECT DISTINCT stock_code FROM daily_kline ORDER BY stock_code')
+        return [row[0] for row in cursor.fetchall()]
+
+    def get_min_stock_codes(self, period):
+        """获取分钟表中指定周期有数据的股票代码"""
+        if self._bar_schema == BAR_SCHEMA_INT:
+            query = '''
+                SELECT stock_code FROM stock_ids s
+                WHERE EXISTS (SELECT 1 FROM minute_bar m WHERE m.stock_id = s.stock_id AND m.period = ?)
+                ORDER BY stock_code
+            '''
+            cursor = self._get_conn().execute(query, (int(period),))
+        else:
+            cursor = self._get_conn().execute(
+                'SELECT DISTINCT stock_code FROM minute_kline WHERE period = ? ORDER BY stock_code', (period,))
+        return [row[0] for row in cursor.fetchall()]
         
     def get_latest_daily_date(self, stock_code):
         """获取日线最新数据日期"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_conn()
             cursor = conn.cursor()
+            if self._bar_schema == BAR_SCHEMA_INT:
+                cursor.execute('''
+                    SELECT MAX(d.day) FROM daily_bar d
+                    WHERE d.stock_id = (SELECT stock_id FROM stock_ids WHERE stock_code = ?)
+                ''', (stock_code,))
+                result = cursor.fetchone()
+                return _day_str(result[0]) if result[0] is not None else None
+
             cursor.execute('''
                 SELECT MAX(date) FROM daily_kline WHERE stock_code = ?
             ''', (stock_code,))
             result = cursor.fetchone()
-            conn.close()
             return result[0] if result[0] else None
         except:
             return None        
 
+    def get_daily_date_range(self, stock_code):
+        """获取日线已存储数据的 (最早日期, 最新日期)，没有数据返回 (None, None)"""
+        try:
+            conn = self._get_conn()
+            if self._bar_schema == BAR_SCHEMA_INT:
+                result = conn.execute('''
+                    SELECT MIN(d.day), MAX(d.day) FROM daily_bar d
+                    WHERE d.stock_id = (SELECT stock_id FROM stock_ids WHERE stock_code = ?)
+                ''', (stock_code,)).fetchone()
+                if result[0] is None:
+                    return None, None
+                return _day_str(result[0]), _day_str(result[1])
+
+            result = conn.execute('''
+                SELECT MIN(date), MAX(date) FROM daily_kline WHERE stock_code = ?
+            ''', (stock_code,)).fetchone()
+            return result[0], result[1]
+        except Exception as e:
+            logger.error(f"❌ 获取日线日期范围失败: {e}")
+            return None, None
+
+    def count_daily_data(self, stock_code, start_date, end_date):
+        """统计日期区间内已存储的日线条数"""
+        try:
+            conn = self._get_conn()
+            if self._bar_schema == BAR_SCHEMA_INT:
+                return conn.execute('''
+                    SELECT COUNT(*) FROM daily_bar d
+                    WHERE d.stock_id = (SELECT stock_id FROM stock_ids WHERE stock_code = ?) AND d.day BETWEEN ? AND ?
+                ''', (stock_code, _epoch_day(start_date), _epoch_day(end_date))).fetchone()[0]
+
+            return conn.execute('''
+                SELECT COUNT(*) FROM daily_kline WHERE stock_code = ? AND date BETWEEN ? AND ?
+            ''', (stock_code, start_date, end_date)).fetchone()[0]
+        except Exception as e:
+            logger.error(f"❌ 统计日线条数失败: {e}")
+            return 0
+
+    def get_daily_coverage(self, stock_code):
+        """获取已下载的日期区间列表 [(start_date, end_date), ...]，重叠或相邻的区间合并后按开始日期排序"""
+        try:
+            cursor = self._get_conn().execute('''
+                SELECT start_date, end_date FROM daily_coverage
+                WHERE stock_code = ? ORDER BY start_date
+            ''', (stock_code,))
+            spans = [tuple(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"❌ 获取日线覆盖区间失败: {e}")
+            return []
+
+        merged = []
+        for span_start, span_end in spans:
+            if merged:
+                prev_end = datetime.strptime(merged[-1][1], '%Y-%m-%d') + timedelta(days=1)
+                if span_start <= prev_end.strftime('%Y-%m-%d'):
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], span_end))
+                    continue
+            merged.append((span_start, span_end))
+        return merged
+
+    @staticmethod
+    def _coverage_op(stock_code, start_date, end_date):
+        """
+        记录覆盖区间的写操作：只插入不删除，读取时再合并，并发写入同一股票时不会互相覆盖；
+        开始日期相同时保留较晚的结束日期
+        """
+        return ('''
+            INSERT INTO daily_coverage (stock_code, start_date, end_date) VALUES (?, ?, ?)
+            ON CONFLICT (stock_code, start_date) DO UPDATE SET end_date = max(end_date, excluded.end_date)
+        ''', [(stock_code, start_date, end_date)])
+
+    def add_daily_coverage(self, stock_code, start_date, end_date):
+        """记录新下载的日期区间"""
+        try:
+            self._write([self._coverage_op(stock_code, start_date, end_date)])
+            return True
+        except Exception as e:
+            self._rollback()
+            logger.error(f"❌ 保存日线覆盖区间失败: {e}")
+            return False
+
+    def save_job_status(self, job_id, stage, stock_codes, status='done'):
+        """记录任务中若干股票某一阶段的状态（done/failed），finished_at 为当前时间"""
+        finished_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            self._executemany('''
+                INSERT OR REPLACE INTO job_ledger (job_id, stock_code, stage, status, finished_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(job_id, stock_code, stage, status, finished_at) for stock_code in stock_codes])
+            return True
+        except Exception as e:
+            self._rollback()
+            logger.error(f"❌ 保存任务台账失败: {e}")
+            return False
+
+    def get_job_status(self, job_id, stage):
+        """获取任务某一阶段已记录的 {stock_code: status}"""
+        try:
+            cursor = self._get_conn().execute('''
+                SELECT stock_code, status FROM job_ledger
+                WHERE job_id = ? AND stage = ?
+            ''', (job_id, stage))
+            return dict(cursor.fetchall())
+        except Exception as e:
+            logger.error(f"❌ 获取任务台账失败: {e}")
+            return {}
+
+    def prune_job_ledger(self, job_prefix, keep_job_id):
+        """删除以 job_prefix 开头、且不是 keep_job_id 的旧任务台账"""
+        try:
+            self._executemany('''
+                DELETE FROM job_ledger WHERE substr(job_id, 1, ?) = ? AND job_id != ?
+            ''', [(len(job_prefix), job_prefix, keep_job_id)])
+            return True
+        except Exception as e:
+            self._rollback()
+            logger.error(f"❌ 清理任务台账失败: {e}")
+            return False
+
     def get_latest_min_datetime(self, stock_code, period):
         """获取分钟线的最新数据时间"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_conn()
             cursor = conn.cursor()
+            if self._bar_schema == BAR_SCHEMA_INT:
+                cursor.execute('''
+                    SELECT MAX(m.minute) FROM minute_bar m
+                    WHERE m.stock_id = (SELECT stock_id FROM stock_ids WHERE stock_code = ?) AND m.period = ?
+                ''', (stock_code, int(period)))
+                result = cursor.fetchone()
+                return _minute_str(result[0]) if result[0] is not None else None
+
             cursor.execute('''
                 SELECT MAX(datetime) FROM minute_kline 
                 WHERE stock_code = ? AND period = ?
             ''', (stock_code, period))
             result = cursor.fetchone()
-            conn.close()
             return result[0] if result[0] else None
         except:
             return None
@@ -260,36 +871,29 @@ class StockDB:
             return False
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            saved_count = 0
-            for _, row in stockinfo.iterrows():
-                cursor.execute('''
-                    INSERT OR REPLACE INTO stock_codes 
-                    (stock_code, stock_name, stock_type)
-                    VALUES (?, ?, ?)
-                ''', (
-                    row['stock_code'], row['stock_name'], stock_type
-                ))
-                saved_count += 1
-            
-            conn.commit()
-            conn.close()
+            rows = self._to_rows([
+                stockinfo['stock_code'], stockinfo['stock_name'], [stock_type] * len(stockinfo)
+            ])
+
+            self._executemany('''
+                INSERT OR REPLACE INTO stock_codes 
+                (stock_code, stock_name, stock_type)
+                VALUES (?, ?, ?)
+            ''', rows)
             return True
         except Exception as e:
+            self._rollback()
             logger.error(f"❌ 保存保存股票数据失败: {e}")
             return False
 
     def get_stock_info(self):
         """获取股票数据库"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_conn()
             query = '''
                 SELECT * FROM stock_codes
             '''
             df = pd.read_sql_query(query, conn)
-            conn.close()
             return df
         except:
             return pd.DataFrame() 
@@ -297,34 +901,29 @@ class StockDB:
     def save_predict_daily_data(self, stock_code, predict_date, predict_data):
         """保存预测数据"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
+            self._executemany('''
                 INSERT OR REPLACE INTO predict_daily_kline 
                 (stock_code, date, open, high, low, close)
                 VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
+            ''', [(
                 stock_code, predict_date,
                 predict_data['open'], predict_data['high'], predict_data['low'], predict_data['close']
-            ))
-
-            conn.commit()
-            conn.close()
+            )])
             return True
         except Exception as e:
+            self._rollback()
             logger.error(f"❌ 保存股票预测数据失败: {e}")
             return False
         
     def get_predict_daily_data(self, stock_code, predict_date):
         """获取预测数据"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_conn()
             query = '''
                 SELECT * FROM predict_daily_kline 
                 WHERE stock_code = ? AND date = ?
             '''
             df = pd.read_sql_query(query, conn, params=[stock_code, predict_date])
-            conn.close()
             return df
         except:
             return pd.DataFrame() 
@@ -334,57 +933,44 @@ class StockDB:
         start_time = time.time()
         
         try:
-            import sqlite3
-            
             # 准备批量数据
-            data_tuples = []
-            for _, row in stock_data.iterrows():
-                data_tuples.append((
-                    row.get('stock_code'), date,
-                    row.get('open'), row.get('high'), 
-                    row.get('low'), row.get('close'), 
-                    row.get('volume')
-                ))
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            count = len(stock_data)
+            rows = self._to_rows([
+                stock_data['stock_code'], [date] * count,
+                stock_data['open'], stock_data['high'],
+                stock_data['low'], stock_data['close'],
+                stock_data['volume']
+            ])
             
             # 关键：使用事务和executemany
-            cursor.execute('BEGIN TRANSACTION')
-            cursor.executemany('''
+            self._executemany('''
                 INSERT OR REPLACE INTO realtime_daily_kline 
                 VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', data_tuples)
-            
-            conn.commit()
-            conn.close()
+            ''', rows)
             
             elapsed = time.time() - start_time
             return True
             
         except Exception as e:
             elapsed = time.time() - start_time
+            self._rollback()
             logger.error(f"❌  保存股票实时数据失败: {e}")
             return False
 
     def save_realtime_daily_date(self, stock_code, realtime_date, realtime_data):
         """保存实时数据"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
+            self._executemany('''
                 INSERT OR REPLACE INTO realtime_daily_kline 
                 (stock_code, date, open, high, low, close, volume)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            ''', [(
                 stock_code, realtime_date,
                 realtime_data['open'], realtime_data['high'], realtime_data['low'], realtime_data['close'], realtime_data['volume']
-            ))
-
-            conn.commit()
-            conn.close()
+            )])
             return True
         except Exception as e:
+            self._rollback()
             logger.error(f"❌ 保存股票实时数据失败: {e}")
             return False
 
@@ -392,13 +978,12 @@ class StockDB:
         """获取实时数据"""
         try:
             stock_code_prefix = StockTools().get_stock_code_with_prefix(stock_code)
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_conn()
             query = '''
                 SELECT * FROM realtime_daily_kline 
                 WHERE stock_code = ? AND date = ?
             '''
             df = pd.read_sql_query(query, conn, params=[stock_code_prefix, realtime_date])
-            conn.close()
             return df
         except:
             return pd.DataFrame() 
@@ -407,3 +992,114 @@ class StockDB:
 
             
             
+
+    def _fill_code_filter(self, conn, stock_codes, stored_codes=None):
+        """
+        把待查询的股票代码写入当前连接的临时表，供批量查询JOIN使用
+        stored_codes 为表中实际存储的代码（如实时表带市场前缀），默认与 stock_codes 相同
+        """
+        if stored_codes is None:
+            stored_codes = stock_codes
+
+        with conn:
+            conn.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS code_filter (
+                    stored_code TEXT PRIMARY KEY,
+                    stock_code TEXT
+                )
+            ''')
+            conn.execute('DELETE FROM temp.code_filter')
+            conn.executemany('INSERT OR IGNORE INTO temp.code_filter VALUES (?, ?)', zip(stored_codes, stock_codes))
+
+    @staticmethod
+    def _split_by_stock(df, stock_codes):
+        """长表按股票代码拆分成 {stock_code: DataFrame}，没有数据的股票对应空表"""
+        frames = {code: group.reset_index(drop=True) for code, group in df.groupby('stock_code', sort=False)}
+        return {code: frames.get(code, df.iloc[0:0]) for code in stock_codes}
+
+    def get_daily_data_many(self, stock_codes, start_date, end_date, as_dict=False):
+        """
+        批量获取多只股票的日K线数据
+
+        参数:
+            stock_codes (list): 股票代码列表
+            start_date (str): 开始日期 "YYYY-MM-DD"
+            end_date (str): 结束日期 "YYYY-MM-DD"
+            as_dict (bool): True返回 {stock_code: DataFrame}，否则返回按 (stock_code, date) 排序的长表
+        """
+        stock_codes = list(stock_codes)
+        try:
+            conn = self._get_conn()
+            self._fill_code_filter(conn, stock_codes)
+            if self._bar_schema == BAR_SCHEMA_INT:
+                query = '''
+                    SELECT s.stock_code, d.day AS date, d.open, d.high, d.low, d.close, d.volume, d.amount
+                    FROM temp.code_filter f
+                    JOIN stock_ids s ON s.stock_code = f.stored_code
+                    JOIN daily_bar d ON d.stock_id = s.stock_id
+                    WHERE d.day BETWEEN ? AND ?
+                    ORDER BY s.stock_code, d.day
+                '''
+                df = pd.read_sql_query(query, conn, params=[_epoch_day(start_date), _epoch_day(end_date)])
+                df['date'] = pd.to_datetime(df['date'], unit='D')
+            else:
+                query = '''
+                    SELECT d.* FROM daily_kline d
+                    JOIN temp.code_filter f ON d.stock_code = f.stored_code
+                    WHERE d.date BETWEEN ? AND ?
+                    ORDER BY d.stock_code, d.date
+                '''
+                df = pd.read_sql_query(query, conn, params=[start_date, end_date])
+                df['date'] = pd.to_datetime(df['date'])
+        except Exception as e:
+            logger.error(f"❌ 批量获取日K线数据失败: {e}")
+            df = pd.DataFrame(columns=['stock_code', 'date', 'open', 'high', 'low', 'close', 'volume', 'amount'])
+
+        return self._split_by_stock(df, stock_codes) if as_dict else df
+
+    def get_predict_daily_data_many(self, stock_codes, start_date, end_date=None, as_dict=False):
+        """
+        批量获取多只股票的预测数据，end_date 为空时只查询 start_date 当天
+        """
+        stock_codes = list(stock_codes)
+        end_date = end_date or start_date
+        try:
+            conn = self._get_conn()
+            self._fill_code_filter(conn, stock_codes)
+            query = '''
+                SELECT p.* FROM predict_daily_kline p
+                JOIN temp.code_filter f ON p.stock_code = f.stored_code
+                WHERE p.date BETWEEN ? AND ?
+                ORDER BY p.stock_code, p.date
+            '''
+            df = pd.read_sql_query(query, conn, params=[start_date, end_date])
+        except Exception as e:
+            logger.error(f"❌ 批量获取预测数据失败: {e}")
+            df = pd.DataFrame(columns=['stock_code', 'date', 'open', 'high', 'low', 'close'])
+
+        return self._split_by_stock(df, stock_codes) if as_dict else df
+
+    def get_realtime_daily_data_many(self, stock_codes, start_date, end_date=None, as_dict=False):
+        """
+        批量获取多只股票的实时数据，end_date 为空时只查询 start_date 当天
+        实时表中的代码带市场前缀，返回结果中的 stock_code 统一为传入的代码
+        """
+        stock_codes = list(stock_codes)
+        end_date = end_date or start_date
+        tools = StockTools()
+        try:
+            conn = self._get_conn()
+            self._fill_code_filter(conn, stock_codes, [tools.get_stock_code_with_prefix(code) for code in stock_codes])
+            query = '''
+                SELECT f.stock_code, r.date, r.open, r.high, r.low, r.close, r.volume
+                FROM realtime_daily_kline r
+                JOIN temp.code_filter f ON r.stock_code = f.stored_code
+                WHERE r.date BETWEEN ? AND ?
+                ORDER BY f.stock_code, r.date
+            '''
+            df = pd.read_sql_query(query, conn, params=[start_date, end_date])
+        except Exception as e:
+            logger.error(f"❌ 批量获取实时数据失败: {e}")
+            df = pd.DataFrame(columns=['stock_code', 'date', 'open', 'high', 'low', 'close', 'volume'])
+
+        return self._split_by_stock(df, stock_codes) if as_dict else df
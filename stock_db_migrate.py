@@ -0,0 +1,113 @@
+# stock_db_migrate.py
+"""
+K线表结构迁移工具
+
+把旧的 daily_kline / minute_kline（文本代码 + 文本时间）迁移到
+daily_bar / minute_bar（整数股票id + 整数epoch时间，WITHOUT ROWID），
+迁移完成后删除旧表及其索引，并设置 PRAGMA user_version = 2。
+
+迁移前请停止 webserver、准备任务与回测等所有访问数据库的进程，并备份数据库文件。
+
+用法:
+    python stock_db_migrate.py [--db stock_data.db] [--no-vacuum]
+"""
+import os
+import sqlite3
+import argparse
+import time
+import logging
+
+from stock_db import BAR_SCHEMA_INT, BAR_SCHEMA_INT_SQL
+
+logger = logging.getLogger(__name__)
+
+
+def _table_exists(conn, name):
+    return conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone()[0] > 0
+
+
+def migrate_bar_schema(db_path, vacuum=True):
+    """
+    执行迁移
+
+    返回:
+        dict: 迁移的日线/分钟线行数，以及迁移前后的文件大小
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= BAR_SCHEMA_INT:
+            logger.info("数据库已经是整数K线结构，无需迁移")
+            return None
+
+        # 先把WAL中的内容写回主文件，迁移前后的文件大小才有可比性
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        size_before = os.path.getsize(db_path)
+        has_daily = _table_exists(conn, 'daily_kline')
+        has_min = _table_exists(conn, 'minute_kline')
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for sql in BAR_SCHEMA_INT_SQL:
+                conn.execute(sql)
+
+            daily_rows = 0
+            if has_daily:
+                conn.execute('INSERT OR IGNORE INTO stock_ids (stock_code) SELECT DISTINCT stock_code FROM daily_kline')
+                daily_rows = conn.execute('''
+                    INSERT OR REPLACE INTO daily_bar
+                    SELECT s.stock_id, CAST(strftime('%s', d.date) AS INTEGER) / 86400,
+                           d.open, d.high, d.low, d.close, d.volume, d.amount
+                    FROM daily_kline d JOIN stock_ids s ON d.stock_code = s.stock_code
+                ''').rowcount
+                conn.execute('DROP TABLE daily_kline')
+
+            min_rows = 0
+            if has_min:
+                conn.execute('INSERT OR IGNORE INTO stock_ids (stock_code) SELECT DISTINCT stock_code FROM minute_kline')
+                min_rows = conn.execute('''
+                    INSERT OR REPLACE INTO minute_bar
+                    SELECT s.stock_id, CAST(m.period AS INTEGER), CAST(strftime('%s', m.datetime) AS INTEGER) / 60,
+                           m.open, m.high, m.low, m.close, m.volume
+                    FROM minute_kline m JOIN stock_ids s ON m.stock_code = s.stock_code
+                ''').rowcount
+                conn.execute('DROP TABLE minute_kline')
+
+            conn.execute(f'PRAGMA user_version = {BAR_SCHEMA_INT}')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        if vacuum:
+            conn.execute('VACUUM')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+        return {
+            'daily_rows': daily_rows,
+            'min_rows': min_rows,
+            'size_before': size_before,
+            'size_after': os.path.getsize(db_path),
+        }
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
+    parser = argparse.ArgumentParser(description='迁移K线表到整数时间结构')
+    parser.add_argument('--db', default='stock_data.db')
+    parser.add_argument('--no-vacuum', action='store_true', help='迁移后不执行VACUUM')
+    args = parser.parse_args()
+
+    start = time.time()
+    result = migrate_bar_schema(args.db, vacuum=not args.no_vacuum)
+    if result:
+        logger.info(f"✅ 迁移完成，日线 {result['daily_rows']} 行，分钟线 {result['min_rows']} 行，耗时 {time.time() - start:.1f}s")
+        logger.info(f"文件大小 {result['size_before'] / 1024 / 1024:.1f}MB -> {result['size_after'] / 1024 / 1024:.1f}MB")
@@ -0,0 +1,136 @@
+# stock_frame_cache.py
+"""
+进程内K线数据帧缓存
+
+StockDataFetcher 读取日K/分钟K线时，按 (数据库, 股票代码, 周期) 缓存一段已确认完整的K线数据帧，
+之后落在该区间内的查询直接从缓存的数据帧切片返回，不再检查覆盖区间/最新时间，也不再读数据库。
+
+- 总大小按 DataFrame.memory_usage(deep=True) 统计，超过上限时按最近最少使用淘汰
+- StockDB.save_daily_data / save_min_data 写入后使对应条目失效；每个键有版本号，
+  写入前开始、写入后才放入的读取结果会被丢弃，不会把旧数据重新放回缓存
+- 命中、未命中、淘汰、失效次数通过 get_frame_cache_stats() 查看
+
+环境变量:
+    STOCK_FRAME_CACHE_BYTES  缓存上限字节数，默认 128MB，0 表示不缓存
+"""
+import os
+import threading
+from collections import OrderedDict
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+DAILY = 'daily'
+
+
+class FrameCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        # {(数据库, 股票代码, 周期): (开始, 结束, 数据帧, 字节数)}，开始/结束为日期或时间字符串，按访问顺序排列
+        self._entries = OrderedDict()
+        # {(数据库, 股票代码, 周期): 版本号}，每次失效加1
+        self._versions = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def version(self, key):
+        with self._lock:
+            return self._versions.get(key, 0)
+
+    def get(self, key, start, end, time_column):
+        """
+        返回 [start, end] 区间的数据帧副本，缓存条目不完整覆盖该区间时返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not (entry[0] <= start and end <= entry[1]):
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            frame = entry[2]
+
+        if frame.empty:
+            return frame.copy()
+        times = frame[time_column]
+        lo = times.searchsorted(pd.Timestamp(start), side='left')
+        hi = times.searchsorted(pd.Timestamp(end), side='right')
+        return frame.iloc[lo:hi].reset_index(drop=True).copy()
+
+    def bounds(self, key):
+        """缓存条目的 (开始, 结束)，没有条目时为 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return (entry[0], entry[1]) if entry is not None else None
+
+    def put(self, key, start, end, frame, version):
+        """
+        缓存 [start, end] 区间的完整数据帧；version 为读取数据库之前取得的版本号，期间发生过写入则不缓存
+        """
+        if self.max_bytes <= 0:
+            return
+        size = int(frame.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if self._versions.get(key, 0) != version:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[3]
+            self._entries[key] = (start, end, frame, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[3]
+                self._stats['evictions'] += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[3]
+                self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            for key in self._entries:
+                self._versions[key] = self._versions.get(key, 0) + 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes})
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            for name in self._stats:
+                self._stats[name] = 0
+
+
+_frame_cache = FrameCache(int(os.environ.get('STOCK_FRAME_CACHE_BYTES', 128 * 1024 * 1024)))
+
+
+def get_frame_cache():
+    """进程内共享的K线数据帧缓存"""
+    return _frame_cache
+
+
+def get_frame_cache_stats():
+    """
+    缓存统计: hits、misses、hit_rate、evictions、invalidations、entries、bytes、max_bytes
+    """
+    return _frame_cache.stats()
+
+
+def reset_frame_cache_stats():
+    _frame_cache.reset_stats()
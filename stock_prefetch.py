@@ -0,0 +1,105 @@
+# stock_prefetch.py
+"""
+股票K线并发预取
+
+用有界线程池并发执行每只股票的日线/5分钟/15分钟K线下载，
+请求速率由 stock_rate_limit 中各上游的令牌桶控制，线程数只决定同时在途的请求数。
+单只股票失败时按指数退避重试，不影响其它股票。
+
+环境变量:
+    STOCK_PREFETCH_WORKERS  线程数，默认 8
+    STOCK_PREFETCH_RETRIES  失败重试次数，默认 3
+    STOCK_PREFETCH_BACKOFF  首次重试前等待秒数，之后每次翻倍，默认 1
+"""
+import os
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from stock_data_fetcher import StockDataFetcher
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StockPrefetcher:
+    def __init__(self, max_workers=None, retries=None, backoff=None):
+        self.max_workers = max_workers or int(os.environ.get('STOCK_PREFETCH_WORKERS', 8))
+        self.retries = retries if retries is not None else int(os.environ.get('STOCK_PREFETCH_RETRIES', 3))
+        self.backoff = backoff if backoff is not None else float(os.environ.get('STOCK_PREFETCH_BACKOFF', 1))
+        self._fetcher = StockDataFetcher()
+
+    def _run_with_retry(self, stock_code, task, should_stop):
+        for attempt in range(self.retries + 1):
+            if should_stop and should_stop():
+                return False
+            try:
+                task(stock_code)
+                return True
+            except Exception as e:
+                if attempt == self.retries:
+                    logger.error(f"❌ {stock_code} 预取失败，已重试{self.retries}次: {e}")
+                    return False
+                # 指数退避，加随机抖动避免多只股票同时重试
+                delay = self.backoff * (2 ** attempt)
+                delay += random.uniform(0, delay / 2)
+                logger.warning(f"⚠️ {stock_code} 预取失败，{delay:.1f}秒后第{attempt + 1}次重试: {e}")
+                time.sleep(delay)
+        return False
+
+    def run(self, stock_codes, task, on_done=None, should_stop=None):
+        """
+        并发对每只股票执行 task(stock_code)，task 抛出异常视为失败并重试
+
+        参数:
+            stock_codes: 股票代码列表
+            task: 单只股票的下载函数
+            on_done: 每只股票完成后在调用线程中回调 on_done(stock_code, success)
+            should_stop: 返回True时不再开始新的下载，用于中断
+
+        返回:
+            dict: {stock_code: 是否成功}，中断时未执行的股票不在结果中
+        """
+        results = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='prefetch')
+        try:
+            futures = {
+                executor.submit(self._run_with_retry, stock_code, task, should_stop): stock_code
+                for stock_code in stock_codes
+            }
+            for future in as_completed(futures):
+                stock_code = futures[future]
+                results[stock_code] = future.result()
+                if on_done:
+                    on_done(stock_code, results[stock_code])
+                if should_stop and should_stop():
+                    break
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        return results
+
+    def prefetch(self, stock_codes, start_date, end_date, daily=True, min_periods=(), on_done=None, should_stop=None):
+        """
+        预取K线数据到数据库
+
+        参数:
+            stock_codes: 股票代码列表
+            start_date/end_date: 日期范围 "YYYY-MM-DD"
+            daily: 是否下载日K线
+            min_periods: 需要下载的分钟K线周期，如 ('5', '15')
+
+        返回:
+            dict: {stock_code: 是否成功}
+        """
+        def task(stock_code):
+            if daily:
+                self._fetcher.get_daily_kline(stock_code, start_date, end_date, raise_errors=True)
+            for period in min_periods:
+                self._fetcher.get_min_kline(stock_code, period, start_date, end_date, raise_errors=True)
+
+        start = time.time()
+        results = self.run(stock_codes, task, on_done=on_done, should_stop=should_stop)
+        failed = [code for code, success in results.items() if not success]
+        logger.info(f"预取完成: {len(results) - len(failed)}/{len(stock_codes)} 只股票成功，耗时 {time.time() - start:.1f}s")
+        if failed:
+            logger.error(f"❌ 预取失败的股票: {failed}")
+        return results
@@ -0,0 +1,80 @@
+# stock_rate_limit.py
+"""
+上游数据接口限流
+
+每个上游（新浪、中证指数）一个令牌桶，进程内所有线程共享：
+    rate  每秒补充的令牌数，即长期平均请求速率上限
+    burst 桶容量，允许短时间内连续发出的请求数
+
+令牌不足时调用方只等待到下一个令牌可用为止，不再在每次请求后固定 sleep。
+
+环境变量（name 为上游名的大写，如 SINA、CSINDEX）:
+    STOCK_API_RATE_{name}   默认 0.5，相当于原来每次请求后 sleep 2 秒
+    STOCK_API_BURST_{name}  默认 1
+"""
+import os
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 各上游的默认限流参数 {上游名: (每秒请求数, 桶容量)}
+DEFAULT_RATE_LIMITS = {
+    'sina': (0.5, 1),
+    'csindex': (0.5, 1),
+}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=1):
+        if rate <= 0:
+            raise ValueError(f"rate 必须大于0: {rate}")
+        self.rate = float(rate)
+        self.burst = max(float(burst), 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        取出令牌，令牌不足时阻塞到可用为止
+
+        先在锁内预订令牌（令牌数可以为负），再在锁外等待，
+        多个线程同时等待时按预订顺序依次放行，不会互相抢占
+
+        返回:
+            float: 实际等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+def get_limiter(name):
+    """获取上游 name 的共享令牌桶，首次使用时按环境变量创建"""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            rate, burst = DEFAULT_RATE_LIMITS.get(name, (0.5, 1))
+            rate = float(os.environ.get(f'STOCK_API_RATE_{name.upper()}', rate))
+            burst = float(os.environ.get(f'STOCK_API_BURST_{name.upper()}', burst))
+            limiter = TokenBucket(rate, burst)
+            _limiters[name] = limiter
+        return limiter
+
+
+def configure_limiter(name, rate, burst=1):
+    """替换上游 name 的令牌桶，用于在运行时调整限流参数"""
+    with _limiters_lock:
+        _limiters[name] = TokenBucket(rate, burst)
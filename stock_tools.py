@@ -1,13 +1,61 @@
 # stock_tools.py
+import threading
+import numpy as np
 import chinese_calendar as calendar
-from datetime import datetime, timedelta
+from datetime import date, datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 进程内共享的交易日历，首次使用时构建一次
+_calendar_lock = threading.Lock()
+_trading_days = None      # 升序的交易日数组 datetime64[D]
+_trading_ordinals = None  # {date: 在 _trading_days 中的序号}
+
+
+def _build_trading_calendar():
+    """
+    按 chinese_calendar 支持的年份范围生成全部交易日（工作日且非周末）
+    超出范围的日期 chinese_calendar 无法判断，视为非交易日
+    """
+    first_day = date(min(calendar.holidays).year, 1, 1)
+    last_day = date(max(calendar.holidays).year, 12, 31)
+    days = np.arange(np.datetime64(first_day, 'D'), np.datetime64(last_day, 'D') + 1)
+
+    # 1970-01-01 是星期四
+    weekdays = (days.astype(np.int64) + 3) % 7
+    is_trading = weekdays < 5
+    # 法定节假日不交易；调休的周末上班日不是交易日，已被周末条件排除
+    holidays = np.array(sorted(calendar.holidays), dtype='datetime64[D]')
+    is_trading &= ~np.isin(days, holidays)
+
+    trading_days = days[is_trading]
+    trading_days.flags.writeable = False
+    ordinals = {day: i for i, day in enumerate(trading_days.astype(date))}
+    return trading_days, ordinals
+
+
+def get_trading_calendar():
+    """获取进程内共享的交易日历 (交易日数组, {date: 序号})"""
+    global _trading_days, _trading_ordinals
+    if _trading_days is None:
+        with _calendar_lock:
+            if _trading_days is None:
+                _trading_days, _trading_ordinals = _build_trading_calendar()
+    return _trading_days, _trading_ordinals
+
+
+def _to_date(value):
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
 class StockTools:
     def __init__(self):
-        self._trading_day_cache = {}
+        pass
     
     def get_trading_day(self, date, delta=1):
         """
@@ -24,45 +72,23 @@ class StockTools:
         - 目标交易日的日期字符串 (格式: 'YYYY-MM-DD') 或 None
         """
         try:
-            # 转换日期格式
-            if isinstance(date, str):
-                date_obj = datetime.strptime(date, '%Y-%m-%d')
+            day = _to_date(date)
+            trading_days, ordinals = get_trading_calendar()
+
+            index = ordinals.get(day)
+            if index is None:
+                # 不是交易日：先定位到其后的第一个交易日，它就是向后的第1个交易日
+                index = int(np.searchsorted(trading_days, np.datetime64(day, 'D')))
+                index += delta - 1 if delta > 0 else delta
             else:
-                date_obj = date
-            
-            # delta=0 的特殊处理
-            if delta == 0:
-                # 检查当前日期是否是交易日
-                if self.is_trading_day(date_obj):
-                    return date_obj.strftime('%Y-%m-%d')
-                else:
-                    # 不是交易日，则获取下一个交易日
-                    delta = 1
-            
-            current = date_obj
-            found_count = 0
-            step = 1 if delta > 0 else -1
-            target_count = abs(delta)
-            
-            # 设置最大搜索天数
-            max_days = 365  # 最大搜索365天，避免无限循环
-            
-            for i in range(max_days):
-                # 移动到下一天（或前一天）
-                current += timedelta(days=step)
-                
-                # 检查是否是交易日
-                if self.is_trading_day(current):
-                    found_count += 1
-                    
-                    # 找到目标交易日
-                    if found_count == target_count:
-                        return current.strftime('%Y-%m-%d')
-            
-            # 如果循环结束还没找到
-            direction = "未来" if delta > 0 else "过去"
-            logger.error(f"警告: 在{max_days}天内未找到{direction}的第{target_count}个交易日")
-            return None
+                index += delta
+
+            if index < 0 or index >= len(trading_days):
+                direction = "未来" if delta > 0 else "过去"
+                logger.error(f"警告: 交易日历中找不到{day}{direction}的第{abs(delta)}个交易日")
+                return None
+
+            return str(trading_days[index])
             
         except Exception as e:
             logger.error(f"获取下第{delta}个交易日失败: {e}")
@@ -73,24 +99,22 @@ class StockTools:
         判断是否为交易日
         """
         try:
-            if isinstance(date, str):
-                date_obj = datetime.strptime(date, '%Y-%m-%d')
-            else:
-                date_obj = date
-
-            cache_key = date_obj.strftime("%Y-%m-%d")
-            if cache_key in self._trading_day_cache:
-                return self._trading_day_cache[cache_key]
-            
-            is_trading_day = calendar.is_workday(date_obj) and date_obj.weekday() < 5
-
-            self._trading_day_cache[cache_key] = is_trading_day
-
-            return is_trading_day
-            
+            return _to_date(date) in get_trading_calendar()[1]
         except Exception as e:
             logger.error(f"判断交易日失败: {e}")
             return False
+
+    def trading_days_between(self, start_date, end_date):
+        """
+        获取 [start_date, end_date] 闭区间内的全部交易日
+
+        返回:
+        - 升序的交易日数组 (numpy datetime64[D])，是共享日历的只读切片
+        """
+        trading_days = get_trading_calendar()[0]
+        lo = np.searchsorted(trading_days, np.datetime64(_to_date(start_date), 'D'), side='left')
+        hi = np.searchsorted(trading_days, np.datetime64(_to_date(end_date), 'D'), side='right')
+        return trading_days[lo:hi]
     
     def get_stock_code_with_prefix(self, stock_code: str) -> str:
         """
@@ -0,0 +1,121 @@
+"""
+DeepSeek 接口本地桩
+
+实现 /v1/chat/completions（非流式），用于在没有接口密钥或不想消耗token的环境中联调回测和压测缓存。
+应答是一条合法的交易决策JSON：从提示词中解析股票代码、当前时间和15分钟K线CSV最后一根的收盘价，
+按提示词哈希确定地选择 buy/sell/none（以收盘价上下浮动0.2%挂单100股），同一提示词得到的应答相同。
+usage 按提示词长度估算，不代表真实计费。
+
+每个请求固定延迟 --latency 秒，模拟大模型的生成耗时。
+
+用法:
+    python stubs/deepseek_stub_server.py [--port 6040] [--latency 1.0]
+    export DEEPSEEK_API_URL=http://127.0.0.1:6040/v1/chat/completions
+    export DEEPSEEK_API_KEY=stub
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# PromptGenerator 渲染的15分钟K线CSV行: datetime,open,high,low,close,volume
+_MIN15_ROW = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2},[\d.]+,[\d.]+,[\d.]+,([\d.]+),\d+$', re.MULTILINE)
+
+
+def fake_decision(prompt):
+    """与 PromptGenerator 的提示词格式对应：'代码xxxxxx'、'当前时间是YYYY-mm-dd HH:MM:SS' 和15分钟K线CSV"""
+    code = re.search(r'代码(\d{6})', prompt)
+    cur_time = re.search(r'当前时间是(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})', prompt)
+    digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+    closes = _MIN15_ROW.findall(prompt)
+    action = ('none', 'buy', 'sell')[int(digest, 16) % 3] if closes else 'none'
+    close = float(closes[-1]) if closes else 0
+    price = {'buy': round(close * 1.002, 2), 'sell': round(close * 0.998, 2)}.get(action, 0)
+    return {
+        'datetime': cur_time.group(1) if cur_time else '1970-01-01 00:00:00',
+        'action': action,
+        'stock_code': code.group(1) if code else '',
+        'price': price,
+        'quantity': 100 if action != 'none' else 0,
+        'reason': f'桩服务应答 {digest}',
+        'stop_loss': round(close * 0.97, 2) if action == 'buy' else None,
+        'take_profit': round(close * 1.05, 2) if action == 'buy' else None,
+    }
+
+
+class DeepSeekStubHandler(BaseHTTPRequestHandler):
+    server_version = 'DeepSeekStub/1.0'
+    protocol_version = 'HTTP/1.1'
+    # 响应头和响应体分两次写出，不关闭 Nagle 时长连接上每个请求会多等一个延迟确认（约40ms）
+    disable_nagle_algorithm = True
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+
+        with self.server.stats_lock:
+            self.server.stats['requests'] += 1
+
+        if self.path != '/v1/chat/completions':
+            self._send_json(404, {'detail': 'Not Found'})
+            return
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            self._send_json(401, {'error': {'message': 'missing api key'}})
+            return
+
+        time.sleep(self.server.options.latency)
+        prompt = ''.join(message.get('content', '') for message in payload.get('messages', []))
+        content = json.dumps(fake_decision(prompt), ensure_ascii=False)
+        # 粗略按每2个字符1个token估算
+        prompt_tokens = len(prompt) // 2
+        completion_tokens = len(content) // 2
+        with self.server.stats_lock:
+            self.server.stats['total_tokens'] += prompt_tokens + completion_tokens
+
+        self._send_json(200, {
+            'id': 'stub-' + hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16],
+            'object': 'chat.completion',
+            'model': payload.get('model', 'deepseek-chat'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        })
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host='127.0.0.1', port=6040, latency=1.0):
+    server = ThreadingHTTPServer((host, port), DeepSeekStubHandler)
+    server.daemon_threads = True
+    server.options = argparse.Namespace(latency=latency)
+    server.stats = {'requests': 0, 'total_tokens': 0}
+    server.stats_lock = threading.Lock()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DeepSeek 接口本地桩')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6040)
+    parser.add_argument('--latency', type=float, default=1.0, help='每个请求的固定延迟（秒）')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency)
+    print(f"DeepSeek stub listening on http://{args.host}:{args.port}/v1/chat/completions")
+    server.serve_forever()
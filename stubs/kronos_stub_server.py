@@ -0,0 +1,120 @@
+"""
+Kronos 预测服务本地桩
+
+实现与真实服务相同的 /predict 和 /predict_batch 接口，用于在没有模型服务的环境中联调和压测。
+预测结果为最后一根K线收盘价加随机扰动，不代表任何模型输出。
+请求带 "num_samples": n 时该请求返回 n 个预测（--no-samples 时忽略该字段，只返回一个）。
+同时接受逐行的 "data" 和列式的 "columns" 请求体（见 kline_payload.py）。
+
+延迟模型：每个HTTP请求固定 --latency 秒（模拟网络往返和调度，可并发），
+每条预测（每个采样）再加 --item-cost 秒（模拟推理），推理部分最多 --max-inflight 个请求同时进行，模拟单卡GPU串行推理。
+
+用法:
+    python stubs/kronos_stub_server.py [--port 6030] [--latency 0.05] [--item-cost 0.002] [--no-batch]
+    export KRONOS_PREDICT_URL=http://127.0.0.1:6030/predict
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_prediction(data, predict_len):
+    """以最后一根K线为基准生成 predict_len 根预测K线"""
+    last = data[-1]
+    last_time = datetime.strptime(last['timestamps'], '%Y-%m-%d %H:%M:%S')
+    close = float(last['close'])
+    prediction = []
+    for i in range(predict_len):
+        open_price = close
+        close = round(open_price * (1 + random.gauss(0, 0.01)), 4)
+        prediction.append({
+            'timestamps': (last_time + timedelta(days=i + 1)).strftime('%Y-%m-%d %H:%M:%S'),
+            'open': open_price,
+            'high': round(max(open_price, close) * 1.005, 4),
+            'low': round(min(open_price, close) * 0.995, 4),
+            'close': close,
+            'volume': float(last['volume']),
+        })
+    return prediction
+
+
+class KronosStubHandler(BaseHTTPRequestHandler):
+    server_version = 'KronosStub/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _predict(self, item):
+        if 'columns' in item:
+            keys = list(item['columns'])
+            data = [dict(zip(keys, values)) for values in zip(*(item['columns'][key] for key in keys))]
+        else:
+            data = item['data']
+        if self.server.options.no_samples or 'num_samples' not in item:
+            return fake_prediction(data, item.get('predict_len', 1))
+        return [fake_prediction(data, item.get('predict_len', 1)) for _ in range(item['num_samples'])]
+
+    def _run(self, items):
+        options = self.server.options
+        time.sleep(options.latency)
+        with self.server.inflight:
+            samples = sum(1 if options.no_samples else item.get('num_samples', 1) for item in items)
+            time.sleep(options.item_cost * samples)
+        with self.server.stats_lock:
+            self.server.stats['items'] += len(items)
+        return [self._predict(item) for item in items]
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+
+        with self.server.stats_lock:
+            self.server.stats['requests'] += 1
+
+        if self.path == '/predict':
+            self._send_json(200, {'prediction': self._run([payload])[0]})
+        elif self.path == '/predict_batch' and not self.server.options.no_batch:
+            self._send_json(200, {'predictions': self._run(payload['requests'])})
+        else:
+            self._send_json(404, {'detail': 'Not Found'})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host='127.0.0.1', port=6030, latency=0.05, item_cost=0.002, max_inflight=1, no_batch=False,
+                no_samples=False):
+    server = ThreadingHTTPServer((host, port), KronosStubHandler)
+    server.daemon_threads = True
+    server.options = argparse.Namespace(latency=latency, item_cost=item_cost, no_batch=no_batch, no_samples=no_samples)
+    server.inflight = threading.BoundedSemaphore(max_inflight)
+    server.stats = {'requests': 0, 'items': 0}
+    server.stats_lock = threading.Lock()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Kronos 预测服务本地桩')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6030)
+    parser.add_argument('--latency', type=float, default=0.05, help='每个HTTP请求的固定延迟（秒）')
+    parser.add_argument('--item-cost', type=float, default=0.002, help='每条预测的推理耗时（秒）')
+    parser.add_argument('--max-inflight', type=int, default=1, help='同时处理的请求数')
+    parser.add_argument('--no-batch', action='store_true', help='不提供 /predict_batch，测试客户端退化逻辑')
+    parser.add_argument('--no-samples', action='store_true', help='忽略 num_samples，测试客户端退化逻辑')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.item_cost, args.max_inflight, args.no_batch,
+                         args.no_samples)
+    print(f"Kronos stub listening on http://{args.host}:{args.port}/predict")
+    server.serve_forever()
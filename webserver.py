@@ -1,5 +1,6 @@
 import os
 import asyncio
+import json
 import matplotlib
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse, FileResponse
@@ -9,12 +10,13 @@ from datetime import datetime, timedelta
 import pandas as pd
 import requests
 import sys
-import time
-import threading
 import concurrent.futures
 from typing import Optional
 import logging
 from stock_tools import StockTools
+from kronos_client import KRONOS_PREDICT_URL
+from kline_payload import frame_to_bars, dumps, loads, encode_request
+from job_scheduler import JobScheduler
 
 logger = logging.getLogger(__name__)
 
@@ -26,14 +28,41 @@ from chart_generate import generate_prediction_chart, setup_environment
 picker = StockPicker()
 select_stocks = []
 executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)  # 用于执行同步阻塞任务
+tools = StockTools()
 
 app = FastAPI(title='Kronos', version='1.0')
 
-# 全局状态
-is_prepare_task_running = False
-is_pick_task_running = False
-prepare_task_future = None
-pick_task_future = None
+# 停止任务时最多等待任务响应中断的秒数
+STOP_WAIT_SECONDS = 5
+
+
+def run_pick(pick_date=None):
+    """选股任务，结果保存到 select_stocks"""
+    global select_stocks
+    try:
+        stocks = picker.pick_up_stock(pick_date=pick_date)
+        select_stocks = stocks if stocks else []
+        logger.info(f"选股完成，选出 {len(select_stocks)} 只股票")
+    except Exception:
+        select_stocks = []
+        raise
+
+
+# 定时任务：定时触发与HTTP接口手动触发共用调度器，同一任务不会同时运行
+scheduler = JobScheduler(executor)
+# 00:10 准备上一个交易日的数据，前一天不是交易日时没有新数据
+scheduler.add_job('prepare', picker.prepare_stock, hour=0, minute=10,
+                  day_filter=lambda day: tools.is_trading_day(day - timedelta(days=1)))
+# 14:45 交易日盘中选股
+scheduler.add_job('pick', run_pick, hour=14, minute=45, day_filter=tools.is_trading_day)
+
+
+async def _wait_stopped(name):
+    """等待任务响应中断，返回任务是否已结束"""
+    future = scheduler.get_job(name).future
+    if future is not None and not future.done():
+        await asyncio.wait([asyncio.wrap_future(future)], timeout=STOP_WAIT_SECONDS)
+    return not scheduler.is_running(name)
 
 @app.get("/")
 async def get_root():
@@ -61,13 +90,19 @@ async def get_prepare():
         "total": picker.prepare_total_count,
     }
 
+@app.get("/jobs")
+async def get_jobs():
+    """获取定时任务状态：是否运行中、下次执行时间、上次耗时"""
+    return {
+        "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "jobs": scheduler.stats(),
+    }
+
 @app.post("/start_prepare")
 async def start_prepare():
     """异步启动prepare任务"""
-    global is_prepare_task_running, prepare_task_future
-    
-    # 检查是否已经在运行
-    if is_prepare_task_running:
+    # 已经在运行（包括定时触发的）时不再启动
+    if scheduler.run_now('prepare') is None:
         return JSONResponse(
             status_code=400,
             content={
@@ -77,26 +112,6 @@ async def start_prepare():
             }
         )
     
-    # 标记为运行中
-    is_prepare_task_running = True
-    
-    # 定义异步任务包装器
-    async def run_prepare():
-        global is_prepare_task_running
-        try:
-            # 如果picker.prepare_stock()是同步方法，使用线程池执行
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(executor, picker.prepare_stock)
-            return True
-        except Exception as e:
-            logger.error(f"准备任务执行出错: {e}")
-            return False
-        finally:
-            is_prepare_task_running = False
-    
-    # 启动异步任务（不等待）
-    prepare_task_future = asyncio.create_task(run_prepare())
-    
     return {
         "message": "股票数据准备任务已启动",
         "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -107,9 +122,7 @@ async def start_prepare():
 @app.post("/stop_prepare")
 async def stop_prepare():
     """停止prepare任务"""
-    global is_prepare_task_running, prepare_task_future
-    
-    if not is_prepare_task_running:
+    if not scheduler.is_running('prepare'):
         return JSONResponse(
             status_code=400,
             content={
@@ -119,34 +132,29 @@ async def stop_prepare():
             }
         )
     
-    # 尝试停止任务
-    if picker:
-        picker.interrupt_prepare = True
-    
-    # 尝试取消异步任务
-    if prepare_task_future and not prepare_task_future.done():
-        prepare_task_future.cancel()
-        try:
-            await prepare_task_future
-        except asyncio.CancelledError:
-            pass
-    
-    is_prepare_task_running = False
+    # 通知任务中断，任务在下一个检查点退出
+    picker.interrupt_prepare = True
+    stopped = await _wait_stopped('prepare')
     
     return {
-        "message": "准备任务已停止",
+        "message": "准备任务已停止" if stopped else "准备任务正在停止",
         "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "success": True,
-        "is_running": False
+        "is_running": not stopped
     }
 
 @app.post("/start_pick")
 async def start_pick(request: Request):
     """异步启动pick任务，支持日期参数"""
-    global is_pick_task_running, select_stocks, pick_task_future
+    # 获取请求体中的参数
+    try:
+        body = await request.json()
+        pick_date = body.get("date")  # 可选参数
+    except json.JSONDecodeError:
+        pick_date = None
     
-    # 检查是否已经在运行
-    if is_pick_task_running:
+    # 已经在运行（包括定时触发的）时不再启动
+    if scheduler.run_now('pick', pick_date=pick_date) is None:
         return JSONResponse(
             status_code=400,
             content={
@@ -156,39 +164,6 @@ async def start_pick(request: Request):
             }
         )
     
-    # 获取请求体中的参数
-    try:
-        body = await request.json()
-        pick_date = body.get("date")  # 可选参数
-    except json.JSONDecodeError:
-        pick_date = None
-    
-    # 标记为运行中
-    is_pick_task_running = True
-    
-    # 定义异步任务包装器
-    async def run_pick():
-        global is_pick_task_running, select_stocks
-        try:
-            # 如果picker.pick_up_stock()是同步方法，使用线程池执行
-            loop = asyncio.get_event_loop()
-            # 传递pick_date参数给pick_up_stock方法
-            stocks = await loop.run_in_executor(
-                executor, 
-                lambda: picker.pick_up_stock(pick_date=pick_date)
-            )
-            select_stocks = stocks if stocks else []
-            return True
-        except Exception as e:
-            logger.error(f"选股任务执行出错: {e}")
-            select_stocks = []
-            return False
-        finally:
-            is_pick_task_running = False
-    
-    # 启动异步任务（不等待）
-    pick_task_future = asyncio.create_task(run_pick())
-    
     # 构建返回消息
     if pick_date:
         message = f"选股任务已启动（预测日期：{pick_date}）"
@@ -206,9 +181,7 @@ async def start_pick(request: Request):
 @app.post("/stop_pick")
 async def stop_pick():
     """停止pick任务"""
-    global is_pick_task_running, pick_task_future
-    
-    if not is_pick_task_running:
+    if not scheduler.is_running('pick'):
         return JSONResponse(
             status_code=400,
             content={
@@ -218,25 +191,15 @@ async def stop_pick():
             }
         )
     
-    # 尝试停止任务
-    if picker:
-        picker.interrupt_pick = True
-    
-    # 尝试取消异步任务
-    if pick_task_future and not pick_task_future.done():
-        pick_task_future.cancel()
-        try:
-            await pick_task_future
-        except asyncio.CancelledError:
-            pass
-    
-    is_pick_task_running = False
+    # 通知任务中断，任务在下一个检查点退出
+    picker.interrupt_pick = True
+    stopped = await _wait_stopped('pick')
     
     return {
-        "message": "选股任务已停止",
+        "message": "选股任务已停止" if stopped else "选股任务正在停止",
         "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "success": True,
-        "is_running": False
+        "is_running": not stopped
     }
 
 class PredictRequest(BaseModel):
@@ -289,42 +252,27 @@ async def predict_endpoint(request: PredictRequest):
             return {"message": "No data available for prediction"}
                 
         # 转换历史数据为图表需要的格式
-        history_data_for_chart = []
-        for _, row in pd_data.iterrows():
-            timestamp = row.get('timestamp', row.get('date', ''))
-            if hasattr(timestamp, 'strftime'):
-                timestamp_str = timestamp.strftime("%Y-%m-%d %H:%M:%S")
-            else:
-                timestamp_str = str(timestamp)
-            
-            history_data_for_chart.append({
-                "timestamps": timestamp_str,
-                "open": float(row.get('open', 0)),
-                "high": float(row.get('high', 0)),
-                "low": float(row.get('low', 0)),
-                "close": float(row.get('close', 0)),
-                "volume": float(row.get('volume', 0))
-            })
+        history_data_for_chart = frame_to_bars(pd_data)
         
         # 构建预测请求体
-        predict_data_list = history_data_for_chart.copy()  # 与图表数据格式相同
         predict_request = {
             "predict_len": predict_len,
-            "data": predict_data_list
+            "data": history_data_for_chart  # 与图表数据格式相同
         }
 
         # 目标服务地址
-        target_url = "http://192.168.1.180:6030/predict"
+        target_url = KRONOS_PREDICT_URL
 
         # 发送请求
         response = requests.post(
             target_url,
-            json=predict_request,
+            data=dumps(encode_request(predict_request)),
+            headers={'Content-Type': 'application/json'},
             timeout=60
         )
         
         if response.status_code == 200:
-            response_data = response.json()
+            response_data = loads(response.content)
             
             if 'prediction' in response_data:
                 # ✅ 使用转换后的历史数据
@@ -359,37 +307,6 @@ async def predict_endpoint(request: PredictRequest):
         return {"message": f"Prediction failed: {str(e)}"}
 
 
-def predict_timer():
-    """定时任务执行器"""
-    while True:
-        try:
-            current_time = datetime.now()
-            
-            # 00:10:00 执行准备任务
-            if current_time.hour == 0 and current_time.minute == 10 and current_time.second == 0:
-                logger.info(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - 开始执行准备任务")
-                try:
-                    picker.prepare_stock()
-                except Exception as e:
-                    logger.error(f"定时准备任务执行出错: {e}")
-            
-            # 14:45:00 执行选股任务
-            if current_time.hour == 14 and current_time.minute == 45 and current_time.second == 0:
-                logger.info(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - 开始执行选股任务")
-                try:
-                    global select_stocks
-                    stocks = picker.pick_up_stock()
-                    select_stocks = stocks if stocks else []
-                    logger.info(f"选股完成，选出 {len(select_stocks)} 只股票")
-                except Exception as e:
-                    logger.error(f"定时选股任务执行出错: {e}")
-                    select_stocks = []
-        
-        except Exception as e:
-            logger.error(f"定时任务调度出错: {e}")
-        
-        time.sleep(1)  # 每秒检查一次，提高精度
-
 if __name__ == "__main__":
     logging.basicConfig(
         level=logging.INFO,
@@ -397,8 +314,7 @@ if __name__ == "__main__":
         datefmt='%Y-%m-%d %H:%M:%S'
     )
 
-    timer_thread = threading.Thread(target=predict_timer, daemon=True)
-    timer_thread.start()
+    scheduler.start()
 
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=6029, access_log=False)
\ No newline at end of file